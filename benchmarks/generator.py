@@ -0,0 +1,236 @@
+"""Seeded generator of synthetic markets for benchmarks
+
+Builds inputs for Matcher and Scheduler that look like a real placement
+process at any size:
+
+- preferences are correlated, every candidate and position has a latent
+  quality that everyone on the other side partly agrees on
+- proposers rank a sparse or dense list of recipients, and recipients rank
+  the proposers who applied to them
+- recipient capacities follow a skewed lognormal distribution
+- availability is clustered into a few blocks of consecutive slots on a
+  few days, rather than spread uniformly over the calendar
+
+Example:
+
+    >>> from benchmarks.generator import generate_market
+    >>> market = generate_market(1000, 100, seed=42)
+    >>> matcher = Matcher(market.proposer_prefs, market.recipient_prefs)
+    >>> result = matcher.assign_matches(r_capacity=market.r_capacity)
+    >>> c_avail, p_avail = market.availability(result.matches)
+"""
+from __future__ import annotations  # prevents NameErrors for typing
+from dataclasses import dataclass
+from typing import Dict, List, Tuple
+
+import numpy as np
+
+Preferences = Dict[str, List[str]]
+Availability = Dict[str, List[str]]
+
+CHUNK = 2**22  # utilities scored at once, which bounds memory to 32MB
+
+
+@dataclass
+class SyntheticMarket:
+    """Preferences and capacities of a generated market
+
+    Attributes
+    ----------
+    proposer_prefs: Preferences
+        Each proposer mapped to their ranked list of recipients
+    recipient_prefs: Preferences
+        Each recipient mapped to their ranked list of the proposers who
+        applied to them
+    r_capacity: Dict[str, int]
+        The skewed capacity of each recipient
+    seed: int
+        The seed used to generate the market and its availability
+    """
+
+    proposer_prefs: Preferences
+    recipient_prefs: Preferences
+    r_capacity: Dict[str, int]
+    seed: int
+
+    @property
+    def n_edges(self) -> int:
+        """Total length of the proposers' ranked lists"""
+        return sum(map(len, self.proposer_prefs.values()))
+
+    def availability(
+        self,
+        matches: List[Tuple[str, str]],
+        days: int = 5,
+        slots_per_day: int = 16,
+        blocks: int = 2,
+        block_length: int = 4,
+    ) -> Tuple[Availability, Availability]:
+        """Generate clustered availability for the people in some matches
+
+        Each person is available for a few blocks of consecutive slots that
+        start at random times on random days, so people who share a day
+        tend to overlap for several slots in a row.
+
+        Parameters
+        ----------
+        matches: List[Tuple[str, str]]
+            The (proposer, recipient) pairs that need to be scheduled
+        days: int, default 5
+            The number of days in the calendar
+        slots_per_day: int, default 16
+            The number of time slots in each day
+        blocks: int, default 2
+            The number of blocks of availability for each person
+        block_length: int, default 4
+            The number of consecutive slots in each block
+
+        Returns
+        -------
+        Tuple[Availability, Availability]
+            The availability of the proposers and the recipients
+        """
+        rng = np.random.default_rng(self.seed + 1)
+        times = np.array(
+            [
+                f"Day {d} {s:02d}"
+                for d in range(days)
+                for s in range(slots_per_day)
+            ]
+        )
+        candidates = sorted({p for p, _ in matches})
+        positions = sorted({r for _, r in matches})
+        return (
+            _clustered(rng, candidates, times, days, blocks, block_length),
+            _clustered(rng, positions, times, days, blocks, block_length),
+        )
+
+
+def generate_market(
+    n_proposers: int,
+    n_recipients: int,
+    seed: int = 0,
+    list_length: int = 10,
+    correlation: float = 0.7,
+    capacity_skew: float = 0.8,
+    capacity_ratio: float = 1.2,
+) -> SyntheticMarket:
+    """Generate a seeded market with correlated preferences
+
+    Parameters
+    ----------
+    n_proposers: int
+        The number of proposers in the market
+    n_recipients: int
+        The number of recipients in the market
+    seed: int, default 0
+        The seed of the random generator, the same seed and parameters
+        always generate the same market
+    list_length: int, default 10
+        The number of recipients each proposer ranks, use a small value for
+        sparse rank lists or n_recipients for complete lists
+    correlation: float, default 0.7
+        How much candidates agree on the quality of the other side, from 0
+        for independent preferences to 1 for identical preferences
+    capacity_skew: float, default 0.8
+        The sigma of the lognormal distribution of recipient capacities
+    capacity_ratio: float, default 1.2
+        The total capacity of the recipients relative to n_proposers
+
+    Returns
+    -------
+    SyntheticMarket
+        The preferences and capacities of the market
+    """
+    rng = np.random.default_rng(seed)
+    list_length = min(list_length, n_recipients)
+    proposers = np.array([f"Candidate {i}" for i in range(n_proposers)])
+    recipients = np.array([f"Position {i}" for i in range(n_recipients)])
+
+    # proposers rank the recipients with the highest noisy utility
+    r_quality = rng.standard_normal(n_recipients)
+    choices = np.empty((n_proposers, list_length), dtype=np.int64)
+    rows = max(1, CHUNK // n_recipients)
+    for start in range(0, n_proposers, rows):
+        n_rows = min(rows, n_proposers - start)
+        utility = _utility(rng, r_quality, n_rows, correlation)
+        if list_length < n_recipients:
+            top = np.argpartition(-utility, list_length - 1, axis=1)
+            top = top[:, :list_length]
+        else:
+            top = np.broadcast_to(np.arange(n_recipients), utility.shape)
+        order = np.argsort(-np.take_along_axis(utility, top, 1), axis=1)
+        choices[start : start + rows] = np.take_along_axis(top, order, 1)
+
+    # recipients rank the proposers who applied by their noisy utility
+    p_quality = rng.standard_normal(n_proposers)
+    applicants = np.repeat(np.arange(n_proposers), list_length)
+    applied_to = choices.ravel()
+    score = correlation * p_quality[applicants] + np.sqrt(
+        1 - correlation**2
+    ) * rng.standard_normal(len(applicants))
+    order = np.lexsort((-score, applied_to))
+    bounds = np.searchsorted(applied_to[order], np.arange(n_recipients + 1))
+    ranked = proposers[applicants[order]].tolist()
+
+    # skewed capacities that add up to roughly capacity_ratio * n_proposers
+    weights = rng.lognormal(0, capacity_skew, n_recipients)
+    capacity = weights / weights.sum() * n_proposers * capacity_ratio
+    capacity = np.maximum(1, np.rint(capacity)).astype(int).tolist()
+
+    names = recipients.tolist()
+    return SyntheticMarket(
+        proposer_prefs=dict(
+            zip(proposers.tolist(), recipients[choices].tolist())
+        ),
+        recipient_prefs={
+            name: ranked[bounds[r] : bounds[r + 1]]
+            for r, name in enumerate(names)
+        },
+        r_capacity=dict(zip(names, capacity)),
+        seed=seed,
+    )
+
+
+def generate_interviews(matches: List[Tuple[str, str]]) -> Preferences:
+    """Group (proposer, recipient) matches into interviews for Scheduler"""
+    interviews: Preferences = {}
+    for candidate, position in matches:
+        interviews.setdefault(position, []).append(candidate)
+    return interviews
+
+
+def _utility(
+    rng: np.random.Generator,
+    quality: np.ndarray,
+    n_rows: int,
+    correlation: float,
+) -> np.ndarray:
+    """Return shared quality plus idiosyncratic noise for n_rows people"""
+    noise = rng.standard_normal((n_rows, len(quality)), dtype=np.float32)
+    noise *= np.sqrt(1 - correlation**2)
+    noise += (correlation * quality).astype(np.float32)
+    return noise
+
+
+def _clustered(
+    rng: np.random.Generator,
+    names: List[str],
+    times: np.ndarray,
+    days: int,
+    blocks: int,
+    block_length: int,
+) -> Availability:
+    """Give each name a few blocks of consecutive slots on random days"""
+    slots_per_day = len(times) // days
+    block_length = min(block_length, slots_per_day)
+    n = len(names)
+    day = rng.integers(0, days, (n, blocks))
+    start = rng.integers(0, slots_per_day - block_length + 1, (n, blocks))
+    first = day * slots_per_day + start
+    slots = first[:, :, None] + np.arange(block_length)
+    slots = np.sort(slots.reshape(n, -1), axis=1)
+    return {
+        name: list(dict.fromkeys(times[row].tolist()))
+        for name, row in zip(names, slots)
+    }
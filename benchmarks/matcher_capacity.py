@@ -0,0 +1,99 @@
+"""Benchmarks Matcher.assign_matches() as recipient capacity grows
+
+Run from the root of the repo with:
+
+    $ python -m benchmarks.matcher_capacity
+
+Each row compares the cost of resolving an offer to a full recipient with
+the heap kept by Candidate.worst_match() against a linear scan of every
+current match, and reports the end-to-end runtime of both engines.
+"""
+import random
+import time
+from typing import Dict, List, Tuple
+
+from loguru import logger
+
+from cohortify.candidate import Candidate
+from cohortify.matcher import Matcher
+
+CAPACITIES = [1, 5, 10, 30, 60, 120]
+RECIPIENTS = 20
+OFFERS = 2000
+
+
+def linear_compare_offers(candidate: Candidate, new_offer: str) -> str:
+    """The previous implementation of Candidate.compare_offers()"""
+    offer_to_reject = new_offer
+    if not candidate.ranks(new_offer):
+        return offer_to_reject
+    for current_offer in candidate.matches:
+        if candidate.prefers(new=offer_to_reject, to=current_offer):
+            offer_to_reject = current_offer
+    return offer_to_reject
+
+
+def time_compare_offers(capacity: int) -> Tuple[float, float]:
+    """Time resolving OFFERS offers made to a recipient with a full capacity"""
+    rng = random.Random(capacity)
+    names = [f"Candidate {i}" for i in range(OFFERS + capacity)]
+    rng.shuffle(names)
+    results = []
+    for compare in [Candidate.compare_offers, linear_compare_offers]:
+        recipient = Candidate("Position", list(names), capacity)
+        for name in names[-capacity:]:
+            recipient.add_match(name)
+        start = time.perf_counter()
+        for name in names[:OFFERS]:
+            rejected = compare(recipient, name)
+            if rejected != name:
+                recipient.remove_match(rejected)
+                recipient.add_match(name)
+        results.append(time.perf_counter() - start)
+    return results[0], results[1]
+
+
+def build_prefs(capacity: int) -> Tuple[Dict[str, List[str]], ...]:
+    """Build a market where every recipient is oversubscribed"""
+    rng = random.Random(capacity)
+    proposers = [f"Candidate {i}" for i in range(RECIPIENTS * capacity * 2)]
+    recipients = [f"Position {i}" for i in range(RECIPIENTS)]
+    p_prefs = {p: rng.sample(recipients, 5) for p in proposers}
+    r_prefs = {r: rng.sample(proposers, len(proposers)) for r in recipients}
+    return p_prefs, r_prefs
+
+
+def time_assign_matches(capacity: int, engine: str) -> float:
+    """Time a full run of Matcher.assign_matches() with the given engine"""
+    p_prefs, r_prefs = build_prefs(capacity)
+    matcher = Matcher(p_prefs, r_prefs, engine=engine)
+    start = time.perf_counter()
+    matcher.assign_matches(p_capacity=1, r_capacity=capacity)
+    return time.perf_counter() - start
+
+
+def main() -> None:
+    """Print a table of timings for each recipient capacity"""
+    logger.remove()  # stderr output would dominate the timings
+    header = (
+        "capacity",
+        "heap (us)",
+        "linear (us)",
+        "object (s)",
+        "array (s)",
+    )
+    print("".join(f"{col:>14}" for col in header))
+    for capacity in CAPACITIES:
+        heap, linear = time_compare_offers(capacity)
+        row = [
+            f"{capacity:>14}",
+            f"{heap / OFFERS * 1e6:>14.2f}",
+            f"{linear / OFFERS * 1e6:>14.2f}",
+            f"{time_assign_matches(capacity, 'object'):>14.3f}",
+            f"{time_assign_matches(capacity, 'array'):>14.3f}",
+        ]
+        print("".join(row))
+
+
+if __name__ == "__main__":
+    main()
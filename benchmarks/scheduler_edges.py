@@ -0,0 +1,74 @@
+"""Benchmarks graph construction in Scheduler as the number of interviews grows
+
+Run from the root of the repo with:
+
+    $ python -m benchmarks.scheduler_edges
+
+Each row times building the edges between availability and interviews with
+the previous nested comprehensions, which compared every interview against
+every time slot, and the full Scheduler.build_graph() with indexed slots.
+The nested comprehensions are skipped for the largest sizes.
+"""
+import random
+import time
+from typing import Dict, List, Tuple
+
+from cohortify.scheduler import Scheduler
+
+SIZES = [250, 500, 1000, 2000, 5000]
+SLOTS = 40
+NESTED_LIMIT = 1000
+
+
+def build_inputs(n_interviews: int) -> Tuple[Dict[str, List[str]], ...]:
+    """Build availability for SLOTS time slots per person and interviews"""
+    rng = random.Random(n_interviews)
+    times = [f"Slot {i}" for i in range(SLOTS * 2)]
+    candidates = [f"Candidate {i}" for i in range(n_interviews // 3)]
+    positions = [f"Position {i}" for i in range(n_interviews // 10)]
+    c_availability = {c: rng.sample(times, SLOTS) for c in candidates}
+    p_availability = {p: rng.sample(times, SLOTS) for p in positions}
+    interviews = {p: [] for p in positions}
+    for _ in range(n_interviews):
+        interviews[rng.choice(positions)].append(rng.choice(candidates))
+    return c_availability, p_availability, interviews
+
+
+def nested_edges(scheduler: Scheduler) -> int:
+    """The previous construction of c_edges and p_edges"""
+    c_availability = scheduler.c_availability.items()
+    p_availability = scheduler.p_availability.items()
+    interviews = scheduler.interviews
+    c_times = [(c, t) for c, times in c_availability for t in times]
+    p_times = [(p, t) for p, times in p_availability for t in times]
+    c_interviews = [("c", i) for i in interviews]
+    p_interviews = [(i, "p") for i in interviews]
+    c_edges = [
+        (c, i) for i in c_interviews for c in c_times if i[1][1] == c[0]
+    ]
+    p_edges = [
+        (i, p) for i in p_interviews for p in p_times if i[0][0] == p[0]
+    ]
+    return len(c_edges) + len(p_edges)
+
+
+def main() -> None:
+    """Print a table of timings for each number of interviews"""
+    header = ("interviews", "edges", "nested (s)", "build_graph (s)")
+    print("".join(f"{col:>16}" for col in header))
+    for size in SIZES:
+        scheduler = Scheduler(*build_inputs(size))
+        nested = "-"
+        if size <= NESTED_LIMIT:
+            start = time.perf_counter()
+            nested_edges(scheduler)
+            nested = f"{time.perf_counter() - start:.3f}"
+        start = time.perf_counter()
+        G = scheduler.build_graph()
+        indexed = time.perf_counter() - start
+        row = [size, G.number_of_edges(), nested, f"{indexed:.3f}"]
+        print("".join(f"{col:>16}" for col in row))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,46 @@
+"""Benchmarks the engines available to Scheduler.schedule_interviews()
+
+Run from the root of the repo with:
+
+    $ python -m benchmarks.scheduler_engines
+
+Each row reports the runtime and peak memory of scheduling the same
+interviews with the networkx and unit_flow engines. The networkx engine is
+skipped for the largest sizes.
+"""
+import time
+import tracemalloc
+
+from benchmarks.scheduler_edges import build_inputs
+from cohortify.scheduler import Scheduler
+
+SIZES = [250, 500, 1000, 2000, 5000]
+NETWORKX_LIMIT = 1000
+
+
+def profile(size: int, engine: str) -> str:
+    """Return the runtime and peak memory of scheduling with an engine"""
+    scheduler = Scheduler(*build_inputs(size), engine=engine)
+    tracemalloc.start()
+    start = time.perf_counter()
+    scheduler.schedule_interviews()
+    runtime = time.perf_counter() - start
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return f"{runtime:.2f}s / {peak / 2**20:.0f}MB"
+
+
+def main() -> None:
+    """Print a table of timings and peak memory for each engine"""
+    header = ("interviews", "networkx", "unit_flow")
+    print("".join(f"{col:>20}" for col in header))
+    for size in SIZES:
+        networkx = "-"
+        if size <= NETWORKX_LIMIT:
+            networkx = profile(size, "networkx")
+        row = [size, networkx, profile(size, "unit_flow")]
+        print("".join(f"{col:>20}" for col in row))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,271 @@
+"""Scaling benchmarks for matching, scheduling and logging
+
+Run from the root of the repo with:
+
+    $ python -m benchmarks.suite
+    $ python -m benchmarks.suite --tiers small medium --cases match_array
+    $ python -m benchmarks.suite --compare benchmarks/results/<previous>.json
+
+Every case runs on markets from benchmarks.generator at each size tier and
+reports the wall time, the peak memory traced by tracemalloc and the
+throughput in items per second. The wall time comes from a run without
+tracemalloc, which slows down pure Python code, and the peak memory from a
+second run with it. Results are saved as JSON in benchmarks/results/ along
+with the git commit and Python version, and --compare prints the ratio of
+each wall time to the same case in an earlier file.
+"""
+from __future__ import annotations  # prevents NameErrors for typing
+import argparse
+import json
+import platform
+import subprocess
+import time
+import tracemalloc
+from datetime import datetime
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, Tuple
+
+from loguru import logger
+
+from benchmarks.generator import (
+    SyntheticMarket,
+    generate_interviews,
+    generate_market,
+)
+from cohortify.candidate import Candidate
+from cohortify.logger import Logger
+from cohortify.matcher import Matcher
+from cohortify.scheduler import Scheduler
+
+RESULTS = Path(__file__).parent / "results"
+# number of proposers and recipients in each tier
+TIERS = {
+    "small": (1_000, 100),
+    "medium": (10_000, 1_000),
+    "large": (100_000, 2_000),
+}
+LIST_LENGTH = 10
+# the largest number of proposers that slower cases are run for
+LIMITS = {
+    "match_object": 10_000,
+    "match_logged": 10_000,
+    "schedule": 10_000,
+}
+
+# a case prepares its inputs and returns the work to time and its size
+Case = Callable[[SyntheticMarket], Tuple[Callable[[], object], int]]
+
+
+def match_array(market: SyntheticMarket) -> Tuple[Callable, int]:
+    """Deferred acceptance with the array engine, per proposer"""
+    matcher = Matcher(
+        market.proposer_prefs,
+        market.recipient_prefs,
+        engine="array",
+        verbosity="off",
+    )
+    return (
+        lambda: matcher.assign_matches(r_capacity=market.r_capacity),
+        len(market.proposer_prefs),
+    )
+
+
+def match_rounds(market: SyntheticMarket) -> Tuple[Callable, int]:
+    """Deferred acceptance in rounds of bulk offers, per proposer"""
+    matcher = Matcher(
+        market.proposer_prefs,
+        market.recipient_prefs,
+        engine="rounds",
+        verbosity="off",
+    )
+    return (
+        lambda: matcher.assign_matches(r_capacity=market.r_capacity),
+        len(market.proposer_prefs),
+    )
+
+
+def match_object(market: SyntheticMarket) -> Tuple[Callable, int]:
+    """Deferred acceptance with the object engine, per proposer"""
+    matcher = Matcher(
+        market.proposer_prefs,
+        market.recipient_prefs,
+        verbosity="off",
+    )
+    return (
+        lambda: matcher.assign_matches(r_capacity=market.r_capacity),
+        len(market.proposer_prefs),
+    )
+
+
+def match_logged(market: SyntheticMarket) -> Tuple[Callable, int]:
+    """Object engine with full logging, per proposer"""
+
+    def run() -> None:
+        matcher = Matcher(market.proposer_prefs, market.recipient_prefs)
+        matcher.assign_matches(r_capacity=market.r_capacity)
+
+    return run, len(market.proposer_prefs)
+
+
+def log_records(market: SyntheticMarket) -> Tuple[Callable, int]:
+    """Logger rounds with full verbosity, per log"""
+    proposers = [
+        Candidate(name, prefs, 1)
+        for name, prefs in market.proposer_prefs.items()
+    ]
+    recipients = [
+        Candidate(name, prefs, 1)
+        for name, prefs in market.recipient_prefs.items()
+    ]
+    n_rounds = len(proposers) * 5
+
+    def run() -> None:
+        log = Logger("full")
+        for i in range(n_rounds):
+            proposer = proposers[i % len(proposers)]
+            recipient = recipients[i % len(recipients)]
+            log.init_round(i + 1, proposer, recipient)
+            log.exceeds_capacity(kind="recipient")
+            log.new_offer_rejected()
+
+    return run, n_rounds * 3
+
+
+def verify(market: SyntheticMarket) -> Tuple[Callable, int]:
+    """Stability verification of an array engine result, per edge"""
+    matcher = Matcher(
+        market.proposer_prefs,
+        market.recipient_prefs,
+        engine="array",
+        verbosity="off",
+    )
+    result = matcher.assign_matches(r_capacity=market.r_capacity)
+    return result.verify, market.n_edges
+
+
+def schedule(market: SyntheticMarket) -> Tuple[Callable, int]:
+    """Scheduling the matched interviews with unit_flow, per interview"""
+    matcher = Matcher(
+        market.proposer_prefs,
+        market.recipient_prefs,
+        engine="array",
+        verbosity="off",
+    )
+    matches = matcher.assign_matches(r_capacity=market.r_capacity).matches
+    c_availability, p_availability = market.availability(matches)
+    interviews = generate_interviews(matches)
+
+    def run() -> None:
+        scheduler = Scheduler(
+            c_availability, p_availability, interviews, engine="unit_flow"
+        )
+        scheduler.schedule_interviews()
+
+    return run, len(matches)
+
+
+CASES: Dict[str, Case] = {
+    "match_array": match_array,
+    "match_rounds": match_rounds,
+    "match_object": match_object,
+    "match_logged": match_logged,
+    "log_records": log_records,
+    "verify": verify,
+    "schedule": schedule,
+}
+
+
+def measure(case: Case, market: SyntheticMarket) -> Dict[str, float]:
+    """Return the wall time, peak memory and throughput of a case"""
+    work, n_items = case(market)
+    start = time.perf_counter()
+    work()
+    wall = time.perf_counter() - start
+    work, _ = case(market)
+    tracemalloc.start()
+    work()
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return {
+        "items": n_items,
+        "wall_s": round(wall, 4),
+        "peak_mb": round(peak / 2**20, 2),
+        "items_per_s": round(n_items / wall, 1) if wall else None,
+    }
+
+
+def git_commit() -> Optional[str]:
+    """Return the commit the benchmarks ran on, if this is a git checkout"""
+    try:
+        out = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            capture_output=True,
+            check=True,
+            text=True,
+        )
+    except (OSError, subprocess.CalledProcessError):
+        return None
+    return out.stdout.strip()
+
+
+def compare(results: List[dict], path: Path) -> Dict[Tuple[str, str], float]:
+    """Return the ratio of each wall time to the same case in a results file"""
+    previous = json.loads(path.read_text())["results"]
+    before = {(r["case"], r["tier"]): r["wall_s"] for r in previous}
+    return {
+        (r["case"], r["tier"]): r["wall_s"] / before[(r["case"], r["tier"])]
+        for r in results
+        if before.get((r["case"], r["tier"]))
+    }
+
+
+def main() -> None:
+    """Run the selected cases at each tier, then print and save the results"""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--tiers", nargs="+", choices=TIERS, default=TIERS)
+    parser.add_argument("--cases", nargs="+", choices=CASES, default=CASES)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", type=Path, help="defaults to results/")
+    parser.add_argument("--compare", type=Path, help="an earlier results file")
+    args = parser.parse_args()
+    logger.remove()  # stderr output would dominate the timings
+
+    header = ("case", "tier", "items", "wall (s)", "peak (MB)", "items/s")
+    print("".join(f"{col:>14}" for col in header))
+    results = []
+    for tier in args.tiers:
+        n_proposers, n_recipients = TIERS[tier]
+        market = generate_market(
+            n_proposers, n_recipients, args.seed, LIST_LENGTH
+        )
+        for name in args.cases:
+            if n_proposers > LIMITS.get(name, n_proposers):
+                continue
+            row = {"case": name, "tier": tier}
+            row.update(measure(CASES[name], market))
+            results.append(row)
+            print("".join(f"{col:>14}" for col in row.values()))
+
+    if args.compare:
+        print(f"\nwall time relative to {args.compare}")
+        for (name, tier), ratio in compare(results, args.compare).items():
+            print(f"{name:>14}{tier:>14}{ratio:>14.2f}x")
+
+    output = args.output
+    if output is None:
+        stamp = datetime.now().strftime("%Y%m%d-%H%M%S")
+        output = RESULTS / f"{stamp}.json"
+    output.parent.mkdir(parents=True, exist_ok=True)
+    meta = {
+        "commit": git_commit(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "seed": args.seed,
+        "list_length": LIST_LENGTH,
+    }
+    output.write_text(json.dumps({"meta": meta, "results": results}, indent=2))
+    print(f"\nresults saved to {output}")
+
+
+if __name__ == "__main__":
+    main()
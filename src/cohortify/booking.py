@@ -0,0 +1,158 @@
+from __future__ import annotations  # prevents NameErrors for typing
+from typing import Dict, List, Optional, Tuple
+
+Interview = Tuple[str, str]
+InterviewTime = Dict[Interview, str]
+Booked = Dict[Tuple[str, str, str], Interview]  # (side, name, time)
+
+
+def booking_order(mutual: Dict[Interview, List[str]]) -> List[Interview]:
+    """Return the interviews with a mutual slot in the order they're booked
+
+    Interviews with the fewest mutual slots go first, and ties are broken
+    by candidate and then position, so the order only depends on the
+    interviews themselves and not on the order they were passed in.
+    """
+    return sorted(
+        (i for i, times in mutual.items() if times),
+        key=lambda i: (len(mutual[i]), i[1], i[0]),
+    )
+
+
+def book_greedily(
+    order: List[Interview],
+    mutual: Dict[Interview, List[str]],
+    limit: Optional[int] = None,
+) -> Tuple[InterviewTime, Booked]:
+    """Book each interview at its first mutual slot that is still free
+
+    Parameters
+    ----------
+    order: List[Tuple[str, str]]
+        The (position, candidate) interviews to book, in order
+    mutual: Dict[Tuple[str, str], List[str]]
+        The time slots each interview's participants share, in order
+    limit: int, optional
+        Stop once this many interviews are booked, e.g. an upper bound
+
+    Returns
+    -------
+    Tuple[Dict[Tuple[str, str], str], Dict[Tuple[str, str, str], tuple]]
+        Each booked interview mapped to its time slot, and each booked
+        ("candidate" or "position", name, time) mapped to its interview
+    """
+    scheduled: InterviewTime = {}
+    booked: Booked = {}
+    for p, c in order:
+        if len(scheduled) == limit:
+            break
+        for time in mutual[(p, c)]:
+            slots = [("candidate", c, time), ("position", p, time)]
+            if not any(slot in booked for slot in slots):
+                booked.update(dict.fromkeys(slots, (p, c)))
+                scheduled[(p, c)] = time
+                break
+    return scheduled, booked
+
+
+def book_same_time(
+    mutual: Dict[Interview, List[str]],
+    limit: Optional[int] = None,
+) -> InterviewTime:
+    """Book interviews at a time both of their participants are available
+
+    Interviews are booked greedily in booking_order(), then each interview
+    left out is booked at a mutual slot if the interviews blocking it there
+    can each move to another of their mutual slots. Booking both sides at
+    the same time is NP-hard in general, so the schedule is valid but not
+    always the largest.
+
+    Every step follows the sorted order of interviews and of their mutual
+    slots, and only touches the interviews of the people involved, so the
+    result is the same for any order of the interviews, and the same when
+    groups of interviews that share no one are booked separately.
+
+    Parameters
+    ----------
+    mutual: Dict[Tuple[str, str], List[str]]
+        The time slots each interview's participants share, in order
+    limit: int, optional
+        The most interviews that can be booked, e.g. the value of a maximum
+        flow, after which no interview is tried
+
+    Returns
+    -------
+    Dict[Tuple[str, str], str]
+        Each booked interview mapped to its time slot
+    """
+    order = booking_order(mutual)
+    scheduled, booked = book_greedily(order, mutual, limit)
+    n_booked = None
+    # moving interviews can free slots for those tried earlier, so repeat
+    # until a pass books nothing
+    while n_booked != len(scheduled) != limit:
+        n_booked = len(scheduled)
+        for p, c in order:
+            if (p, c) not in scheduled:
+                _book_by_moving((p, c), mutual, scheduled, booked)
+    return scheduled
+
+
+def _book_by_moving(
+    interview: Interview,
+    mutual: Dict[Interview, List[str]],
+    scheduled: InterviewTime,
+    booked: Booked,
+) -> None:
+    """Book an interview at the first mutual slot it can be moved into"""
+    p, c = interview
+    for time in mutual[interview]:
+        slots = [("candidate", c, time), ("position", p, time)]
+        # the interviews of the candidate and position at this time
+        blocking = {booked[slot]: None for slot in slots if slot in booked}
+        if _move_off(list(blocking), time, mutual, scheduled, booked):
+            booked.update(dict.fromkeys(slots, interview))
+            scheduled[interview] = time
+            return
+
+
+def _move_off(
+    blocking: List[Interview],
+    time: str,
+    mutual: Dict[Interview, List[str]],
+    scheduled: InterviewTime,
+    booked: Booked,
+) -> bool:
+    """Move the blocking interviews off a time slot, or undo every move
+
+    Returns False if one of them has no other mutual slot that is free for
+    both of its participants, in which case nothing is moved.
+    """
+    moved: List[Interview] = []
+    for p, c in blocking:
+        for new in mutual[(p, c)]:
+            slots = [("candidate", c, new), ("position", p, new)]
+            if new != time and not any(slot in booked for slot in slots):
+                _rebook((p, c), new, scheduled, booked)
+                moved.append((p, c))
+                break
+        else:
+            for interview in moved:
+                _rebook(interview, time, scheduled, booked)
+            return False
+    return True
+
+
+def _rebook(
+    interview: Interview,
+    new: str,
+    scheduled: InterviewTime,
+    booked: Booked,
+) -> None:
+    """Move a booked interview from its time slot to a new one"""
+    p, c = interview
+    old = scheduled[interview]
+    for side, name in [("candidate", c), ("position", p)]:
+        del booked[(side, name, old)]
+        booked[(side, name, new)] = interview
+    scheduled[interview] = new
@@ -1,6 +1,7 @@
 from __future__ import annotations
+import heapq
 import math
-from typing import List, Optional, Dict, Tuple
+from typing import Iterator, List, Optional, Dict, Set, Tuple
 
 Name = str
 Offer = str
@@ -9,7 +10,22 @@ Capacities = Dict[Name, int]
 
 
 class Candidate:
-    """Represents a candidate in a matching market"""
+    """Represents a candidate in a matching market
+
+    Candidates are slotted and build their rankings once, when they're
+    created, so hundreds of thousands of them stay small. The offers made so
+    far are tracked by a cursor into prefs instead of a generator.
+    """
+
+    __slots__ = [
+        "name",
+        "prefs",
+        "capacity",
+        "cursor",
+        "matches",
+        "_rankings",
+        "_held",
+    ]
 
     def __init__(
         self,
@@ -32,9 +48,14 @@ class Candidate:
         self.name = name
         self.prefs = prefs
         self.capacity = capacity
-        self.offers_left = (offer for offer in prefs)
-        self.matches = set()
-        self._rankings = None
+        # index in prefs of the next offer to make
+        self.cursor = 0
+        self.matches: Set[Offer] = set()
+        # later duplicates overwrite earlier ones, as in Market's cross ranks
+        self._rankings = dict(zip(prefs, range(1, len(prefs) + 1)))
+        # max-heap of (-rank, offer) used to find the least preferred match,
+        # entries are removed lazily once they're no longer in self.matches
+        self._held: List[Tuple[float, Offer]] = []
 
     def ranks(
         self,
@@ -42,7 +63,7 @@ class Candidate:
         default: Optional[int] = None,
     ) -> Optional[int]:
         """Return candidate's ranking of a given offer, with optional default"""
-        return self.rankings.get(offer, default)
+        return self._rankings.get(offer, default)
 
     def prefers(self, new: str, to: str) -> bool:
         """Does the candidate prefer new offer to the current offer?"""
@@ -54,13 +75,38 @@ class Candidate:
 
     def compare_offers(self, new_offer: str) -> str:
         """Compare new offer to existing matches return least preferred offer"""
-        offer_to_reject = new_offer
         if not self.ranks(new_offer):
-            return offer_to_reject
-        for current_offer in self.matches:
-            if self.prefers(new=offer_to_reject, to=current_offer):
-                offer_to_reject = current_offer
-        return offer_to_reject
+            return new_offer
+        worst_match = self.worst_match()
+        if worst_match is None or self.prefers(new=worst_match, to=new_offer):
+            return new_offer
+        return worst_match
+
+    def worst_match(self) -> Optional[str]:
+        """Return the least preferred current match in O(log n) time"""
+        heap = self._held
+        if len(heap) < len(self.matches):
+            # matches were changed directly, so rebuild the heap from them
+            heap[:] = [self._held_entry(m) for m in self.matches]
+            heapq.heapify(heap)
+        while heap and heap[0][1] not in self.matches:
+            heapq.heappop(heap)
+        return heap[0][1] if heap else None
+
+    def add_match(self, offer: str) -> None:
+        """Add an offer to the candidate's matches"""
+        if offer in self.matches:
+            return
+        self.matches.add(offer)
+        heapq.heappush(self._held, self._held_entry(offer))
+
+    def remove_match(self, offer: str) -> None:
+        """Remove an offer from the candidate's matches, if present"""
+        self.matches.discard(offer)
+
+    def _held_entry(self, offer: str) -> Tuple[float, Offer]:
+        """Heap entry that sorts the least preferred offer to the top"""
+        return (-self.ranks(offer, default=math.inf), offer)
 
     @property
     def has_capacity(self) -> bool:
@@ -69,19 +115,37 @@ class Candidate:
 
     def has_offers(self) -> bool:
         """Does this candidate have offers left to make?"""
-        return self.offers_left is not None
+        return self.cursor < len(self.prefs)
+
+    def next_offer(self) -> Optional[Offer]:
+        """Return the next offer to make and advance the cursor past it"""
+        if self.cursor >= len(self.prefs):
+            return None
+        self.cursor += 1
+        return self.prefs[self.cursor - 1]
+
+    @property
+    def offers_left(self) -> Iterator[Offer]:
+        """Iterate over the offers left to make, advancing the cursor
+
+        Offers are only consumed as they're taken from the iterator, so
+        stopping early leaves the rest for the next call.
+        """
+        while self.cursor < len(self.prefs):
+            self.cursor += 1
+            yield self.prefs[self.cursor - 1]
 
     @property
     def rankings(self) -> Dict[Name, int]:
         """Dictionary of candidate's preference for each ranked offer"""
-        if not self._rankings:
-            self._rankings = {p: rank + 1 for rank, p in enumerate(self.prefs)}
         return self._rankings
 
 
 class CandidateList:
     """Dictionary of candidates keyed by their name"""
 
+    __slots__ = ["candidates"]
+
     def __init__(
         self,
         preferences: Preferences,
@@ -100,11 +164,12 @@ class CandidateList:
             The maximum number of matches for any candidate whose capacity was
             not set explicitly in the capacities dictionary, default is 1
         """
-        self.candidates: Dict[str, Candidate] = {}
-        for name, prefs in preferences.items():
-            capacity = capacities.get(name, default_capacity)
-            candidate = Candidate(name, prefs, capacity)
-            self.candidates[name] = candidate
+        self.candidates: Dict[str, Candidate] = {
+            name: Candidate(
+                name, prefs, capacities.get(name, default_capacity)
+            )
+            for name, prefs in preferences.items()
+        }
 
     def get(self, name: str) -> Candidate:
         """Retrieve the candidate by their name"""
@@ -0,0 +1,438 @@
+from __future__ import annotations  # prevents NameErrors for typing
+import heapq
+from array import array
+from collections import deque
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+import numpy as np
+
+from cohortify.market import Market
+
+# columns of the event log kept by MatchState
+EVENT_FIELDS = ["proposer", "start", "stop", "outcome", "rank"]
+# outcomes recorded in the event log, ids >= 0 are evicted proposers
+ACCEPTED = -1
+REJECTED = -2
+EXHAUSTED = -3
+
+
+class MatchState:
+    """Resumable state of deferred acceptance on a Market's arrays
+
+    Besides each proposer's cursor and each recipient's held offers, the
+    state keeps a compact log with one row per proposer taken from the
+    queue, so a run can be partially undone and resumed after the market
+    changes, see warm_start().
+    """
+
+    def __init__(
+        self,
+        market: Market,
+        p_capacity: np.ndarray,
+        r_capacity: np.ndarray,
+    ) -> None:
+        """Initializes an empty MatchState
+
+        Parameters
+        ----------
+        market: Market
+            The integer-indexed market to match
+        p_capacity: np.ndarray
+            Maximum number of matches for each proposer, aligned with their ids
+        r_capacity: np.ndarray
+            Maximum number of matches for each recipient, aligned with their ids
+        """
+        self.market = market
+        # plain lists are much faster than numpy arrays for scalar access
+        self.p_capacity: List[int] = p_capacity.tolist()
+        self.r_capacity: List[int] = r_capacity.tolist()
+        self.cursor: List[int] = market.p_offsets[:-1].tolist()
+        self.p_count: List[int] = [0] * market.n_proposers
+        # each recipient holds a max-heap of (-rank, proposer) so the least
+        # preferred match sits at the top and can be evicted in O(log n)
+        self.held: List[list] = [[] for _ in range(market.n_recipients)]
+        # flat log of the proposer, their cursor before and after, the
+        # outcome and the rank of any evicted proposer for each proposer
+        # taken from the queue, see EVENT_FIELDS
+        self.log = array("q")
+        # which proposers are queued, all False between runs of resume()
+        self.queued: List[bool] = [False] * market.n_proposers
+        # Python lists of the market's arrays, see MatchState.lists()
+        self._lists: Optional[Tuple[List[int], List[int], List[int]]] = None
+
+    def lists(self) -> Tuple[List[int], List[int], List[int]]:
+        """Return the market's targets, ranks and row ends as Python lists
+
+        The lists are built on first use and kept, so resuming the same
+        state many times, e.g. one component at a time, converts the
+        market's arrays only once.
+        """
+        if self._lists is None:
+            market = self.market
+            self._lists = (
+                market.p_targets.tolist(),
+                market.p_ranks.tolist(),
+                market.p_offsets[1:].tolist(),
+            )
+        return self._lists
+
+    def held_proposers(self) -> List[List[int]]:
+        """Return the ids of the proposers held by each recipient"""
+        return [[p for _, p in heap] for heap in self.held]
+
+    def events(self) -> Dict[str, np.ndarray]:
+        """Return zero-copy numpy views of each column of the event log"""
+        rows = np.frombuffer(self.log, dtype=np.int64).reshape(-1, 5)
+        return {name: rows[:, i] for i, name in enumerate(EVENT_FIELDS)}
+
+
+def resume(state: MatchState, proposers: Iterable[int]) -> None:
+    """Run proposer-proposing deferred acceptance until no offers are left
+
+    Parameters
+    ----------
+    state: MatchState
+        The state to continue from, which is updated in place
+    proposers: Iterable[int]
+        The ids of the proposers who may still have offers to make
+    """
+    targets, ranks, ends = state.lists()
+    cursor, p_count, held = state.cursor, state.p_count, state.held
+    p_cap, r_cap = state.p_capacity, state.r_capacity
+    log = state.log.extend
+
+    queued = state.queued
+    queue = deque()
+    for p in proposers:
+        if p_count[p] < p_cap[p] and not queued[p]:
+            queued[p] = True
+            queue.append(p)
+    while queue:
+        p = queue.popleft()
+        queued[p] = False
+        start = cursor[p]
+
+        # get the next recipient who has also ranked the proposer
+        k = start
+        end = ends[p]
+        while k < end and not ranks[k]:
+            k += 1
+        if k == end:
+            cursor[p] = k
+            log((p, start, k, EXHAUSTED, 0))
+            continue
+        cursor[p] = k + 1
+        r = targets[k]
+        rank = ranks[k]
+
+        heap = held[r]
+        if len(heap) < r_cap[r]:
+            heapq.heappush(heap, (-rank, p))
+            p_count[p] += 1
+            log((p, start, k + 1, ACCEPTED, 0))
+        elif heap and -heap[0][0] > rank:
+            # replace the lowest ranked match with the new proposer
+            old_rank, rejected = heapq.heapreplace(heap, (-rank, p))
+            p_count[p] += 1
+            p_count[rejected] -= 1
+            log((p, start, k + 1, rejected, -old_rank))
+            if not queued[rejected]:
+                queued[rejected] = True
+                queue.append(rejected)
+        else:
+            log((p, start, k + 1, REJECTED, 0))
+
+        # if they have capacity, add the proposer back to the pool
+        if p_count[p] < p_cap[p] and not queued[p]:
+            queued[p] = True
+            queue.append(p)
+
+
+def deferred_acceptance(
+    market: Market,
+    p_capacity: np.ndarray,
+    r_capacity: np.ndarray,
+) -> List[List[int]]:
+    """Run proposer-proposing deferred acceptance on a Market's arrays
+
+    Parameters
+    ----------
+    market: Market
+        The integer-indexed market to match
+    p_capacity: np.ndarray
+        Maximum number of matches for each proposer, aligned with their ids
+    r_capacity: np.ndarray
+        Maximum number of matches for each recipient, aligned with their ids
+
+    Returns
+    -------
+    List[List[int]]
+        The ids of the proposers held by each recipient, indexed by recipient
+    """
+    state = MatchState(market, p_capacity, r_capacity)
+    resume(state, range(market.n_proposers))
+    return state.held_proposers()
+
+
+def warm_start(
+    state: MatchState,
+    market: Market,
+    proposers: Set[str],
+    recipients: Set[str],
+    p_capacity: np.ndarray,
+    r_capacity: np.ndarray,
+) -> MatchState:
+    """Continue deferred acceptance after the preferences of some candidates
+    changed, returning the same matches as a run from scratch
+
+    Deferred acceptance reaches the same matching in any order, so every
+    event of the previous run that doesn't depend on a changed candidate is
+    still a valid first step on the new market. Events that touch a changed
+    candidate, and every later event that depends on them through the same
+    proposer, recipient or an evicted proposer, are undone and only the
+    proposers involved in them are queued again.
+
+    Parameters
+    ----------
+    state: MatchState
+        The state at the end of a run on the previous market
+    market: Market
+        The market with the updated preferences
+    proposers: Set[str]
+        Proposers whose preferences changed, were added or were removed
+    recipients: Set[str]
+        Recipients whose preferences changed, were added or were removed
+    p_capacity: np.ndarray
+        Maximum number of matches for each proposer in the new market
+    r_capacity: np.ndarray
+        Maximum number of matches for each recipient in the new market
+    """
+    old = state.market
+    edited_p = np.array([name in proposers for name in old.proposers], bool)
+    edited_r = np.array([name in recipients for name in old.recipients], bool)
+    ev = state.events()
+    n_events = len(ev["proposer"])
+
+    # seed with events by changed proposers or passing a changed recipient
+    touched = np.concatenate([[0], np.cumsum(edited_r[old.p_targets])])
+    seed = edited_p[ev["proposer"]]
+    seed |= touched[ev["stop"]] - touched[ev["start"]] > 0
+    first = int(np.argmax(seed)) if seed.any() else n_events
+
+    # find every event that depends on a seed event
+    targets = old.p_targets.tolist()
+    tainted_p = edited_p.tolist()
+    tainted_r = edited_r.tolist()
+    downstream = np.zeros(n_events, bool)
+    rows = zip(
+        range(first, n_events),
+        seed[first:].tolist(),
+        ev["proposer"][first:].tolist(),
+        ev["stop"][first:].tolist(),
+        ev["outcome"][first:].tolist(),
+    )
+    for i, is_seed, p, stop, outcome in rows:
+        r = targets[stop - 1] if outcome != EXHAUSTED else -1
+        if is_seed or tainted_p[p] or (r >= 0 and tainted_r[r]):
+            downstream[i] = True
+            tainted_p[p] = True
+            if r >= 0:
+                tainted_r[r] = True
+            if outcome >= 0:
+                tainted_p[outcome] = True
+
+    cursor, p_count, held = _undo(state, ev, np.flatnonzero(downstream))
+
+    # translate what's left of the state to the ids of the new market
+    p_map = np.array(
+        [market.p_index.get(n, -1) for n in old.proposers], dtype=np.int64
+    )
+    r_map = [market.r_index.get(n, -1) for n in old.recipients]
+    new = MatchState(market, p_capacity, r_capacity)
+    shift = market.p_offsets[p_map] - old.p_offsets[:-1]
+    for p, new_p in enumerate(p_map.tolist()):
+        if new_p >= 0 and not edited_p[p]:
+            new.cursor[new_p] = cursor[p] + int(shift[p])
+            new.p_count[new_p] = p_count[p]
+    for r, new_r in enumerate(r_map):
+        if new_r >= 0:
+            new.held[new_r] = [(rank, int(p_map[p])) for rank, p in held[r]]
+    kept = ev["proposer"][~downstream]
+    outcome = ev["outcome"][~downstream]
+    evicted = np.where(outcome >= 0, p_map[np.maximum(outcome, 0)], outcome)
+    rows = np.stack(
+        [
+            p_map[kept],
+            ev["start"][~downstream] + shift[kept],
+            ev["stop"][~downstream] + shift[kept],
+            evicted,
+            ev["rank"][~downstream],
+        ],
+        axis=1,
+    )
+    new.log.frombytes(rows.astype(np.int64).tobytes())
+
+    # only proposers affected by the changes re-enter the queue
+    queue = [p for p in p_map[np.array(tainted_p, bool)].tolist() if p >= 0]
+    queue += [market.p_index[n] for n in market.proposers if n in proposers]
+    resume(new, queue)
+    return new
+
+
+def _undo(
+    state: MatchState,
+    ev: Dict[str, np.ndarray],
+    events: np.ndarray,
+) -> Tuple[List[int], List[int], List[List[Tuple[int, int]]]]:
+    """Undo events of a MatchState from the latest to the earliest
+
+    The state itself isn't changed, see warm_start().
+
+    Returns
+    -------
+    Tuple[List[int], List[int], List[List[Tuple[int, int]]]]
+        The cursor and number of matches of each proposer and the offers
+        held by each recipient once the events are undone
+    """
+    targets = state.market.p_targets.tolist()
+    ranks = state.market.p_ranks.tolist()
+    cursor = list(state.cursor)
+    p_count = list(state.p_count)
+    held = [list(heap) for heap in state.held]
+    undo = events[::-1]
+    rows = zip(
+        ev["proposer"][undo].tolist(),
+        ev["start"][undo].tolist(),
+        ev["stop"][undo].tolist(),
+        ev["outcome"][undo].tolist(),
+        ev["rank"][undo].tolist(),
+    )
+    for p, start, stop, outcome, evicted_rank in rows:
+        cursor[p] = start
+        if outcome in (REJECTED, EXHAUSTED):
+            continue
+        heap = held[targets[stop - 1]]
+        heap.remove((-ranks[stop - 1], p))
+        p_count[p] -= 1
+        if outcome >= 0:
+            heap.append((-evicted_rank, outcome))
+            p_count[outcome] += 1
+        heapq.heapify(heap)
+    return cursor, p_count, held
+
+
+def round_deferred_acceptance(
+    market: Market,
+    p_capacity: np.ndarray,
+    r_capacity: np.ndarray,
+    stats: Optional[Dict[str, int]] = None,
+) -> List[List[int]]:
+    """Run deferred acceptance in rounds of bulk proposals on numpy arrays
+
+    In each round every proposer with capacity left proposes to as many of
+    their next acceptable recipients as they have room for, all at once, and
+    every recipient who received an offer keeps the best of their held and
+    new offers up to their capacity, which is one sort over those offers.
+    Proposers who were rejected propose again in the next round. The order
+    in which offers are made doesn't change the outcome of deferred
+    acceptance, so the matching is the same proposer-optimal one as resume()
+    finds one offer at a time.
+
+    Parameters
+    ----------
+    market: Market
+        The integer-indexed market to match
+    p_capacity: np.ndarray
+        Maximum number of matches for each proposer, aligned with their ids
+    r_capacity: np.ndarray
+        Maximum number of matches for each recipient, aligned with their ids
+    stats: Dict[str, int], optional
+        If given, the number of rounds, offers and rejections are added to it
+
+    Returns
+    -------
+    List[List[int]]
+        The ids of the proposers held by each recipient, indexed by recipient
+    """
+    n_proposers, n_recipients = market.n_proposers, market.n_recipients
+    p_cap = np.asarray(p_capacity, dtype=np.int64)
+    r_cap = np.asarray(r_capacity, dtype=np.int64)
+    # only offers to recipients who ranked the proposer back can be accepted
+    ranks = np.asarray(market.p_ranks)
+    edges = np.flatnonzero(ranks > 0)
+    rows = np.repeat(np.arange(n_proposers), np.diff(market.p_offsets))
+    rows = rows[edges]
+    targets = np.asarray(market.p_targets)[edges]
+    ranks = ranks[edges]
+    lengths = np.bincount(rows, minlength=n_proposers)
+    ends = np.cumsum(lengths)
+    cursor = ends - lengths
+    p_count = np.zeros(n_proposers, dtype=np.int64)
+    touched = np.zeros(n_recipients, dtype=bool)
+
+    held = np.empty(0, dtype=np.int64)  # indexes of the accepted edges
+    free = np.arange(n_proposers)
+    n_rounds = n_offers = n_rejections = 0
+    while True:
+        want = np.minimum(
+            p_cap[free] - p_count[free], ends[free] - cursor[free]
+        )
+        free, want = free[want > 0], want[want > 0]
+        if free.size == 0:
+            break
+        n_rounds += 1
+        # the next want edges of each free proposer, as one flat array
+        total = int(want.sum())
+        shift = np.repeat(cursor[free] - (np.cumsum(want) - want), want)
+        offers = shift + np.arange(total)
+        cursor[free] += want
+        p_count[free] += want
+        n_offers += total
+
+        # recipients with new offers choose from everything they hold
+        touched[targets[offers]] = True
+        reopened = touched[targets[held]]
+        pool = np.concatenate([held[reopened], offers])
+        touched[targets[offers]] = False
+        kept, rejected = _resolve(pool, targets, ranks, r_cap)
+        held = np.concatenate([held[~reopened], kept])
+        np.subtract.at(p_count, rows[rejected], 1)
+        n_rejections += len(rejected)
+        free = np.unique(rows[rejected])
+
+    if stats is not None:
+        stats["rounds"] = stats.get("rounds", 0) + n_rounds
+        stats["offers"] = stats.get("offers", 0) + n_offers
+        stats["rejections"] = stats.get("rejections", 0) + n_rejections
+    held = held[np.lexsort((ranks[held], targets[held]))]
+    proposers = rows[held].tolist()
+    counts = np.bincount(targets[held], minlength=n_recipients)
+    stops = np.cumsum(counts).tolist()
+    return [
+        proposers[stop - n : stop] for n, stop in zip(counts.tolist(), stops)
+    ]
+
+
+def _resolve(
+    pool: np.ndarray,
+    targets: np.ndarray,
+    ranks: np.ndarray,
+    r_cap: np.ndarray,
+) -> Tuple[np.ndarray, np.ndarray]:
+    """Keep the best offers in a pool of edges up to each recipient's capacity
+
+    The pool is sorted by recipient and then by the rank they give each
+    proposer, so every recipient keeps the first of their offers.
+
+    Returns
+    -------
+    Tuple[np.ndarray, np.ndarray]
+        The edges that were kept and the edges that were rejected
+    """
+    pool = pool[np.lexsort((ranks[pool], targets[pool]))]
+    group = targets[pool]
+    starts = np.flatnonzero(np.r_[True, group[1:] != group[:-1]])
+    sizes = np.diff(np.r_[starts, len(pool)])
+    place = np.arange(len(pool)) - np.repeat(starts, sizes)
+    kept = place < r_cap[group]
+    return pool[kept], pool[~kept]
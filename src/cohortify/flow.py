@@ -0,0 +1,183 @@
+from __future__ import annotations  # prevents NameErrors for typing
+from collections import deque
+from typing import List, Optional
+
+
+class UnitFlowNetwork:
+    """Flow network with integer nodes in which every edge has capacity 1
+
+    Edges are stored in flat lists indexed by edge id, and every edge ``e``
+    is paired with its reverse edge ``e ^ 1`` so the residual capacity of
+    both directions can be updated in place. The flow on an edge is the
+    residual capacity of its reverse edge.
+    """
+
+    def __init__(self, n_nodes: int = 0) -> None:
+        """Initializes the UnitFlowNetwork class
+
+        Parameters
+        ----------
+        n_nodes: int, default 0
+            The number of nodes to create, with ids 0 to n_nodes - 1
+        """
+        self.heads: List[int] = []  # node each edge points to
+        self.caps: List[int] = []  # residual capacity of each edge
+        self.adj: List[List[int]] = [[] for _ in range(n_nodes)]
+
+    @property
+    def n_nodes(self) -> int:
+        """Number of nodes in the network"""
+        return len(self.adj)
+
+    @property
+    def n_edges(self) -> int:
+        """Number of edges in the network, excluding reverse edges"""
+        return len(self.heads) // 2
+
+    def add_node(self) -> int:
+        """Add a node to the network and return its id"""
+        self.adj.append([])
+        return len(self.adj) - 1
+
+    def add_edge(self, u: int, v: int) -> int:
+        """Add an edge from u to v with a capacity of 1 and return its id"""
+        e = len(self.heads)
+        self.heads.extend([v, u])
+        self.caps.extend([1, 0])
+        self.adj[u].append(e)
+        self.adj[v].append(e ^ 1)
+        return e
+
+    def add_nodes(self, n: int) -> range:
+        """Add n nodes to the network and return the range of their ids"""
+        start = len(self.adj)
+        self.adj.extend([[] for _ in range(n)])
+        return range(start, start + n)
+
+    def add_edges(self, tails: List[int], heads: List[int]) -> range:
+        """Add an edge from each tail to each head and return their ids
+
+        Same as calling add_edge() for each pair, but the edge lists are
+        extended in bulk.
+        """
+        start = len(self.heads)
+        pairs = [0] * (2 * len(tails))
+        pairs[0::2], pairs[1::2] = heads, tails
+        self.heads.extend(pairs)
+        self.caps.extend([1, 0] * len(tails))
+        adj = self.adj
+        for e, (tail, head) in enumerate(zip(tails, heads), start // 2):
+            adj[tail].append(2 * e)
+            adj[head].append(2 * e + 1)
+        return range(start, len(self.heads), 2)
+
+    def tail(self, e: int) -> int:
+        """Return the node an edge starts from"""
+        return self.heads[e ^ 1]
+
+    def flow(self, e: int) -> int:
+        """Return the flow on an edge, which is either 0 or 1"""
+        return self.caps[e ^ 1]
+
+    def push(self, e: int) -> None:
+        """Send one unit of flow along an edge, or cancel it on its reverse"""
+        self.caps[e] -= 1
+        self.caps[e ^ 1] += 1
+
+    def max_flow(self, s: int, t: int) -> int:
+        """Augment the current flow to a maximum flow using Dinic's algorithm
+
+        With unit capacities each phase runs in O(E) time and the number of
+        phases is O(sqrt(V)) for networks like the Scheduler's, in which
+        every inner node has a single incoming or outgoing edge.
+
+        Returns
+        -------
+        int
+            The additional flow that was pushed from s to t
+        """
+        total = 0
+        while True:
+            level = self._levels(s, t)
+            if level is None:
+                return total
+            it = [0] * self.n_nodes
+            while self._augment(s, t, level, it):
+                total += 1
+
+    def augment(self, s: int, t: int) -> bool:
+        """Push one unit of flow along a shortest augmenting path, if any
+
+        The search stops as soon as t is reached, which makes this cheaper
+        than a phase of max_flow() when repairing a flow after small updates.
+        """
+        heads, caps, adj = self.heads, self.caps, self.adj
+        parent = [-1] * self.n_nodes  # edge used to reach each node
+        parent[s] = -2
+        queue = deque([s])
+        while queue and parent[t] == -1:
+            u = queue.popleft()
+            for e in adj[u]:
+                v = heads[e]
+                if caps[e] and parent[v] == -1:
+                    parent[v] = e
+                    queue.append(v)
+        if parent[t] == -1:
+            return False
+        v = t
+        while v != s:
+            e = parent[v]
+            caps[e] -= 1
+            caps[e ^ 1] += 1
+            v = heads[e ^ 1]
+        return True
+
+    def _levels(self, s: int, t: int) -> Optional[List[int]]:
+        """BFS distances from s in the residual network, None if t is cut"""
+        heads, caps, adj = self.heads, self.caps, self.adj
+        level = [-1] * self.n_nodes
+        level[s] = 0
+        queue = deque([s])
+        while queue:
+            u = queue.popleft()
+            for e in adj[u]:
+                v = heads[e]
+                if caps[e] and level[v] < 0:
+                    level[v] = level[u] + 1
+                    queue.append(v)
+        return level if level[t] >= 0 else None
+
+    def _augment(
+        self,
+        s: int,
+        t: int,
+        level: List[int],
+        it: List[int],
+    ) -> bool:
+        """Find one path from s to t in the level graph and push flow on it"""
+        heads, caps, adj = self.heads, self.caps, self.adj
+        path: List[int] = []
+        u = s
+        while u != t:
+            edges = adj[u]
+            i = it[u]
+            while i < len(edges):
+                e = edges[i]
+                if caps[e] and level[heads[e]] == level[u] + 1:
+                    break
+                i += 1
+            it[u] = i
+            if i < len(edges):
+                path.append(edges[i])
+                u = heads[edges[i]]
+                continue
+            # dead end, so drop u from the level graph and backtrack
+            level[u] = -1
+            if not path:
+                return False
+            u = heads[path.pop() ^ 1]
+            it[u] += 1
+        for e in path:
+            caps[e] -= 1
+            caps[e ^ 1] += 1
+        return True
@@ -0,0 +1,255 @@
+from __future__ import annotations  # prevents NameErrors for typing
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Tuple, Union
+
+import numpy as np
+import pandas as pd
+
+from cohortify.market import Market
+from cohortify.slots import SlotBitmap
+
+Source = Union[str, Path, pd.DataFrame]
+Availability = Dict[str, List[str]]
+
+PARQUET_SUFFIXES = [".parquet", ".pq"]
+
+
+def read_table(
+    source: Source,
+    columns: List[str],
+    names: List[str],
+) -> pd.DataFrame:
+    """Read the columns of a long-format table from a CSV or Parquet file
+
+    Parameters
+    ----------
+    source: str | Path | pd.DataFrame
+        A path to a CSV file, a Parquet file ending in .parquet or .pq, or a
+        DataFrame that was already loaded. Parquet files need one of the
+        optional pyarrow or fastparquet packages
+    columns: List[str]
+        The columns to read, any other columns are ignored
+    names: List[str]
+        The columns that hold names, which are always read as strings
+
+    Raises
+    ------
+    KeyError
+        If any of the columns is missing
+    """
+    if isinstance(source, pd.DataFrame):
+        df = source
+    elif Path(source).suffix.lower() in PARQUET_SUFFIXES:
+        df = pd.read_parquet(source, columns=columns)
+    else:
+        dtype = {col: str for col in names}
+        df = pd.read_csv(source, usecols=columns, dtype=dtype)
+    missing = [col for col in columns if col not in df.columns]
+    if missing:
+        raise KeyError(missing)
+    df = df[columns]
+    # e.g. ids stored as integers in Parquet files or DataFrames
+    numeric = [col for col in names if df[col].dtype != object]
+    return df.astype({col: str for col in numeric}) if numeric else df
+
+
+def load_preferences(
+    proposer_source: Source,
+    recipient_source: Source,
+    who: str = "who",
+    whom: str = "whom",
+    rank: str = "rank",
+    drop_unknown: bool = False,
+) -> Market:
+    """Load both sides' ranked preferences from long-format tables
+
+    Each row is one person ranking another, e.g. ``Alice, Position 1, 1``.
+    Both tables are validated and converted straight to a Market's CSR
+    arrays, without building a Python list of preferences per person. Use
+    Matcher.from_market() to match the result.
+
+    Parameters
+    ----------
+    proposer_source: str | Path | pd.DataFrame
+        The proposers' rankings of recipients, see read_table()
+    recipient_source: str | Path | pd.DataFrame
+        The recipients' rankings of proposers, see read_table()
+    who: str, default "who"
+        The column with the name of the person submitting the ranking
+    whom: str, default "whom"
+        The column with the name of the person being ranked
+    rank: str, default "rank"
+        The column with the 1-based rank, which must count up from 1 without
+        gaps for each person
+    drop_unknown: bool, default False
+        If True, rows that rank someone who didn't submit preferences of
+        their own are dropped after the ranks are validated, like
+        Market.from_preferences() does for recipients, otherwise they raise
+
+    Raises
+    ------
+    ValueError
+        If a table ranks someone twice, repeats or skips a rank, or ranks
+        someone who isn't on the other side, listing the offending rows
+    """
+    columns = [who, whom, rank]
+    p_df = read_table(proposer_source, columns, names=[who, whom])
+    r_df = read_table(recipient_source, columns, names=[who, whom])
+    p_ids, proposers = pd.factorize(p_df[who])
+    r_ids, recipients = pd.factorize(r_df[who])
+    p_csr = _to_csr(p_df, p_ids, recipients, columns, drop_unknown)
+    r_csr = _to_csr(r_df, r_ids, proposers, columns, drop_unknown)
+    return Market.from_csr(
+        proposers=list(proposers),
+        recipients=list(recipients),
+        p_csr=p_csr,
+        r_csr=r_csr,
+    )
+
+
+def load_availability(
+    source: Source,
+    who: str = "who",
+    slot: str = "slot",
+    known: Optional[Iterable[str]] = None,
+    bitmap: bool = False,
+    slots: Optional[List[str]] = None,
+) -> Union[Availability, SlotBitmap]:
+    """Load availability from a long-format table with one row per slot
+
+    Parameters
+    ----------
+    source: str | Path | pd.DataFrame
+        The time slots each person is available for, see read_table()
+    who: str, default "who"
+        The column with the name of the candidate or position
+    slot: str, default "slot"
+        The column with the time slot they're available for
+    known: Iterable[str], optional
+        If given, every name must be one of these, e.g. the candidates in
+        the interviews that will be scheduled
+    bitmap: bool, default False
+        If True, return a SlotBitmap built straight from the codes of each
+        name and slot, without a list of slots per person
+    slots: List[str], optional
+        The time slots of the bitmap in order, by default every slot in the
+        table in the order they first appear. Pass the same list for
+        candidates and positions, e.g. TimeGrid.labels(). Only used if
+        bitmap is True
+
+    Returns
+    -------
+    Dict[str, List[str]] | SlotBitmap
+        The availability of each person in the format Scheduler accepts, with
+        slots in the order they appear in the table, or a SlotBitmap
+
+    Raises
+    ------
+    ValueError
+        If a name or slot is missing, a person lists a slot twice, a name
+        isn't one of known or, with bitmap=True, a slot isn't one of slots
+    """
+    df = read_table(source, [who, slot], names=[who, slot])
+    errors = []
+    _check(errors, "missing values", df, df[[who, slot]].isna().any(axis=1))
+    _check(errors, "duplicate slots", df, df.duplicated(keep=False))
+    if known is not None:
+        unknown = ~df[who].isin(pd.Index(list(known)))
+        _check(errors, "unknown names", df, unknown)
+    if bitmap and slots is not None:
+        unknown = ~df[slot].isin(pd.Index(list(slots)))
+        _check(errors, "unknown slots", df, unknown)
+    _raise(errors)
+
+    codes, names = pd.factorize(df[who])
+    if bitmap:
+        if slots is None:
+            cols, slots = pd.factorize(df[slot])
+        else:
+            cols = pd.Index(list(slots)).get_indexer(df[slot])
+        return SlotBitmap.from_codes(list(names), list(slots), codes, cols)
+    order = np.argsort(codes, kind="stable")
+    slots = df[slot].to_numpy()[order]
+    bounds = np.searchsorted(codes[order], np.arange(1, len(names)))
+    return {
+        name: times.tolist()
+        for name, times in zip(list(names), np.split(slots, bounds))
+    }
+
+
+def _to_csr(
+    df: pd.DataFrame,
+    row_ids: np.ndarray,
+    targets: pd.Index,
+    columns: List[str],
+    drop_unknown: bool,
+) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """Validate one side's rankings and convert them to CSR arrays
+
+    Names are hashed once by factorizing each column, then every check runs
+    on integer codes.
+    """
+    _, whom, rank = columns
+    n_rows = row_ids.max() + 1 if len(row_ids) else 0
+    ranked, ranked_names = pd.factorize(df[whom])
+    target_ids = pd.Index(targets).get_indexer(ranked_names)[ranked]
+    ranks = pd.to_numeric(df[rank], errors="coerce").to_numpy()
+
+    errors: List[str] = []
+    _check(errors, "missing names", df, (row_ids < 0) | (ranked < 0))
+    invalid = ~np.isfinite(ranks) | (ranks < 1) | (ranks != np.round(ranks))
+    _check(errors, "invalid ranks", df, invalid)
+    _raise(errors)
+    ranks = ranks.astype(np.int64)
+    twice = _duplicated(row_ids * len(ranked_names) + ranked)
+    _check(errors, "people ranked twice", df, twice)
+    repeated = _duplicated(row_ids * (ranks.max(initial=0) + 1) + ranks)
+    _check(errors, "repeated ranks", df, repeated)
+    if not drop_unknown:
+        _check(errors, "unknown names", df, target_ids < 0)
+    _raise(errors)
+
+    # after sorting by person and rank, the ranks must count up from 1
+    order = np.lexsort((ranks, row_ids))
+    lengths = np.bincount(row_ids, minlength=n_rows)
+    starts = np.cumsum(lengths) - lengths
+    expected = np.arange(len(order)) - starts[row_ids[order]] + 1
+    gaps = np.zeros(len(df), bool)
+    gaps[order] = ranks[order] != expected
+    _check(errors, "rank gaps", df, gaps)
+    _raise(errors)
+
+    order = order[target_ids[order] >= 0]
+    lengths = np.bincount(row_ids[order], minlength=n_rows)
+    offsets = np.concatenate([[0], np.cumsum(lengths)]).astype(np.int64)
+    return offsets, target_ids[order].astype(np.int64), ranks[order]
+
+
+def _duplicated(keys: np.ndarray) -> np.ndarray:
+    """Flag every element of an integer array that appears more than once"""
+    _, inverse, counts = np.unique(
+        keys, return_inverse=True, return_counts=True
+    )
+    return counts[inverse.ravel()] > 1
+
+
+def _check(
+    errors: List[str],
+    problem: str,
+    df: pd.DataFrame,
+    mask: Union[np.ndarray, pd.Series],
+    limit: int = 5,
+) -> None:
+    """Describe the rows flagged by a mask, showing at most limit of them"""
+    mask = np.asarray(mask, dtype=bool)
+    if not mask.any():
+        return
+    rows = df[mask]
+    sample = rows.head(limit).to_dict("records")
+    errors.append(f"{len(rows)} rows with {problem}, e.g. {sample}")
+
+
+def _raise(errors: List[str]) -> None:
+    """Raise a ValueError that lists every problem found"""
+    if errors:
+        raise ValueError("; ".join(errors))
@@ -1,10 +1,18 @@
+from __future__ import annotations  # prevents NameErrors for typing
+import time
+from array import array
+from collections import Counter
 from dataclasses import dataclass
 from enum import Enum
-from typing import Optional
+from typing import Dict, Iterator, List, Optional, Union
 
+import numpy as np
 from loguru import logger
 
 from cohortify.candidate import Candidate
+from cohortify.metrics import Metrics
+from cohortify.registry import NameRegistry
+from cohortify.sink import JsonlSink
 
 
 class LogType(Enum):
@@ -14,13 +22,63 @@ class LogType(Enum):
     has_capacity_proposer = "Proposer Has Capacity"
     has_capacity_recipient = "Recipient Has Capacity"
     exceeds_capacity_proposer = "Proposer Exceeds Capacity"
-    exceeds_capacity_recipient = "Proposer Exceeds Capacity"
+    exceeds_capacity_recipient = "Recipient Exceeds Capacity"
     has_offers = "Proposer Has Offers Left"
     no_offers = "Proposer Has No Offers Left"
     accepts_offer = "Recipient Accents New Offer"
     rejects_offer = "Recipient Rejects New Offer"
 
 
+class Verbosity(Enum):
+    """Levels of detail recorded by the Logger class"""
+
+    off = "off"  # record nothing
+    counters = "counters"  # count each log type without recording entries
+    full = "full"  # record every entry and emit it through loguru
+
+
+MESSAGES: Dict[LogType, str] = {
+    LogType.init_round: (
+        "We are starting offer round {offer_round} with "
+        "{proposer} as the proposer"
+    ),
+    LogType.has_capacity_proposer: (
+        "{proposer} still has capacity for additional matches and "
+        "will be returned to the pool of proposers."
+    ),
+    LogType.has_capacity_recipient: (
+        "{recipient} has capacity for additional matches, "
+        "and will accept the offer from {proposer}."
+    ),
+    LogType.exceeds_capacity_proposer: (
+        "{proposer} meets or exceeds their capacity for matches "
+        "and will not be returned to the pool of proposers."
+    ),
+    LogType.exceeds_capacity_recipient: (
+        "{recipient} meets their capacity for matches, and will "
+        "compare the offer from {proposer} to their current "
+        "matches to determine which offer they will reject."
+    ),
+    LogType.has_offers: (
+        "{proposer} still has no offers left to make and will be "
+        "returned to the proposer pool."
+    ),
+    LogType.no_offers: (
+        "{proposer} does not have any offers left to make "
+        "and will not be returned to the pool of proposers."
+    ),
+    LogType.rejects_offer: (
+        "{recipient} did not prefer {proposer} to any of their "
+        "current matches and as a result rejects this new offer."
+    ),
+    LogType.accepts_offer: (
+        "{recipient} prefers {proposer} to {old_offer} "
+        "and as a result rejects the old offer from {old_offer} and "
+        "accepts the new offer from {proposer}."
+    ),
+}
+
+
 @dataclass
 class LogEntry:
     """Stores the details of a log entry"""
@@ -28,8 +86,20 @@ class LogEntry:
     offer_round: int
     proposer: str
     log_type: str
-    message: str
+    message: Optional[str] = None
     recipient: Optional[str] = None
+    old_offer: Optional[str] = None
+
+    def __post_init__(self) -> None:
+        # the LogStore only creates entries when they're read, so the
+        # message is built from the log type here unless one was passed
+        if self.message is None:
+            self.message = MESSAGES[LogType(self.log_type)].format(
+                offer_round=self.offer_round,
+                proposer=self.proposer,
+                recipient="N/A" if self.recipient is None else self.recipient,
+                old_offer=self.old_offer,
+            )
 
     def __repr__(self) -> str:
         return f"""{self.message}\n
@@ -41,14 +111,175 @@ class LogEntry:
         """
 
 
+LOG_TYPES: List[LogType] = list(LogType)
+# log types about the proposer alone, stored without the round's recipient
+NO_RECIPIENT = {LogType.has_offers, LogType.no_offers}
+LOG_CODES: Dict[LogType, int] = {t: code for code, t in enumerate(LOG_TYPES)}
+
+
+class LogStore:
+    """Columnar storage for the log entries recorded by the Logger
+
+    Each entry is stored as a row across parallel arrays of offer rounds,
+    interned name ids and log type codes. LogEntry objects, and the messages
+    they render, are only created when entries are read, and the store can be
+    iterated and indexed like the list of LogEntry it replaces.
+    """
+
+    def __init__(self, registry: Optional[NameRegistry] = None) -> None:
+        """Initializes the LogStore class
+
+        Parameters
+        ----------
+        registry: NameRegistry, optional
+            The registry that names are interned in, e.g. one shared with the
+            Matcher so the ids in the store are the ones it uses
+        """
+        self.registry = registry if registry is not None else NameRegistry()
+        self.rounds = array("q")
+        self.log_types = array("b")
+        self.proposers = array("q")
+        self.recipients = array("q")  # -1 if there's no recipient
+        self.old_offers = array("q")  # -1 if there's no old offer
+
+    def __len__(self) -> int:
+        return len(self.rounds)
+
+    def __iter__(self) -> Iterator[LogEntry]:
+        for i in range(len(self)):
+            yield self.entry(i)
+
+    def __getitem__(self, key: Union[int, slice]):
+        if isinstance(key, slice):
+            return [self.entry(i) for i in range(len(self))[key]]
+        return self.entry(range(len(self))[key])
+
+    def __repr__(self) -> str:
+        return f"LogStore({len(self)} entries)"
+
+    @property
+    def names(self) -> List[str]:
+        """The names of the registry, indexed by their id"""
+        return self.registry.names
+
+    @property
+    def name_ids(self) -> Dict[str, int]:
+        """The ids of the registry, keyed by name"""
+        return self.registry.ids
+
+    def intern(self, name: Optional[str]) -> int:
+        """Return the id of a name, adding it to the registry if needed"""
+        return self.registry.intern(name)
+
+    def append(
+        self,
+        offer_round: int,
+        log_type: LogType,
+        proposer: str,
+        recipient: Optional[str] = None,
+        old_offer: Optional[str] = None,
+    ) -> None:
+        """Add an entry to the end of the store"""
+        self.rounds.append(offer_round)
+        self.log_types.append(LOG_CODES[log_type])
+        self.proposers.append(self.intern(proposer))
+        self.recipients.append(self.intern(recipient))
+        self.old_offers.append(self.intern(old_offer))
+
+    def entry(self, i: int) -> LogEntry:
+        """Materialize the entry in row i as a LogEntry"""
+        recipient = self.recipients[i]
+        old_offer = self.old_offers[i]
+        return LogEntry(
+            offer_round=self.rounds[i],
+            proposer=self.names[self.proposers[i]],
+            log_type=LOG_TYPES[self.log_types[i]].value,
+            recipient=self.names[recipient] if recipient >= 0 else None,
+            old_offer=self.names[old_offer] if old_offer >= 0 else None,
+        )
+
+    def columns(self) -> Dict[str, np.ndarray]:
+        """Return zero-copy numpy views of each column in the store"""
+        return {
+            "rounds": np.frombuffer(self.rounds, dtype=np.int64),
+            "log_types": np.frombuffer(self.log_types, dtype=np.int8),
+            "proposers": np.frombuffer(self.proposers, dtype=np.int64),
+            "recipients": np.frombuffer(self.recipients, dtype=np.int64),
+            "old_offers": np.frombuffer(self.old_offers, dtype=np.int64),
+        }
+
+    def filter(
+        self,
+        offer_round: Optional[int] = None,
+        candidate: Optional[str] = None,
+        log_type: Optional[LogType] = None,
+    ) -> LogStore:
+        """Return a new LogStore with the entries that match every filter
+
+        Parameters
+        ----------
+        offer_round: int, optional
+            Only keep entries recorded during this offer round
+        candidate: str, optional
+            Only keep entries in which this candidate is the proposer, the
+            recipient or the old offer that was rejected
+        log_type: LogType, optional
+            Only keep entries of this log type
+        """
+        cols = self.columns()
+        mask = np.ones(len(self), dtype=bool)
+        if offer_round is not None:
+            mask &= cols["rounds"] == offer_round
+        if candidate is not None:
+            name_id = self.registry.get(candidate, -2)
+            mask &= (
+                (cols["proposers"] == name_id)
+                | (cols["recipients"] == name_id)
+                | (cols["old_offers"] == name_id)
+            )
+        if log_type is not None:
+            mask &= cols["log_types"] == LOG_CODES[log_type]
+        store = LogStore(self.registry)
+        for key, col in cols.items():
+            getattr(store, key).frombytes(col[mask].tobytes())
+        return store
+
+
 class Logger:
     """Records logs throughout a series of matching rounds"""
 
-    def __init__(self) -> None:
-        self.logs: list[LogEntry] = []
+    def __init__(
+        self,
+        verbosity: Union[str, Verbosity] = "full",
+        sink: Optional[JsonlSink] = None,
+        registry: Optional[NameRegistry] = None,
+    ) -> None:
+        """Initializes the Logger class
+
+        Parameters
+        ----------
+        verbosity: str | Verbosity, default "full"
+            The level of detail to record, must be one of:
+            - "off" records nothing
+            - "counters" only counts each log type in Logger.counts
+            - "full" also records each log in the Logger.logs LogStore
+        sink: JsonlSink, optional
+            A sink that streams every log to disk from a background thread,
+            unless verbosity is "off". When a sink is set logs are no longer
+            emitted through loguru, and combined with "counters" verbosity
+            the full audit trail is written without being kept in memory
+        registry: NameRegistry, optional
+            The registry the LogStore interns names in, see LogStore
+        """
+        self.verbosity = Verbosity(verbosity)
+        self.sink = sink
+        self.logs = LogStore(registry)
+        self.counts: Dict[LogType, int] = Counter()
         self._offer_round: Optional[int] = None
         self._proposer: Optional[Candidate] = None
         self._recipient: Optional[Candidate] = None
+        # set by Matcher for each run to time logging when instrumented
+        self.metrics: Optional[Metrics] = None
 
     @property
     def offer_round(self) -> int:
@@ -83,95 +314,96 @@ class Logger:
         self._proposer = proposer
         self._recipient = recipient
         # record log
-        message = (
-            f"We are starting offer round {self.offer_round} with "
-            f"{self.proposer} as the proposer"
-        )
-        self.record_log(message, LogType.init_round)
+        self.record_log(LogType.init_round)
 
     def has_capacity(self, kind: str) -> None:
         """Record that a proposer or recipient has capacity for new matches"""
         if kind == "proposer":
-            message = (
-                f"{self.proposer} still has capacity for additional matches and "
-                "will be returned to the pool of proposers."
-            )
-            self.record_log(message, LogType.has_capacity_proposer)
+            self.record_log(LogType.has_capacity_proposer)
         else:
-            message = (
-                f"{self.recipient} has capacity for additional matches, "
-                f"and will accept the offer from {self.proposer}."
-            )
-            self.record_log(message, LogType.has_capacity_recipient)
+            self.record_log(LogType.has_capacity_recipient)
 
     def exceeds_capacity(self, kind: str) -> None:
         """Record that a proposer or recipient has no capacity for new matches"""
         if kind == "proposer":
-            message = (
-                f"{self.proposer} meets or exceeds their capacity for matches "
-                "and will not be returned to the pool of proposers."
-            )
-            self.record_log(message, LogType.exceeds_capacity_proposer)
+            self.record_log(LogType.exceeds_capacity_proposer)
         else:
-            message = (
-                f"{self.recipient} meets their capacity for matches, and will "
-                f"compare the offer from {self.proposer} to their current "
-                "matches to determine which offer they will reject."
-            )
-            self.record_log(message, LogType.exceeds_capacity_recipient)
+            self.record_log(LogType.exceeds_capacity_recipient)
 
     def has_offers_left(self, candidate: Candidate) -> None:
         """Record that a proposer still has offers to make to recipients"""
-        message = (
-            f"{candidate.name} still has no offers left to make and will be "
-            "returned to the proposer pool."
-        )
         self.record_log(
-            message=message,
             log_type=LogType.has_offers,
-            proposer=candidate,
-            recipient="N/A",
+            proposer=candidate.name,
         )
 
     def no_offers_left(self):
         """Record that a proposer does not have any remaining offers to make"""
-        message = (
-            f"{self.proposer} does not have any offers left to make "
-            "and will not be returned to the pool of proposers."
-        )
-        self.record_log(message, LogType.no_offers, recipient="N/A")
+        self.record_log(LogType.no_offers)
 
     def new_offer_rejected(self):
         """Record that the recipient accepted an offer from the current proposer"""
-        message = (
-            f"{self.recipient} did not prefer {self.proposer} to any of their "
-            "current matches and as a result rejects this new offer."
-        )
-        self.record_log(message, LogType.rejects_offer)
+        self.record_log(LogType.rejects_offer)
 
     def new_offer_accepted(self, old_offer: Candidate) -> None:
         """Record that the recipient rejected an old offer to accept a new one"""
-        message = (
-            f"{self.recipient} prefers {self.proposer} to {old_offer.name} "
-            f"and as a result rejects the old offer from {old_offer.name} and "
-            f"accepts the new offer from {self.proposer}."
-        )
-        self.record_log(message, LogType.accepts_offer)
+        self.record_log(LogType.accepts_offer, old_offer=old_offer.name)
 
     def record_log(
         self,
-        message: str,
         log_type: LogType,
         proposer: str = None,
         recipient: str = None,
+        old_offer: str = None,
     ) -> None:
-        """Record a new log to std error and to the logs list"""
-        entry = LogEntry(
+        """Record a new log to std error or the sink and to the logs list
+
+        Messages aren't formatted here, LogEntry.message builds the text when
+        the entry is read, and nothing is stored unless verbosity is full.
+        """
+        if self.verbosity is Verbosity.off:
+            return
+        metrics = self.metrics
+        if metrics is None or not metrics.enabled:
+            self._record(log_type, proposer, recipient, old_offer)
+            return
+        start = time.perf_counter()
+        self._record(log_type, proposer, recipient, old_offer)
+        metrics.add_time("logging", time.perf_counter() - start)
+
+    def _record(
+        self,
+        log_type: LogType,
+        proposer: Optional[str],
+        recipient: Optional[str],
+        old_offer: Optional[str],
+    ) -> None:
+        """Count, stream and store a log, see record_log()"""
+        self.counts[log_type] += 1
+        proposer = proposer or self.proposer
+        if log_type not in NO_RECIPIENT:
+            recipient = recipient or self.recipient
+        if self.sink is not None:
+            self.sink.write(
+                (
+                    self.offer_round,
+                    log_type.value,
+                    proposer,
+                    recipient,
+                    old_offer,
+                )
+            )
+        if self.verbosity is Verbosity.counters:
+            return
+        self.logs.append(
             offer_round=self.offer_round,
-            proposer=proposer or self.proposer,
-            recipient=recipient or self.recipient,
-            log_type=log_type.value,
-            message=message,
+            log_type=log_type,
+            proposer=proposer,
+            recipient=recipient,
+            old_offer=old_offer,
         )
-        self.logs.append(entry)
-        logger.info(entry)
+        if self.sink is not None:
+            return
+        # lazy=True skips building the entry if no sink accepts INFO logs
+        index = len(self.logs) - 1
+        logger.opt(lazy=True).info("{}", lambda: self.logs.entry(index))
@@ -0,0 +1,574 @@
+from __future__ import annotations  # prevents NameErrors for typing
+import json
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple, Union
+
+import numpy as np
+
+Name = str
+Preferences = Dict[Name, List[Name]]
+
+FORMAT_VERSION = 1
+# arrays stored by Market.save(), one .npy file each
+ARRAYS = [
+    "p_offsets",
+    "p_targets",
+    "p_ranks",
+    "r_offsets",
+    "r_targets",
+    "r_ranks",
+]
+
+
+def _flatten(
+    prefs: Preferences,
+    index: Dict[Name, int],
+    strict: bool,
+) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """Convert a dictionary of preferences into CSR offsets and target ids
+
+    Parameters
+    ----------
+    prefs: Dict[Name, List[Name]]
+        Dictionary that maps each candidate to their ranked list of offers
+    index: Dict[Name, int]
+        Dictionary that maps each name on the other side to its integer id
+    strict: bool
+        If True raise a KeyError for names missing from the index, otherwise
+        silently drop those names from the preference lists
+
+    Returns
+    -------
+    Tuple[np.ndarray, np.ndarray, np.ndarray]
+        The row offsets, the target ids, and the 1-based rank of each target
+    """
+    lengths = np.fromiter(map(len, prefs.values()), np.int64, len(prefs))
+    rows = np.repeat(np.arange(len(prefs)), lengths)
+    starts = np.cumsum(lengths) - lengths
+    ranks = np.arange(len(rows), dtype=np.int64) - starts[rows] + 1
+    if strict:
+        targets = [
+            index[offer] for offers in prefs.values() for offer in offers
+        ]
+        targets = np.array(targets, dtype=np.int64)
+    else:
+        targets = [
+            index.get(offer, -1)
+            for offers in prefs.values()
+            for offer in offers
+        ]
+        targets = np.array(targets, dtype=np.int64)
+        known = targets >= 0
+        rows, targets, ranks = rows[known], targets[known], ranks[known]
+        lengths = np.bincount(rows, minlength=len(prefs))
+    offsets = np.concatenate([[0], np.cumsum(lengths)])
+    return offsets.astype(np.int64), targets, ranks
+
+
+def _cross_ranks(
+    src_offsets: np.ndarray,
+    src_targets: np.ndarray,
+    dst_offsets: np.ndarray,
+    dst_targets: np.ndarray,
+    dst_ranks: np.ndarray,
+) -> np.ndarray:
+    """Look up the rank each target assigns back to the source of each edge
+
+    Returns an array aligned with src_targets holding the 1-based rank that
+    the target of the edge gives to its source, or 0 if the target did not
+    rank the source at all.
+    """
+    n_src = len(src_offsets) - 1
+    src_rows = np.repeat(np.arange(n_src), np.diff(src_offsets))
+    dst_rows = np.repeat(np.arange(len(dst_offsets) - 1), np.diff(dst_offsets))
+    # key every edge by (target, source) so the two sides can be joined
+    src_keys = src_targets * n_src + src_rows
+    dst_keys = dst_rows * n_src + dst_targets
+    order = np.argsort(dst_keys, kind="stable")
+    sorted_keys = dst_keys[order]
+    # side="right" picks the last duplicate, mirroring Candidate.rankings
+    pos = np.searchsorted(sorted_keys, src_keys, side="right") - 1
+    found = pos >= 0
+    found[found] = sorted_keys[pos[found]] == src_keys[found]
+    cross = np.zeros(len(src_targets), dtype=np.int64)
+    cross[found] = dst_ranks[order[pos[found]]]
+    return cross
+
+
+@dataclass
+class PruneReport:
+    """Entries removed from preference lists by prune_preferences()
+
+    Each entry is a (ranker, ranked) pair of names.
+
+    Attributes
+    ----------
+    p_unknown: List[Tuple[str, str]]
+        Proposers' entries for recipients who didn't submit preferences
+    r_unknown: List[Tuple[str, str]]
+        Recipients' entries for proposers who didn't submit preferences
+    p_unacceptable: List[Tuple[str, str]]
+        Proposers' entries for recipients who didn't rank them back
+    r_unacceptable: List[Tuple[str, str]]
+        Recipients' entries for proposers who didn't rank them back
+    """
+
+    p_unknown: List[Tuple[Name, Name]] = field(default_factory=list)
+    r_unknown: List[Tuple[Name, Name]] = field(default_factory=list)
+    p_unacceptable: List[Tuple[Name, Name]] = field(default_factory=list)
+    r_unacceptable: List[Tuple[Name, Name]] = field(default_factory=list)
+
+    @property
+    def n_removed(self) -> int:
+        """Total number of entries removed from both sides"""
+        return (
+            len(self.p_unknown)
+            + len(self.r_unknown)
+            + len(self.p_unacceptable)
+            + len(self.r_unacceptable)
+        )
+
+
+def prune_preferences(
+    proposer_prefs: Preferences,
+    recipient_prefs: Preferences,
+) -> Tuple[Preferences, Preferences, PruneReport]:
+    """Remove unknown names and one-sided rankings from both sides' lists
+
+    A pair can only be matched if each side ranks the other, so every other
+    entry is dropped once up front instead of being skipped while matching.
+    Names are mapped to ids and each side's entries are joined with the
+    other side's as arrays, see Market.from_csr(). The order of each list
+    is kept, so matching the pruned lists gives the same result.
+
+    Parameters
+    ----------
+    proposer_prefs: Dict[Name, List[Name]]
+        Dictionary that maps a proposer to their ranked list of recipients
+    recipient_prefs: Dict[Name, List[Name]]
+        Dictionary that maps a recipient to their ranked list of proposers
+
+    Returns
+    -------
+    Tuple[Preferences, Preferences, PruneReport]
+        The pruned proposer and recipient preferences, and what was removed
+    """
+    p_index = {name: i for i, name in enumerate(proposer_prefs)}
+    r_index = {name: i for i, name in enumerate(recipient_prefs)}
+    p_rows, p_flat, p_ids = _entries(proposer_prefs, r_index)
+    r_rows, r_flat, r_ids = _entries(recipient_prefs, p_index)
+    p_known, r_known = p_ids >= 0, r_ids >= 0
+    p_csr = _csr(p_rows[p_known], p_ids[p_known], len(proposer_prefs))
+    r_csr = _csr(r_rows[r_known], r_ids[r_known], len(recipient_prefs))
+    # rank each target gives back to the ranker, 0 if they didn't rank them
+    p_back = _cross_ranks(p_csr[0], p_csr[1], *r_csr)
+    r_back = _cross_ranks(r_csr[0], r_csr[1], *p_csr)
+    p_keep, r_keep = p_known.copy(), r_known.copy()
+    p_keep[p_known] = p_back > 0
+    r_keep[r_known] = r_back > 0
+
+    p_names, r_names = list(proposer_prefs), list(recipient_prefs)
+    report = PruneReport(
+        p_unknown=_pairs(p_names, p_rows, p_flat, ~p_known),
+        r_unknown=_pairs(r_names, r_rows, r_flat, ~r_known),
+        p_unacceptable=_pairs(p_names, p_rows, p_flat, p_known & ~p_keep),
+        r_unacceptable=_pairs(r_names, r_rows, r_flat, r_known & ~r_keep),
+    )
+    return (
+        _regroup(p_names, p_rows, p_flat, p_keep),
+        _regroup(r_names, r_rows, r_flat, r_keep),
+        report,
+    )
+
+
+def _entries(
+    prefs: Preferences,
+    index: Dict[Name, int],
+) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """Return the row, name and id on the other side of every entry
+
+    Names missing from the index get an id of -1.
+    """
+    lengths = np.fromiter(map(len, prefs.values()), np.int64, len(prefs))
+    rows = np.repeat(np.arange(len(prefs)), lengths)
+    flat = np.empty(len(rows), dtype=object)
+    flat[:] = [name for ranked in prefs.values() for name in ranked]
+    ids = np.fromiter(
+        (index.get(name, -1) for name in flat), np.int64, len(rows)
+    )
+    return rows, flat, ids
+
+
+def _csr(
+    rows: np.ndarray,
+    targets: np.ndarray,
+    n_rows: int,
+) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """Return CSR offsets, targets and 1-based ranks of sorted entries"""
+    lengths = np.bincount(rows, minlength=n_rows)
+    offsets = np.concatenate([[0], np.cumsum(lengths)]).astype(np.int64)
+    ranks = np.arange(len(rows), dtype=np.int64) - offsets[rows] + 1
+    return offsets, targets, ranks
+
+
+def _pairs(
+    names: List[Name],
+    rows: np.ndarray,
+    flat: np.ndarray,
+    mask: np.ndarray,
+) -> List[Tuple[Name, Name]]:
+    """Return the (ranker, ranked) pairs of the entries selected by a mask"""
+    return [(names[row], name) for row, name in zip(rows[mask], flat[mask])]
+
+
+def _regroup(
+    names: List[Name],
+    rows: np.ndarray,
+    flat: np.ndarray,
+    keep: np.ndarray,
+) -> Preferences:
+    """Return the preferences made of the entries that are kept"""
+    lengths = np.bincount(rows[keep], minlength=len(names))
+    ranked = np.split(flat[keep], np.cumsum(lengths)[:-1])
+    return {name: row.tolist() for name, row in zip(names, ranked)}
+
+
+def save_names(path: Path, names: List[Name]) -> None:
+    """Save a table of names as NUL separated UTF-8 bytes in a .npy file"""
+    if any("\0" in name for name in names):
+        raise ValueError("Names can't contain NUL characters")
+    blob = "\0".join(names).encode("utf-8")
+    np.save(path, np.frombuffer(blob, dtype=np.uint8))
+
+
+def load_names(path: Path, count: int) -> List[Name]:
+    """Load a table of count names saved by save_names()"""
+    if count == 0:
+        return []
+    blob = np.load(path)
+    return blob.tobytes().decode("utf-8").split("\0")
+
+
+class Market:
+    """Integer-indexed representation of a two-sided matching market
+
+    Names on each side are mapped to dense integer ids once, and each side's
+    preferences are stored as CSR arrays: the preferences of candidate ``i``
+    are ``targets[offsets[i]:offsets[i + 1]]`` in ranked order. For every
+    edge we also store the 1-based rank that the target assigns back to the
+    candidate (0 if unranked), so deferred acceptance never needs to look up
+    a recipient's ranking while it runs.
+    """
+
+    def __init__(
+        self,
+        proposers: List[Name],
+        recipients: List[Name],
+        p_offsets: np.ndarray,
+        p_targets: np.ndarray,
+        p_ranks: np.ndarray,
+        r_offsets: np.ndarray,
+        r_targets: np.ndarray,
+        r_ranks: np.ndarray,
+    ) -> None:
+        """Initializes the Market class
+
+        Parameters
+        ----------
+        proposers: List[str]
+            The names of the proposers, position in the list is their id
+        recipients: List[str]
+            The names of the recipients, position in the list is their id
+        p_offsets: np.ndarray
+            CSR row offsets into p_targets for each proposer
+        p_targets: np.ndarray
+            Recipient ids in each proposer's ranked order
+        p_ranks: np.ndarray
+            Rank each recipient in p_targets assigns to the proposer
+        r_offsets: np.ndarray
+            CSR row offsets into r_targets for each recipient
+        r_targets: np.ndarray
+            Proposer ids in each recipient's ranked order
+        r_ranks: np.ndarray
+            Rank each proposer in r_targets assigns to the recipient
+        """
+        self.proposers = proposers
+        self.recipients = recipients
+        self.p_index = {name: i for i, name in enumerate(proposers)}
+        self.r_index = {name: i for i, name in enumerate(recipients)}
+        self.p_offsets = p_offsets
+        self.p_targets = p_targets
+        self.p_ranks = p_ranks
+        self.r_offsets = r_offsets
+        self.r_targets = r_targets
+        self.r_ranks = r_ranks
+        # set by Market.load(), lets pickles refer to the files on disk
+        self.path: Optional[Path] = None
+
+    def __reduce_ex__(self, protocol):
+        """Pickle a memory-mapped Market as its path instead of its arrays
+
+        Worker processes then map the same files and share their pages
+        through the OS instead of each receiving a copy of the arrays.
+        """
+        if self.path is None:
+            return super().__reduce_ex__(protocol)
+        return (Market.load, (self.path,))
+
+    @classmethod
+    def from_preferences(
+        cls,
+        proposer_prefs: Preferences,
+        recipient_prefs: Preferences,
+    ) -> Market:
+        """Build a Market from dictionaries of ranked preferences
+
+        Parameters
+        ----------
+        proposer_prefs: Dict[Name, List[Name]]
+            Dictionary that maps a proposer to their ranked list of recipients
+        recipient_prefs: Dict[Name, List[Name]]
+            Dictionary that maps a recipient to their ranked list of proposers
+
+        Raises
+        ------
+        KeyError
+            If a proposer ranks a recipient that isn't in recipient_prefs
+        """
+        proposers = list(proposer_prefs)
+        recipients = list(recipient_prefs)
+        p_index = {name: i for i, name in enumerate(proposers)}
+        r_index = {name: i for i, name in enumerate(recipients)}
+        p_offsets, p_targets, p_own = _flatten(proposer_prefs, r_index, True)
+        r_offsets, r_targets, r_own = _flatten(recipient_prefs, p_index, False)
+        return cls.from_csr(
+            proposers,
+            recipients,
+            (p_offsets, p_targets, p_own),
+            (r_offsets, r_targets, r_own),
+        )
+
+    @classmethod
+    def from_csr(
+        cls,
+        proposers: List[Name],
+        recipients: List[Name],
+        p_csr: Tuple[np.ndarray, np.ndarray, np.ndarray],
+        r_csr: Tuple[np.ndarray, np.ndarray, np.ndarray],
+    ) -> Market:
+        """Build a Market from each side's ranked lists as CSR arrays
+
+        Parameters
+        ----------
+        proposers: List[str]
+            The names of the proposers, position in the list is their id
+        recipients: List[str]
+            The names of the recipients, position in the list is their id
+        p_csr: Tuple[np.ndarray, np.ndarray, np.ndarray]
+            The row offsets, the recipient ids in ranked order and the rank
+            each proposer gives to them
+        r_csr: Tuple[np.ndarray, np.ndarray, np.ndarray]
+            The row offsets, the proposer ids in ranked order and the rank
+            each recipient gives to them
+        """
+        p_offsets, p_targets, p_own = p_csr
+        r_offsets, r_targets, r_own = r_csr
+        p_ranks = _cross_ranks(
+            p_offsets, p_targets, r_offsets, r_targets, r_own
+        )
+        r_ranks = _cross_ranks(
+            r_offsets, r_targets, p_offsets, p_targets, p_own
+        )
+        return cls(
+            proposers=proposers,
+            recipients=recipients,
+            p_offsets=p_offsets,
+            p_targets=p_targets,
+            p_ranks=p_ranks,
+            r_offsets=r_offsets,
+            r_targets=r_targets,
+            r_ranks=r_ranks,
+        )
+
+    @property
+    def n_proposers(self) -> int:
+        """Number of proposers in the market"""
+        return len(self.proposers)
+
+    @property
+    def n_recipients(self) -> int:
+        """Number of recipients in the market"""
+        return len(self.recipients)
+
+    def capacities(
+        self,
+        kind: str,
+        capacities: Dict[Name, int],
+        default_capacity: int = 1,
+    ) -> np.ndarray:
+        """Return an array of capacities aligned with the ids of one side
+
+        Parameters
+        ----------
+        kind: str
+            The side of the market, must be one of proposers or recipients
+        capacities: Dict[Name, int]
+            Dictionary of candidates mapped to their capacity for matches
+        default_capacity: int
+            Capacity for any candidate missing from the capacities dictionary
+        """
+        if kind not in ["proposers", "recipients"]:
+            raise KeyError
+        names = self.proposers if kind == "proposers" else self.recipients
+        return np.array(
+            [capacities.get(name, default_capacity) for name in names],
+            dtype=np.int64,
+        )
+
+    def transpose(self) -> Market:
+        """Return the market with the proposers and recipients swapped
+
+        Both sides' arrays are already stored, so the new market shares them
+        instead of being rebuilt from the preferences, e.g. to run deferred
+        acceptance with the recipients proposing.
+        """
+        return Market(
+            proposers=self.recipients,
+            recipients=self.proposers,
+            p_offsets=self.r_offsets,
+            p_targets=self.r_targets,
+            p_ranks=self.r_ranks,
+            r_offsets=self.p_offsets,
+            r_targets=self.p_targets,
+            r_ranks=self.p_ranks,
+        )
+
+    def components(self) -> List[Tuple[np.ndarray, np.ndarray]]:
+        """Split the market into groups that rank no one outside the group
+
+        Only pairs who rank each other can be matched, so the proposers and
+        recipients joined by such pairs form connected components whose
+        matches don't depend on anyone else. Components are found by
+        repeatedly giving both ends of every pair the smaller of their
+        labels, which takes a few passes over the market's arrays.
+
+        Returns
+        -------
+        List[Tuple[np.ndarray, np.ndarray]]
+            The proposer ids and recipient ids of each component, ordered by
+            their lowest proposer id. Candidates who share no mutual ranking
+            with anyone can't be matched and are left out
+        """
+        n_proposers = self.n_proposers
+        mutual = np.asarray(self.p_ranks) > 0
+        rows = np.repeat(np.arange(n_proposers), np.diff(self.p_offsets))
+        tails = rows[mutual]
+        heads = np.asarray(self.p_targets)[mutual] + n_proposers
+        labels = np.arange(n_proposers + self.n_recipients)
+        while True:
+            lowest = np.minimum(labels[tails], labels[heads])
+            new = labels.copy()
+            np.minimum.at(new, tails, lowest)
+            np.minimum.at(new, heads, lowest)
+            new = new[new]  # jump to the label of the label
+            if np.array_equal(new, labels):
+                break
+            labels = new
+        linked = np.zeros(len(labels), bool)
+        linked[tails] = linked[heads] = True
+        nodes = np.flatnonzero(linked)
+        nodes = nodes[np.argsort(labels[nodes], kind="stable")]
+        bounds = np.flatnonzero(np.diff(labels[nodes])) + 1
+        return [
+            (
+                group[group < n_proposers],
+                group[group >= n_proposers] - n_proposers,
+            )
+            for group in np.split(nodes, bounds)
+            if len(group)
+        ]
+
+    def preferences(self, kind: str = "proposers") -> Preferences:
+        """Return the ranked lists of one side as a dictionary of names
+
+        Parameters
+        ----------
+        kind: str, default "proposers"
+            The side of the market, must be one of proposers or recipients
+        """
+        if kind not in ["proposers", "recipients"]:
+            raise KeyError
+        if kind == "proposers":
+            names, others = self.proposers, np.array(self.recipients)
+            offsets, targets = self.p_offsets, self.p_targets
+        else:
+            names, others = self.recipients, np.array(self.proposers)
+            offsets, targets = self.r_offsets, self.r_targets
+        ranked = np.split(others[targets], offsets[1:-1])
+        return {name: row.tolist() for name, row in zip(names, ranked)}
+
+    def save(self, path: Union[str, Path]) -> None:
+        """Save the market to a directory of .npy files
+
+        Each CSR array is stored in its own .npy file, and the names of each
+        side in a name table, so Market.load() can memory-map them.
+
+        Parameters
+        ----------
+        path: str | Path
+            The directory to write, which is created if it doesn't exist
+        """
+        path = Path(path)
+        path.mkdir(parents=True, exist_ok=True)
+        for name in ARRAYS:
+            np.save(path / f"{name}.npy", np.asarray(getattr(self, name)))
+        save_names(path / "proposers.npy", self.proposers)
+        save_names(path / "recipients.npy", self.recipients)
+        meta = {
+            "format": FORMAT_VERSION,
+            "n_proposers": self.n_proposers,
+            "n_recipients": self.n_recipients,
+        }
+        (path / "market.json").write_text(json.dumps(meta))
+
+    @classmethod
+    def load(
+        cls,
+        path: Union[str, Path],
+        mmap_mode: Optional[str] = "r",
+    ) -> Market:
+        """Load a market saved by Market.save()
+
+        Parameters
+        ----------
+        path: str | Path
+            The directory the market was saved to
+        mmap_mode: str, default "r"
+            Passed to np.load(), by default the arrays are memory-mapped read
+            only so loading is instant and processes share the same pages.
+            Use None to read the arrays into memory instead
+
+        Raises
+        ------
+        ValueError
+            If the directory was written by an unsupported format version
+        """
+        path = Path(path)
+        meta = json.loads((path / "market.json").read_text())
+        if meta["format"] != FORMAT_VERSION:
+            raise ValueError(f"Unsupported market format {meta['format']}")
+        arrays = {
+            name: np.load(path / f"{name}.npy", mmap_mode=mmap_mode)
+            for name in ARRAYS
+        }
+        market = cls(
+            proposers=load_names(path / "proposers.npy", meta["n_proposers"]),
+            recipients=load_names(
+                path / "recipients.npy", meta["n_recipients"]
+            ),
+            **arrays,
+        )
+        if mmap_mode is not None:
+            market.path = path
+        return market
@@ -1,14 +1,36 @@
 from __future__ import annotations  # prevents NameErrors for typing
+import time
+from collections import Counter, deque
+from dataclasses import dataclass
 from typing import Dict, List, Tuple, Optional, Union
 
+import numpy as np
+
 from cohortify.candidate import Candidate, CandidateList
-from cohortify.logger import Logger, LogEntry
+from cohortify.engine import (
+    EXHAUSTED,
+    REJECTED,
+    MatchState,
+    deferred_acceptance,
+    resume,
+    round_deferred_acceptance,
+    warm_start,
+)
+from cohortify.logger import Logger, LogStore, Verbosity
+from cohortify.market import Market, PruneReport, prune_preferences
+from cohortify.metrics import Metrics, MetricsHook
+from cohortify.registry import NameRegistry
+from cohortify.sink import JsonlSink
+from cohortify.stability import StabilityReport, verify_matching
+from cohortify.sweep import Scenario, ScenarioSummary, run_scenarios
 
 Member = str
 Preferences = Dict[Member, List[Member]]
 Capacity = Dict[Member, int]
 Match = Tuple[Member, Member]
 
+ENGINES = ["object", "array", "rounds"]
+
 
 class MatchResult:
     """Stores results of a matching between proposers and recipients"""
@@ -17,9 +39,11 @@ class MatchResult:
         self,
         proposers: CandidateList,
         recipients: CandidateList,
-        match_logs: list[LogEntry],
+        match_logs: LogStore,
         p_min: int = 0,
         r_min: int = 0,
+        state: Optional[MatchState] = None,
+        metrics: Optional[Metrics] = None,
     ) -> None:
         """Initializes the matcher result class
 
@@ -29,29 +53,86 @@ class MatchResult:
             The list of candidates who made offers to recipients during the match
         recipients: CandidateList
             The list of candidates who accepted or rejected offers from proposers
+        match_logs: LogStore
+            The logs recorded during the match, which can be iterated over as
+            LogEntry objects or filtered with LogStore.filter()
         p_min: int
             The minimum number of matches we expected proposers to have
         r_min: int
             The minimum number of matches we expected recipients to have
+        state: MatchState, optional
+            The state of the array engine at the end of the match, which lets
+            Matcher.rematch() resume from this result after changes
+        metrics: Metrics, optional
+            The timers and counters recorded during the match, which are
+            empty unless the Matcher was instrumented
         """
         self.proposers = proposers
         self.recipients = recipients
         self.match_logs = match_logs
         self.p_min = p_min
         self.r_min = r_min
+        self.state = state
+        self.metrics = metrics or Metrics(enabled=False)
+        # indexes built on first access, see matches and get_remaining()
+        self._matches: Optional[List[Match]] = None
+        self._by_proposer: Optional[Dict[Member, List[Member]]] = None
+        self._by_recipient: Optional[Dict[Member, List[Member]]] = None
+        self._remaining: Dict[str, List[Candidate]] = {}
 
     @property
     def matches(self) -> List[Match]:
-        """Return a list of matches between proposers and recipients"""
-        match_list = []
-        for p_name, proposer in self.proposers.items():
-            matches = proposer.matches
-            match_list.extend([(p_name, r_name) for r_name in matches])
-        return match_list
+        """Return a list of matches between proposers and recipients
+
+        The list is built once on first access and shared by every later
+        call, so it shouldn't be modified in place.
+        """
+        if self._matches is None:
+            self._matches = [
+                (p_name, r_name)
+                for p_name, r_names in self.by_proposer.items()
+                for r_name in r_names
+            ]
+        return self._matches
+
+    @property
+    def by_proposer(self) -> Dict[Member, List[Member]]:
+        """Return each proposer mapped to the recipients they matched with"""
+        if self._by_proposer is None:
+            self._by_proposer = _index(self.proposers)
+        return self._by_proposer
+
+    @property
+    def by_recipient(self) -> Dict[Member, List[Member]]:
+        """Return each recipient mapped to the proposers they matched with"""
+        if self._by_recipient is None:
+            self._by_recipient = _index(self.recipients)
+        return self._by_recipient
+
+    def match_counts(self, kind: str = "proposers") -> Dict[int, int]:
+        """Return a histogram of the number of matches per candidate
+
+        Parameters
+        ----------
+        kind: str, default "proposers"
+            The kind of candidate to count, must one of proposers or recipients
+
+        Returns
+        -------
+        Dict[int, int]
+            The number of candidates with each number of matches, sorted by
+            the number of matches
+        """
+        index = self._side(kind)[0]
+        counts = Counter(map(len, index.values()))
+        return dict(sorted(counts.items()))
 
     def get_remaining(self, kind: str = "proposers") -> List[Candidate]:
         """Returns candidates that have fewer than the minimum match threshold
 
+        The list is built once per kind on first access and shared by every
+        later call, so it shouldn't be modified in place.
+
         Parameters
         ----------
         kind: str, default "proposers"
@@ -63,15 +144,138 @@ class MatchResult:
             List of candidates who have fewer matches than either the p_min or
             the r_min for proposers and recipients, respectively
         """
+        if kind not in self._remaining:
+            index, candidates, min_matches = self._side(kind)
+            self._remaining[kind] = [
+                candidates.get(name)
+                for name, matches in index.items()
+                if len(matches) < min_matches
+            ]
+        return self._remaining[kind]
+
+    def verify(self) -> StabilityReport:
+        """Check that the matches are stable, acceptable and within capacity
+
+        Runs verify_matching() on the market of the array engine, or on a
+        market built from the candidates' preferences for the object engine,
+        which takes near-linear time so it can be run after every match.
+        Unknown names are pruned from the preferences before building it,
+        since nobody can be matched to them.
+
+        Returns
+        -------
+        StabilityReport
+            The blocking pairs, unacceptable matches and capacity violations,
+            check StabilityReport.is_stable for a quick answer
+        """
+        if self.state is not None:
+            market = self.state.market
+        else:
+            p_prefs, r_prefs, _ = prune_preferences(
+                {name: c.prefs for name, c in self.proposers.items()},
+                {name: c.prefs for name, c in self.recipients.items()},
+            )
+            market = Market.from_preferences(p_prefs, r_prefs)
+        p_caps = {name: c.capacity for name, c in self.proposers.items()}
+        r_caps = {name: c.capacity for name, c in self.recipients.items()}
+        return verify_matching(
+            market,
+            self.matches,
+            p_capacity=market.capacities("proposers", p_caps),
+            r_capacity=market.capacities("recipients", r_caps),
+        )
+
+    def to_dataframe(self, table: str = "matches"):
+        """Export the matches or the remaining candidates as a DataFrame
+
+        Parameters
+        ----------
+        table: str, default "matches"
+            The table to export, must be one of:
+            - "matches" with the proposer and recipient of each match
+            - "remaining" with the kind, name and number of matches of each
+              candidate returned by get_remaining() for either kind
+
+        Returns
+        -------
+        pd.DataFrame
+            The table with one row per match or remaining candidate
+        """
+        import pandas as pd  # pylint: disable=import-outside-toplevel
+
+        return pd.DataFrame(self._columns(table))
+
+    def to_arrow(self, table: str = "matches"):
+        """Export the matches or the remaining candidates as an Arrow table
+
+        Requires the optional pyarrow package, see to_dataframe() for the
+        columns of each table.
+        """
+        # pylint: disable=import-outside-toplevel,import-error
+        import pyarrow as pa
+
+        return pa.table(self._columns(table))
+
+    def _side(self, kind: str) -> Tuple[Dict, CandidateList, int]:
+        """Return the index, candidates and minimum matches for one kind"""
         if kind not in ["proposers", "recipients"]:
             raise KeyError
         if kind == "proposers":
-            candidates = self.proposers.candidates.values()
-            min_matches = self.p_min
-        else:
-            candidates = self.recipients.candidates.values()
-            min_matches = self.r_min
-        return [c for c in candidates if len(c.matches) < min_matches]
+            return self.by_proposer, self.proposers, self.p_min
+        return self.by_recipient, self.recipients, self.r_min
+
+    def _columns(self, table: str) -> Dict[str, list]:
+        """Return the columns of a table for to_dataframe() and to_arrow()"""
+        if table not in ["matches", "remaining"]:
+            raise KeyError(table)
+        if table == "matches":
+            matches = self.matches
+            return {
+                "proposer": [p for p, _ in matches],
+                "recipient": [r for _, r in matches],
+            }
+        columns: Dict[str, list] = {"kind": [], "name": [], "n_matches": []}
+        for kind in ["proposers", "recipients"]:
+            index = self._side(kind)[0]
+            names = [c.name for c in self.get_remaining(kind)]
+            columns["kind"].extend([kind] * len(names))
+            columns["name"].extend(names)
+            columns["n_matches"].extend(len(index[name]) for name in names)
+        return columns
+
+
+@dataclass
+class ExtremalMatchings:
+    """The proposer-optimal and recipient-optimal stable matchings
+
+    Every stable matching gives each candidate a match between their matches
+    in these two, so candidates whose matches are the same in both have that
+    match in every stable matching.
+
+    Attributes
+    ----------
+    proposer_optimal: MatchResult
+        The stable matching every proposer likes best, found by deferred
+        acceptance with the proposers making offers
+    recipient_optimal: MatchResult
+        The stable matching every recipient likes best, found by deferred
+        acceptance with the recipients making offers. Proposers are still
+        the proposers of this result
+    p_differ: List[str]
+        Proposers whose matches differ between the two matchings
+    r_differ: List[str]
+        Recipients whose matches differ between the two matchings
+    """
+
+    proposer_optimal: MatchResult
+    recipient_optimal: MatchResult
+    p_differ: List[Member]
+    r_differ: List[Member]
+
+    @property
+    def is_unique(self) -> bool:
+        """Is there only one stable matching?"""
+        return not (self.p_differ or self.r_differ)
 
 
 class Matcher:
@@ -81,6 +285,13 @@ class Matcher:
         self,
         proposer_prefs: Preferences,
         recipient_prefs: Preferences,
+        engine: str = "object",
+        verbosity: Union[str, Verbosity] = "full",
+        log_sink: Optional[JsonlSink] = None,
+        instrument: bool = False,
+        metrics_hook: Optional[MetricsHook] = None,
+        prune: bool = False,
+        registry: Optional[NameRegistry] = None,
     ):
         """Initializes the Matcher class for interview or placement matching
 
@@ -90,10 +301,139 @@ class Matcher:
             Dictionary that maps a proposer to their ranked list of recipients
         recipient_prefs: Dict[Member, List[Members]]
             Dictionary that maps a recipient to their ranked list of proposers
+        engine: str, default "object"
+            The engine used to run deferred acceptance, must be one of:
+            - "object" walks Candidate objects and records a log every round
+            - "array" maps names to integer ids and runs on a Market's arrays,
+              which is much faster for large markets but records no logs
+            - "rounds" also runs on a Market's arrays, but every free
+              proposer makes their offers at once in each round and every
+              recipient resolves them with numpy, which is fastest for very
+              large markets and gives the same matches. Its results can't be
+              resumed, so rematch() matches the updated market from scratch
+        verbosity: str | Verbosity, default "full"
+            The level of detail recorded by the Logger, must be one of "off",
+            "counters" or "full"
+        log_sink: JsonlSink, optional
+            A sink that streams logs to a JSONL file from a background thread
+            instead of emitting them through loguru on the matching thread
+        instrument: bool, default False
+            If True each run records timers for its phases and counters of
+            offer rounds, rejections and evictions in MatchResult.metrics
+        metrics_hook: Callable[[str, Dict], None], optional
+            Called with "match" and the timers and counters after every run
+            while instrument is True, e.g. to export them to a metrics system
+        prune: bool, default False
+            If True unknown names and pairs that didn't rank each other are
+            removed from both sides' preferences once, up front, so offers
+            never have to be checked while matching. What was removed is
+            kept in Matcher.prune_report, see prune_preferences()
+        registry: NameRegistry, optional
+            The registry that the logs intern names in as they're recorded,
+            pass the same one to a Scheduler to share the ids across a
+            pipeline
+        """
+        if engine not in ENGINES:
+            raise KeyError(engine)
+        self.registry = registry if registry is not None else NameRegistry()
+        self.prune = prune
+        self.prune_report: Optional[PruneReport] = None
+        # the preferences before pruning, which rematch() applies changes to
+        self._unpruned = (proposer_prefs, recipient_prefs)
+        if prune:
+            (
+                proposer_prefs,
+                recipient_prefs,
+                self.prune_report,
+            ) = prune_preferences(proposer_prefs, recipient_prefs)
+        self._proposer_prefs: Optional[Preferences] = proposer_prefs
+        self._recipient_prefs: Optional[Preferences] = recipient_prefs
+        self.engine = engine
+        self.log = Logger(verbosity, sink=log_sink, registry=self.registry)
+        self.instrument = instrument
+        self.metrics_hook = metrics_hook
+        # reused by the array engine instead of rebuilding it, see from_market
+        self.market: Optional[Market] = None
+
+    @property
+    def proposer_prefs(self) -> Preferences:
+        """Each proposer's ranked list of recipients
+
+        If the Matcher was created with from_market(), they're built from
+        Matcher.market the first time they're needed.
+        """
+        if self._proposer_prefs is None:
+            self._proposer_prefs = self.market.preferences("proposers")
+        return self._proposer_prefs
+
+    @proposer_prefs.setter
+    def proposer_prefs(self, prefs: Preferences) -> None:
+        self._proposer_prefs = prefs
+
+    @property
+    def recipient_prefs(self) -> Preferences:
+        """Each recipient's ranked proposers, see Matcher.proposer_prefs"""
+        if self._recipient_prefs is None:
+            self._recipient_prefs = self.market.preferences("recipients")
+        return self._recipient_prefs
+
+    @recipient_prefs.setter
+    def recipient_prefs(self, prefs: Preferences) -> None:
+        self._recipient_prefs = prefs
+
+    @classmethod
+    def from_market(cls, market: Market, **kwargs) -> Matcher:
+        """Create a Matcher for a Market, e.g. one from load_preferences()
+
+        The market is kept in Matcher.market, so the array engine and sweep()
+        use its arrays directly. The preference dictionaries are only built
+        from it when they're first needed, e.g. by the object engine or to
+        build a MatchResult, unless prune is True since pruning works on them.
+
+        Parameters
+        ----------
+        market: Market
+            The integer-indexed market to match
+        **kwargs
+            Any other arguments accepted by Matcher
+        """
+        if kwargs.get("prune"):
+            matcher = cls(
+                market.preferences("proposers"),
+                market.preferences("recipients"),
+                **kwargs,
+            )
+        else:
+            matcher = cls({}, {}, **kwargs)
+            matcher.proposer_prefs = matcher.recipient_prefs = None
+        matcher.market = market
+        return matcher
+
+    def _names(self, kind: str) -> List[Member]:
+        """Return the names of the proposers or recipients
+
+        They're read from Matcher.market when it's set, so capacities can be
+        filled in without building the preference dictionaries.
+        """
+        if self.market is not None:
+            return getattr(self.market, kind)
+        if kind == "proposers":
+            return list(self.proposer_prefs)
+        return list(self.recipient_prefs)
+
+    def build_market(self) -> Market:
+        """Return Matcher.market if set, otherwise build it from preferences
+
+        After editing proposer_prefs or recipient_prefs of a Matcher created
+        with from_market(), set Matcher.market to None so the market is
+        rebuilt. rematch() keeps it up to date by itself.
         """
-        self.proposer_prefs = proposer_prefs
-        self.recipient_prefs = recipient_prefs
-        self.log = Logger()
+        if self.market is not None:
+            return self.market
+        return Market.from_preferences(
+            self.proposer_prefs,
+            self.recipient_prefs,
+        )
 
     def assign_matches(
         self,
@@ -131,13 +471,44 @@ class Matcher:
 
         # TODO: refactor these lines
         if isinstance(p_capacity, int):
-            p_capacity = {p: p_capacity for p in self.proposer_prefs}
+            p_capacity = {p: p_capacity for p in self._names("proposers")}
         if isinstance(r_capacity, int):
-            r_capacity = {r: r_capacity for r in self.recipient_prefs}
+            r_capacity = {r: r_capacity for r in self._names("recipients")}
+
+        metrics = Metrics(self.instrument, self.metrics_hook)
+        self.log.metrics = metrics
+        args = (p_capacity, r_capacity, p_min, r_min, metrics)
+        if self.engine == "object":
+            return self._assign_objects(*args)
+        with metrics.phase("market"):
+            market = self.build_market()
+        if self.engine == "rounds":
+            return self._assign_rounds(market, *args)
+        state = MatchState(
+            market,
+            p_capacity=market.capacities("proposers", p_capacity),
+            r_capacity=market.capacities("recipients", r_capacity),
+        )
+        with metrics.phase("proposals"):
+            resume(state, range(market.n_proposers))
+        return self.array_result(state, *args)
 
-        recipients = CandidateList(self.recipient_prefs, r_capacity)
-        proposers = CandidateList(self.proposer_prefs, p_capacity)
-        proposers_left = proposers.to_list()
+    def _assign_objects(
+        self,
+        p_capacity: Capacity,
+        r_capacity: Capacity,
+        p_min: int,
+        r_min: int,
+        metrics: Metrics,
+    ) -> MatchResult:
+        """Match with the object engine, see assign_matches()"""
+        with metrics.phase("candidate_lists"):
+            recipients = CandidateList(self.recipient_prefs, r_capacity)
+            proposers = CandidateList(self.proposer_prefs, p_capacity)
+        proposers_left = deque(proposers.to_list())
+        queued = set(proposers_left)
+        tally: Counter = Counter()
+        start = time.perf_counter()
 
         # start the deferred acceptance algorithm
         offer_round = 0
@@ -145,7 +516,8 @@ class Matcher:
             offer_round += 1
 
             # get the next proposer with an offer to make
-            proposer = proposers.get(proposers_left.pop(0))
+            proposer = proposers.get(proposers_left.popleft())
+            queued.discard(proposer.name)
             recipient = self.get_next_valid_offer(proposer, recipients)
             self.log.init_round(offer_round, proposer, recipient)
 
@@ -158,36 +530,354 @@ class Matcher:
                 self.match(proposer, recipient)
             else:
                 self.log.exceeds_capacity(kind="recipient")
-                # if the recipient prefers this offer to their current matches
-                # replace the lowest ranked match with the new proposer
-                rejected = recipient.compare_offers(proposer.name)
-                if proposer.name != rejected:
-                    rejected = proposers.get(rejected)
-                    self.log.new_offer_accepted(old_offer=rejected)
-                    self.replace_current_match(
-                        recipient=recipient,
-                        old_match=rejected,
-                        new_match=proposer,
-                    )
-                    if rejected.has_offers:
-                        self.log.has_offers_left(candidate=rejected)
-                        proposers_left.append(rejected.name)
-                else:
-                    self.log.new_offer_rejected()
+                rejected = self._compare_offers(
+                    proposer, recipient, proposers, tally, metrics.enabled
+                )
+                if (
+                    rejected is not None
+                    and rejected.has_offers()
+                    and rejected.name not in queued
+                ):
+                    self.log.has_offers_left(candidate=rejected)
+                    proposers_left.append(rejected.name)
+                    queued.add(rejected.name)
 
             # if they have capacity, add the proposer back to the pool
             if proposer.has_capacity:
                 self.log.has_capacity(kind="proposer")
-                proposers_left.append(proposer)
+                if proposer.name not in queued:
+                    proposers_left.append(proposer.name)
+                    queued.add(proposer.name)
             else:
                 self.log.exceeds_capacity(kind="proposer")
 
+        metrics.add_time("proposals", time.perf_counter() - start)
+        metrics.add_time("compare_offers", tally["compare_offers"])
+        metrics.count("offer_rounds", offer_round)
+        metrics.count("rejections", tally["rejections"])
+        metrics.count("evictions", tally["evictions"])
+        metrics.export("match")
         return MatchResult(
             proposers=proposers,
             recipients=recipients,
             match_logs=self.log.logs,
             p_min=p_min,
             r_min=r_min,
+            metrics=metrics,
+        )
+
+    def _compare_offers(
+        self,
+        proposer: Candidate,
+        recipient: Candidate,
+        proposers: CandidateList,
+        tally: Counter,
+        timed: bool,
+    ) -> Optional[Candidate]:
+        """Offer a match to a recipient who is already at capacity
+
+        If the recipient prefers this offer to their current matches, their
+        lowest ranked match is replaced with the new proposer. Evictions and
+        rejections are counted in tally, along with the time spent comparing
+        offers if timed is True.
+
+        Returns
+        -------
+        Candidate, optional
+            The proposer who was evicted, or None if the offer was rejected
+        """
+        if timed:
+            compare_start = time.perf_counter()
+            rejected = recipient.compare_offers(proposer.name)
+            tally["compare_offers"] += time.perf_counter() - compare_start
+        else:
+            rejected = recipient.compare_offers(proposer.name)
+        if proposer.name == rejected:
+            tally["rejections"] += 1
+            self.log.new_offer_rejected()
+            return None
+        tally["evictions"] += 1
+        rejected = proposers.get(rejected)
+        self.log.new_offer_accepted(old_offer=rejected)
+        self.replace_current_match(
+            recipient=recipient,
+            old_match=rejected,
+            new_match=proposer,
+        )
+        return rejected
+
+    def _assign_rounds(
+        self,
+        market: Market,
+        p_capacity: Capacity,
+        r_capacity: Capacity,
+        p_min: int,
+        r_min: int,
+        metrics: Metrics,
+    ) -> MatchResult:
+        """Match the market with the rounds engine, see assign_matches()"""
+        stats: Dict[str, int] = {}
+        with metrics.phase("proposals"):
+            held = round_deferred_acceptance(
+                market,
+                p_capacity=market.capacities("proposers", p_capacity),
+                r_capacity=market.capacities("recipients", r_capacity),
+                stats=stats,
+            )
+        metrics.count("rounds", stats["rounds"])
+        metrics.count("offers", stats["offers"])
+        metrics.count("rejections", stats["rejections"])
+        result = self._held_result(
+            market, held, p_capacity, r_capacity, p_min, r_min, metrics
+        )
+        metrics.export("match")
+        return result
+
+    def extremal_matchings(
+        self,
+        p_capacity: Union[int, Capacity] = 1,
+        r_capacity: Union[int, Capacity] = 1,
+        p_min: int = 0,
+        r_min: int = 0,
+    ) -> ExtremalMatchings:
+        """Find both the proposer-optimal and recipient-optimal matchings
+
+        The market is built once and deferred acceptance runs on it with each
+        side making the offers, using Market.transpose() for the recipients,
+        so no CandidateList or logs are built while matching. Parameters are
+        the same as assign_matches(), the "rounds" engine is used if it's the
+        Matcher's engine and the "array" engine otherwise.
+
+        Returns
+        -------
+        ExtremalMatchings
+            Both matchings and the candidates whose matches differ between
+            them, which are the only ones with more than one stable match
+        """
+        if isinstance(p_capacity, int):
+            p_capacity = {p: p_capacity for p in self._names("proposers")}
+        if isinstance(r_capacity, int):
+            r_capacity = {r: r_capacity for r in self._names("recipients")}
+
+        metrics = Metrics(self.instrument, self.metrics_hook)
+        with metrics.phase("market"):
+            market = self.build_market()
+            transposed = market.transpose()
+        p_caps = market.capacities("proposers", p_capacity)
+        r_caps = market.capacities("recipients", r_capacity)
+        state = None
+        with metrics.phase("proposals"):
+            if self.engine == "rounds":
+                held = round_deferred_acceptance(market, p_caps, r_caps)
+                p_held = round_deferred_acceptance(transposed, r_caps, p_caps)
+            else:
+                state = MatchState(market, p_caps, r_caps)
+                resume(state, range(market.n_proposers))
+                held = state.held_proposers()
+                p_held = deferred_acceptance(transposed, r_caps, p_caps)
+        # the recipients held each proposer, so regroup them by recipient
+        r_held: List[List[int]] = [[] for _ in range(market.n_recipients)]
+        for p_id, r_ids in enumerate(p_held):
+            for r_id in r_ids:
+                r_held[r_id].append(p_id)
+
+        # pairs matched in only one of the two matchings, keyed by their ids
+        n_recipients = max(market.n_recipients, 1)
+        differ = np.setxor1d(
+            _pair_keys(held, n_recipients), _pair_keys(r_held, n_recipients)
+        )
+        p_differ = np.unique(differ // n_recipients).tolist()
+        r_differ = np.unique(differ % n_recipients).tolist()
+        metrics.count("p_differ", len(p_differ))
+        metrics.count("r_differ", len(r_differ))
+        args = (p_capacity, r_capacity, p_min, r_min, metrics)
+        extremal = ExtremalMatchings(
+            proposer_optimal=self._held_result(market, held, *args, state),
+            recipient_optimal=self._held_result(market, r_held, *args),
+            p_differ=[market.proposers[p] for p in p_differ],
+            r_differ=[market.recipients[r] for r in r_differ],
+        )
+        metrics.export("extremal")
+        return extremal
+
+    def sweep(
+        self,
+        scenarios: List[Scenario],
+        n_jobs: int = 1,
+    ) -> List[ScenarioSummary]:
+        """Match the same preferences under several capacities and minimums
+
+        The preferences are converted to a Market once and every scenario is
+        matched with the array engine on that shared, read-only market, so
+        no CandidateList or logs are built for each run.
+
+        Parameters
+        ----------
+        scenarios: List[Scenario]
+            The capacities and minimums to match, in any order
+        n_jobs: int, default 1
+            The number of processes used to run the scenarios, or -1 to use
+            every CPU. Each worker receives a copy of the market only once
+
+        Returns
+        -------
+        List[ScenarioSummary]
+            A summary of the matching for each scenario, in the same order
+        """
+        return run_scenarios(self.build_market(), scenarios, n_jobs)
+
+    def array_result(
+        self,
+        state: MatchState,
+        p_capacity: Capacity,
+        r_capacity: Capacity,
+        p_min: int = 0,
+        r_min: int = 0,
+        metrics: Optional[Metrics] = None,
+    ) -> MatchResult:
+        """Build a MatchResult from the final state of the array engine"""
+        metrics = metrics or Metrics(enabled=False)
+        if metrics.enabled:
+            # every row of the event log is one proposer taken from the queue
+            outcome = state.events()["outcome"]
+            metrics.count("offer_rounds", int((outcome != EXHAUSTED).sum()))
+            metrics.count("rejections", int((outcome == REJECTED).sum()))
+            metrics.count("evictions", int((outcome >= 0).sum()))
+        result = self._held_result(
+            state.market,
+            state.held_proposers(),
+            p_capacity,
+            r_capacity,
+            p_min,
+            r_min,
+            metrics,
+            state,
+        )
+        metrics.export("match")
+        return result
+
+    def _held_result(
+        self,
+        market: Market,
+        held: List[List[int]],
+        p_capacity: Capacity,
+        r_capacity: Capacity,
+        p_min: int,
+        r_min: int,
+        metrics: Metrics,
+        state: Optional[MatchState] = None,
+    ) -> MatchResult:
+        """Build a MatchResult from the proposer ids held by each recipient"""
+        with metrics.phase("candidate_lists"):
+            recipients = CandidateList(self.recipient_prefs, r_capacity)
+            proposers = CandidateList(self.proposer_prefs, p_capacity)
+            for r_id, p_ids in enumerate(held):
+                recipient = recipients.get(market.recipients[r_id])
+                for p_id in p_ids:
+                    proposer = proposers.get(market.proposers[p_id])
+                    self.match(proposer, recipient)
+        return MatchResult(
+            proposers=proposers,
+            recipients=recipients,
+            match_logs=self.log.logs,
+            p_min=p_min,
+            r_min=r_min,
+            state=state,
+            metrics=metrics,
+        )
+
+    def rematch(
+        self,
+        result: MatchResult,
+        proposer_prefs: Optional[Dict[Member, Optional[List[Member]]]] = None,
+        recipient_prefs: Optional[Dict[Member, Optional[List[Member]]]] = None,
+        p_capacity: Optional[Capacity] = None,
+        r_capacity: Optional[Capacity] = None,
+    ) -> MatchResult:
+        """Apply changes to preferences and resume from a previous result
+
+        Only proposers affected by the changes re-enter deferred acceptance,
+        but the result is the same as calling assign_matches() again with the
+        updated preferences. The changes are also applied to
+        Matcher.proposer_prefs and Matcher.recipient_prefs.
+
+        Parameters
+        ----------
+        result: MatchResult
+            A previous result from this Matcher. If it wasn't produced by the
+            array engine the updated market is matched from scratch instead
+        proposer_prefs: Dict[Member, List[Member] | None], optional
+            New ranked lists for proposers who changed or were added, or None
+            for proposers who withdrew
+        recipient_prefs: Dict[Member, List[Member] | None], optional
+            New ranked lists for recipients who changed or were added, or None
+            for recipients who withdrew, who are also dropped from the
+            lists of every proposer that ranked them
+        p_capacity: Capacity, optional
+            New capacities for proposers, new proposers default to 1
+        r_capacity: Capacity, optional
+            New capacities for recipients, new recipients default to 1
+
+        Returns
+        -------
+        MatchResult
+            The result of matching the updated market
+        """
+        p_changes = dict(proposer_prefs or {})
+        r_changes = dict(recipient_prefs or {})
+        # proposers can't rank recipients who withdrew, so drop them
+        withdrawn = {r for r, ranked in r_changes.items() if ranked is None}
+        if withdrawn and not self.prune:
+            for name, ranked in {**self.proposer_prefs, **p_changes}.items():
+                if ranked is not None and withdrawn.intersection(ranked):
+                    p_changes[name] = [r for r in ranked if r not in withdrawn]
+        if self.prune:
+            p_full = _apply_changes(self._unpruned[0], p_changes)
+            r_full = _apply_changes(self._unpruned[1], r_changes)
+            self._unpruned = (p_full, r_full)
+            p_prefs, r_prefs, self.prune_report = prune_preferences(
+                p_full, r_full
+            )
+            # pruning also changes the lists of people who didn't edit theirs
+            p_changes.update(_edits(self.proposer_prefs, p_prefs))
+            r_changes.update(_edits(self.recipient_prefs, r_prefs))
+            self.proposer_prefs, self.recipient_prefs = p_prefs, r_prefs
+        else:
+            self.proposer_prefs = _apply_changes(
+                self.proposer_prefs, p_changes
+            )
+            self.recipient_prefs = _apply_changes(
+                self.recipient_prefs, r_changes
+            )
+        p_caps = {n: c.capacity for n, c in result.proposers.items()}
+        r_caps = {n: c.capacity for n, c in result.recipients.items()}
+        p_caps.update(p_capacity or {})
+        r_caps.update(r_capacity or {})
+        if result.state is None:
+            return self.assign_matches(
+                p_caps, r_caps, result.p_min, result.r_min
+            )
+
+        metrics = Metrics(self.instrument, self.metrics_hook)
+        self.log.metrics = metrics
+        with metrics.phase("market"):
+            market = Market.from_preferences(
+                self.proposer_prefs,
+                self.recipient_prefs,
+            )
+            if self.market is not None:
+                self.market = market
+        with metrics.phase("proposals"):
+            state = warm_start(
+                result.state,
+                market,
+                proposers=set(p_changes).union(p_capacity or {}),
+                recipients=set(r_changes).union(r_capacity or {}),
+                p_capacity=market.capacities("proposers", p_caps),
+                r_capacity=market.capacities("recipients", r_caps),
+            )
+        return self.array_result(
+            state, p_caps, r_caps, result.p_min, result.r_min, metrics
         )
 
     def replace_current_match(
@@ -203,14 +893,14 @@ class Matcher:
     @staticmethod
     def match(proposer: Candidate, recipient: Candidate) -> None:
         """Add a proposer and a recipient to each other's list of matches"""
-        recipient.matches.add(proposer.name)
-        proposer.matches.add(recipient.name)
+        recipient.add_match(proposer.name)
+        proposer.add_match(recipient.name)
 
     @staticmethod
     def unmatch(proposer: Candidate, recipient: Candidate) -> None:
         """Remove candidates from one another's list of matches"""
-        proposer.matches.discard(recipient.name)
-        recipient.matches.discard(proposer.name)
+        proposer.remove_match(recipient.name)
+        recipient.remove_match(proposer.name)
 
     def get_next_valid_offer(
         self,
@@ -218,8 +908,53 @@ class Matcher:
         recipients: CandidateList,
     ) -> Optional[Candidate]:
         """Get the next preferred recipient who has also ranked the proposer"""
+        if self.prune:
+            # every recipient left in the list ranked the proposer back
+            offer = proposer.next_offer()
+            return None if offer is None else recipients.get(offer)
         for offer in proposer.offers_left:
             recipient = recipients.get(offer)
             if recipient.ranks(proposer.name):
                 return recipient
         return None
+
+
+def _pair_keys(held: List[List[int]], n_recipients: int) -> np.ndarray:
+    """Return a sorted key for each (proposer, recipient) pair of ids held"""
+    keys = [
+        p * n_recipients + r for r, p_ids in enumerate(held) for p in p_ids
+    ]
+    return np.unique(np.array(keys, dtype=np.int64))
+
+
+def _index(candidates: CandidateList) -> Dict[Member, List[Member]]:
+    """Map each candidate to a list of the candidates they matched with"""
+    return {name: list(c.matches) for name, c in candidates.items()}
+
+
+def _apply_changes(
+    prefs: Preferences,
+    changes: Dict[Member, Optional[List[Member]]],
+) -> Preferences:
+    """Return a copy of prefs with members changed, added or removed"""
+    prefs = dict(prefs)
+    for member, ranked in changes.items():
+        if ranked is None:
+            prefs.pop(member, None)
+        else:
+            prefs[member] = ranked
+    return prefs
+
+
+def _edits(
+    old: Preferences,
+    new: Preferences,
+) -> Dict[Member, Optional[List[Member]]]:
+    """Return the members whose lists differ, with None for removed members"""
+    edits: Dict[Member, Optional[List[Member]]] = {
+        member: ranked
+        for member, ranked in new.items()
+        if old.get(member) != ranked
+    }
+    edits.update({member: None for member in old if member not in new})
+    return edits
@@ -0,0 +1,77 @@
+from __future__ import annotations  # prevents NameErrors for typing
+import time
+from collections import Counter
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterator, Optional, Union
+
+MetricsHook = Callable[[str, Dict[str, Dict[str, Union[int, float]]]], None]
+
+
+class Metrics:
+    """Timers and counters recorded during a matching or scheduling run
+
+    Timers accumulate the seconds spent in each named phase and counters
+    accumulate named events, e.g. offer rounds or augmenting paths. When
+    the instance is disabled every method returns immediately, so code can
+    be instrumented without paying for it unless it's switched on.
+    """
+
+    def __init__(
+        self,
+        enabled: bool = True,
+        hook: Optional[MetricsHook] = None,
+    ) -> None:
+        """Initializes the Metrics class
+
+        Parameters
+        ----------
+        enabled: bool, default True
+            Whether timers and counters are recorded at all
+        hook: Callable[[str, Dict], None], optional
+            Called by export() with the name of the run and to_dict(), e.g.
+            to forward the numbers to an external metrics pipeline
+        """
+        self.enabled = enabled
+        self.hook = hook
+        self.timers: Dict[str, float] = Counter()
+        self.counters: Dict[str, int] = Counter()
+
+    def __repr__(self) -> str:
+        return f"Metrics(timers={self.timers}, counters={self.counters})"
+
+    @contextmanager
+    def phase(self, name: str) -> Iterator[None]:
+        """Add the time spent in the body of a with statement to a timer"""
+        if not self.enabled:
+            yield
+            return
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.timers[name] += time.perf_counter() - start
+
+    def add_time(self, name: str, seconds: float) -> None:
+        """Add seconds measured by the caller to a timer"""
+        if self.enabled:
+            self.timers[name] += seconds
+
+    def count(self, name: str, n: int = 1) -> None:
+        """Add n to a counter"""
+        if self.enabled:
+            self.counters[name] += n
+
+    def to_dict(self) -> Dict[str, Dict[str, Union[int, float]]]:
+        """Return plain dictionaries of the timers and counters"""
+        return {"timers": dict(self.timers), "counters": dict(self.counters)}
+
+    def export(self, run: str) -> None:
+        """Pass the timers and counters to the hook, if there is one
+
+        Parameters
+        ----------
+        run: str
+            The kind of run that was measured, e.g. "match" or "schedule"
+        """
+        if self.enabled and self.hook is not None:
+            self.hook(run, self.to_dict())
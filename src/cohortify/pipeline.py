@@ -0,0 +1,397 @@
+from __future__ import annotations  # prevents NameErrors for typing
+import os
+from concurrent.futures import Future, ProcessPoolExecutor
+from dataclasses import dataclass, field
+from typing import List, Optional, Tuple, Union
+
+import numpy as np
+
+from cohortify.engine import MatchState, resume
+from cohortify.logger import Verbosity
+from cohortify.matcher import Capacity, Matcher, MatchResult, Preferences
+from cohortify.registry import NameRegistry
+from cohortify.scheduler import (
+    ENGINES,
+    Availability,
+    Feasibility,
+    Interview,
+    InterviewIds,
+    InterviewTime,
+    schedule_subproblem,
+)
+from cohortify.slots import SlotBitmap
+
+# registry shared by the batches scheduled in each worker process
+_WORKER_REGISTRY: Optional[NameRegistry] = None
+
+
+@dataclass
+class PipelineResult:
+    """Results of each step of a Pipeline
+
+    Attributes
+    ----------
+    matches: MatchResult
+        The interviews assigned by matching candidates to positions
+    scheduled: Dict[Tuple[str, str], str]
+        Each (position, candidate) interview mapped to its time slot
+    unscheduled: List[Tuple[str, str]]
+        The interviews that couldn't be scheduled
+    feasibility: Feasibility, optional
+        The diagnostics of the scheduling pre-pass, added up over every
+        track, if the Pipeline was created with prepass=True
+    placement: MatchResult, optional
+        The final matches between candidates and positions, set by
+        Pipeline.place()
+    """
+
+    matches: MatchResult
+    scheduled: InterviewTime = field(default_factory=dict)
+    unscheduled: List[Interview] = field(default_factory=list)
+    feasibility: Optional[Feasibility] = None
+    placement: Optional[MatchResult] = None
+
+
+class Pipeline:
+    """Match, schedule and place candidates on one shared market
+
+    The three steps of the placement process are chained without handing
+    dictionaries of names between them: candidates are matched to positions
+    for interviews on a Market built once, the matches of each track are
+    passed to a Scheduler as soon as they're final, and the final placement
+    only considers the interviews that were scheduled. Every step interns
+    names in the same NameRegistry.
+
+    A track is a connected component of the market, i.e. a group of
+    candidates and positions that only rank each other, so its matches are
+    final as soon as deferred acceptance has run for its candidates, even
+    while other tracks are still being matched.
+    """
+
+    def __init__(
+        self,
+        candidate_prefs: Preferences,
+        position_prefs: Preferences,
+        c_availability: Availability,
+        p_availability: Availability,
+        c_interviews: Union[int, Capacity] = 1,
+        p_interviews: Union[int, Capacity] = 1,
+        engine: str = "unit_flow",
+        prepass: bool = False,
+        n_jobs: int = 1,
+        batch_size: int = 1000,
+        verbosity: Union[str, Verbosity] = "off",
+        registry: Optional[NameRegistry] = None,
+    ) -> None:
+        """Initializes the Pipeline class
+
+        Parameters
+        ----------
+        candidate_prefs: Dict[str, List[str]]
+            Each candidate mapped to their ranked list of positions, the
+            candidates propose interviews to positions
+        position_prefs: Dict[str, List[str]]
+            Each position mapped to their ranked list of candidates
+        c_availability: Dict[str, list] | SlotBitmap
+            The time slots each candidate is available for, see Scheduler
+        p_availability: Dict[str, list] | SlotBitmap
+            The time slots each position is available for, see Scheduler
+        c_interviews: int | Dict[str, int], default 1
+            The maximum number of interviews for each candidate
+        p_interviews: int | Dict[str, int], default 1
+            The maximum number of interviews for each position
+        engine: str, default "unit_flow"
+            The engine the Scheduler uses to solve the max-flow problem
+        prepass: bool, default False
+            If True each track is scheduled with the Scheduler's pre-pass
+        n_jobs: int, default 1
+            If greater than 1, or -1 to use every CPU, tracks are scheduled
+            in a pool of up to n_jobs processes while the next tracks are
+            being matched
+        batch_size: int, default 1000
+            Tracks are sent to the Scheduler together until they add up to
+            this many interviews, so small tracks don't each pay for a
+            Scheduler or a trip to a worker process
+        verbosity: str | Verbosity, default "off"
+            The level of detail recorded by the Matcher's Logger
+        registry: NameRegistry, optional
+            The registry to intern names in, by default a new one
+        """
+        if engine not in ENGINES:
+            raise KeyError(engine)
+        self.registry = registry if registry is not None else NameRegistry()
+        self.matcher = Matcher(
+            candidate_prefs,
+            position_prefs,
+            engine="array",
+            verbosity=verbosity,
+            registry=self.registry,
+        )
+        self.market = self.matcher.build_market()
+        self.matcher.market = self.market
+        self.c_availability = c_availability
+        self.p_availability = p_availability
+        # the registry ids and bitmap rows of the market's ids, so batches
+        # are passed to the Scheduler without looking up names
+        proposers, recipients = self.market.proposers, self.market.recipients
+        self._c_ids = self.registry.intern_many(proposers).tolist()
+        self._p_ids = self.registry.intern_many(recipients).tolist()
+        self._c_rows = _rows(c_availability, proposers)
+        self._p_rows = _rows(p_availability, recipients)
+        self.c_interviews = _capacity_dict(c_interviews, candidate_prefs)
+        self.p_interviews = _capacity_dict(p_interviews, position_prefs)
+        self.engine = engine
+        self.prepass = prepass
+        self.n_jobs = (os.cpu_count() or 1) if n_jobs == -1 else n_jobs
+        self.batch_size = batch_size
+        # set by self.run()
+        self.result: Optional[PipelineResult] = None
+
+    def tracks(self) -> List[Tuple[List[str], List[str]]]:
+        """Return the candidates and positions of each track by name"""
+        market = self.market
+        return [
+            (
+                [market.proposers[p] for p in p_ids.tolist()],
+                [market.recipients[r] for r in r_ids.tolist()],
+            )
+            for p_ids, r_ids in market.components()
+        ]
+
+    def run(self, p_min: int = 0, r_min: int = 0) -> PipelineResult:
+        """Match candidates to positions for interviews and schedule them
+
+        Deferred acceptance runs on one MatchState for the whole market,
+        one track at a time, and each batch of tracks is scheduled as soon
+        as its matches are final, in a worker process if n_jobs > 1.
+
+        Parameters
+        ----------
+        p_min: int
+            The minimum number of interviews each candidate should have,
+            see Matcher.assign_matches()
+        r_min: int
+            The minimum number of interviews each position should have
+
+        Returns
+        -------
+        PipelineResult
+            The interview matches and their schedule, also kept in
+            Pipeline.result
+        """
+        market = self.market
+        state = MatchState(
+            market,
+            p_capacity=market.capacities("proposers", self.c_interviews),
+            r_capacity=market.capacities("recipients", self.p_interviews),
+        )
+        pool = None
+        if self.n_jobs > 1:
+            pool = ProcessPoolExecutor(
+                self.n_jobs,
+                initializer=_init_worker,
+                initargs=(self.registry,),
+            )
+        pending: List[Union[Future, tuple]] = []
+        batch: List[np.ndarray] = []
+        size = 0
+        try:
+            for p_ids, r_ids in market.components():
+                resume(state, p_ids.tolist())
+                # the matches of this track can no longer change
+                batch.append(r_ids)
+                size += sum(len(state.held[r]) for r in r_ids.tolist())
+                if size >= self.batch_size:
+                    pending.append(self._submit(pool, state, batch))
+                    batch, size = [], 0
+            if batch:
+                pending.append(self._submit(pool, state, batch))
+            results = [
+                job.result() if isinstance(job, Future) else job
+                for job in pending
+            ]
+        finally:
+            if pool is not None:
+                pool.shutdown()
+
+        matches = self.matcher.array_result(
+            state, self.c_interviews, self.p_interviews, p_min, r_min
+        )
+        scheduled: InterviewTime = {}
+        feasibility = Feasibility(skipped_flow=True) if self.prepass else None
+        for batch_scheduled, _, batch_feasibility in results:
+            scheduled.update(batch_scheduled)
+            if feasibility is not None:
+                # tracks share no one, so their bounds add up
+                feasibility.no_mutual.extend(batch_feasibility.no_mutual)
+                feasibility.upper_bound += batch_feasibility.upper_bound
+                feasibility.greedy += batch_feasibility.greedy
+                feasibility.skipped_flow &= batch_feasibility.skipped_flow
+        self.result = PipelineResult(
+            matches=matches,
+            scheduled=scheduled,
+            unscheduled=[
+                (p, c)
+                for p, candidates in matches.by_recipient.items()
+                for c in candidates
+                if (p, c) not in scheduled
+            ],
+            feasibility=feasibility,
+        )
+        return self.result
+
+    def place(
+        self,
+        candidate_prefs: Preferences,
+        position_prefs: Preferences,
+        c_capacity: Union[int, Capacity] = 1,
+        p_capacity: Union[int, Capacity] = 1,
+        interviewed_only: bool = True,
+    ) -> MatchResult:
+        """Finalize matches from the preferences submitted after interviews
+
+        Parameters
+        ----------
+        candidate_prefs: Dict[str, List[str]]
+            Each candidate mapped to their updated ranked list of positions
+        position_prefs: Dict[str, List[str]]
+            Each position mapped to their updated ranked list of candidates
+        c_capacity: int | Dict[str, int], default 1
+            The maximum number of positions each candidate can be placed in
+        p_capacity: int | Dict[str, int], default 1
+            The maximum number of candidates each position can take
+        interviewed_only: bool, default True
+            If True, candidates can only be placed in positions they had a
+            scheduled interview with, which requires Pipeline.run() first
+
+        Returns
+        -------
+        MatchResult
+            The final placement, also kept in Pipeline.result.placement
+        """
+        if interviewed_only:
+            if self.result is None:
+                raise ValueError("Run the pipeline before placing with it")
+            held = set(self.result.scheduled)
+            candidate_prefs = {
+                c: [p for p in ranked if (p, c) in held]
+                for c, ranked in candidate_prefs.items()
+            }
+            position_prefs = {
+                p: [c for c in ranked if (p, c) in held]
+                for p, ranked in position_prefs.items()
+            }
+        matcher = Matcher(
+            candidate_prefs,
+            position_prefs,
+            engine="array",
+            verbosity="off",
+            registry=self.registry,
+        )
+        placement = matcher.assign_matches(c_capacity, p_capacity)
+        if self.result is not None:
+            self.result.placement = placement
+        return placement
+
+    def _submit(
+        self,
+        pool: Optional[ProcessPoolExecutor],
+        state: MatchState,
+        batch: List[np.ndarray],
+    ) -> Union[Future, tuple]:
+        """Schedule the interviews matched in a batch of finished tracks
+
+        The interviews are passed as registry ids read straight from the
+        recipients held by the MatchState, and only the availability of the
+        people in the batch is sent to the Scheduler. Worker processes get
+        a copy of the registry when the pool starts, see _init_worker().
+        """
+        c_ids, p_ids = self._c_ids, self._p_ids
+        interviews: List[InterviewIds] = []
+        candidates: List[int] = []
+        positions: List[int] = []
+        for r_ids in batch:
+            for r in r_ids.tolist():
+                if state.held[r]:
+                    positions.append(r)
+                    # from the most to the least preferred candidate
+                    for _, p in sorted(state.held[r], reverse=True):
+                        interviews.append((p_ids[r], c_ids[p]))
+                        candidates.append(p)
+        market = state.market
+        subproblem = (
+            _subset(
+                self.c_availability,
+                self._c_rows,
+                market.proposers,
+                np.unique(candidates),
+            ),
+            _subset(
+                self.p_availability,
+                self._p_rows,
+                market.recipients,
+                np.array(positions, dtype=np.int64),
+            ),
+            interviews,
+            self.engine,
+            False,
+            self.prepass,
+        )
+        if pool is None:
+            return schedule_subproblem(subproblem, self.registry)
+        return pool.submit(_schedule_batch, subproblem)
+
+
+def _capacity_dict(
+    capacity: Union[int, Capacity],
+    prefs: Preferences,
+) -> Capacity:
+    """Return a capacity for everyone in prefs from an int or a dictionary"""
+    if isinstance(capacity, int):
+        return {name: capacity for name in prefs}
+    return {name: capacity.get(name, 1) for name in prefs}
+
+
+def _rows(
+    availability: Availability,
+    names: List[str],
+) -> Optional[np.ndarray]:
+    """Return the bitmap row of each name, or -1, if availability is one"""
+    if not isinstance(availability, SlotBitmap):
+        return None
+    index = availability.index
+    return np.array([index.get(name, -1) for name in names], dtype=np.int64)
+
+
+def _subset(
+    availability: Availability,
+    rows: Optional[np.ndarray],
+    names: List[str],
+    ids: np.ndarray,
+) -> Availability:
+    """Return the availability of the market ids that have any
+
+    Bitmaps are subset by the rows mapped to each id in Pipeline.__init__()
+    and dictionaries by the names of the ids.
+    """
+    if rows is not None:
+        rows = rows[ids]
+        return availability.take(rows[rows >= 0])
+    return {
+        names[i]: availability[names[i]]
+        for i in ids.tolist()
+        if names[i] in availability
+    }
+
+
+def _init_worker(registry: NameRegistry) -> None:
+    """Store the shared registry in a worker process of Pipeline.run()"""
+    global _WORKER_REGISTRY  # pylint: disable=global-statement
+    _WORKER_REGISTRY = registry
+
+
+def _schedule_batch(
+    subproblem: tuple,
+) -> Tuple[InterviewTime, dict, Optional[Feasibility]]:
+    """Schedule a batch with the shared registry, used by process pools"""
+    return schedule_subproblem(subproblem, _WORKER_REGISTRY)
@@ -0,0 +1,62 @@
+from __future__ import annotations  # prevents NameErrors for typing
+from typing import Dict, Iterable, List, Optional
+
+import numpy as np
+
+
+class NameRegistry:
+    """Interns the names of candidates and positions to integer ids
+
+    One registry can be shared by a Matcher, a Scheduler and their logs, so
+    each name is hashed and stored once per run and everything else refers
+    to it by id. Ids are dense and never change once assigned, and names()
+    returns the first copy of each name that was interned, so strings built
+    from ids are shared instead of duplicated.
+    """
+
+    def __init__(self, names: Iterable[str] = ()) -> None:
+        """Initializes the NameRegistry class
+
+        Parameters
+        ----------
+        names: Iterable[str], optional
+            Names to intern up front, in order
+        """
+        self.names: List[str] = []
+        self.ids: Dict[str, int] = {}
+        self.intern_many(names)
+
+    def __len__(self) -> int:
+        return len(self.names)
+
+    def __contains__(self, name: str) -> bool:
+        return name in self.ids
+
+    def __repr__(self) -> str:
+        return f"NameRegistry({len(self)} names)"
+
+    def intern(self, name: Optional[str]) -> int:
+        """Return the id of a name, adding it to the registry if needed
+
+        None is always mapped to -1, e.g. for a log without a recipient.
+        """
+        if name is None:
+            return -1
+        name_id = self.ids.get(name)
+        if name_id is None:
+            name_id = self.ids[name] = len(self.names)
+            self.names.append(name)
+        return name_id
+
+    def intern_many(self, names: Iterable[str]) -> np.ndarray:
+        """Return the ids of many names, adding any that are missing"""
+        intern = self.intern
+        return np.array([intern(name) for name in names], dtype=np.int64)
+
+    def get(self, name: Optional[str], default: int = -1) -> int:
+        """Return the id of a name without adding it, or default"""
+        return self.ids.get(name, default)
+
+    def name(self, name_id: int) -> Optional[str]:
+        """Return the name of an id, or None for -1"""
+        return self.names[name_id] if name_id >= 0 else None
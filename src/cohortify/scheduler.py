@@ -1,10 +1,52 @@
 from __future__ import annotations  # prevents NameErrors for typing
-from typing import Dict, Tuple, List
+import os
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, field
+from typing import Dict, Tuple, List, Optional, Set, Union
 
 import networkx as nx
+import numpy as np
+
+from cohortify.booking import book_greedily, book_same_time, booking_order
+from cohortify.flow import UnitFlowNetwork
+from cohortify.metrics import Metrics, MetricsHook
+from cohortify.registry import NameRegistry
+from cohortify.slots import SlotBitmap
 
 Interview = Tuple[str, str]
+InterviewIds = Tuple[int, int]  # the registry ids of (position, candidate)
 InterviewTime = Dict[Interview, str]
+Availability = Union[Dict[str, list], SlotBitmap]
+
+ENGINES = ["networkx", "unit_flow"]
+SOURCE, SINK = 0, 1  # node ids of the source and sink in a UnitFlowNetwork
+
+
+@dataclass
+class Feasibility:
+    """Diagnostics of the pre-pass run by Scheduler.schedule_interviews()
+
+    Attributes
+    ----------
+    no_mutual: List[Interview]
+        Interviews whose candidate and position share no time slot, which
+        are left out of the flow network and never scheduled
+    upper_bound: int
+        The most interviews any schedule can include, which is the smaller
+        of the sums over candidates and over positions of the lesser of
+        their number of interviews and the slots those interviews can use
+    greedy: int
+        The number of interviews scheduled by a greedy pass that books the
+        most constrained interviews first
+    skipped_flow: bool
+        True if the greedy pass reached the upper bound, so its schedule is
+        optimal and max-flow wasn't run
+    """
+
+    no_mutual: List[Interview] = field(default_factory=list)
+    upper_bound: int = 0
+    greedy: int = 0
+    skipped_flow: bool = False
 
 
 class Scheduler:
@@ -12,58 +54,159 @@ class Scheduler:
 
     Parameters
     ----------
-    c_availability: Dict[str, list]
+    c_availability: Dict[str, list] | SlotBitmap
         A dictionary of candidates' availability to interview with the format:
-        {"CandidateA": ["Time1", "Time2", "Time3"]}
-    p_availability: Dict[str, list]
+        {"CandidateA": ["Time1", "Time2", "Time3"]}, or a SlotBitmap of
+        their availability, e.g. from TimeGrid.bitmap()
+    p_availability: Dict[str, list] | SlotBitmap
         A dictionary of partners' availability to interview with the format:
-        {"PositionA": ["Time1", "Time2", "Time3"]}
-    interviews: Dict[str, list]
+        {"PositionA": ["Time1", "Time2", "Time3"]}, or a SlotBitmap over the
+        same slots as c_availability. When both are bitmaps, interviews are
+        only connected to the slots in their mutual availability, which is
+        computed with a bitwise AND of the two rows, and each interview is
+        booked at the same time for its candidate and position. The same
+        schedule is booked for every engine and n_jobs, see book_same_time()
+    interviews: Dict[str, list] | List[Tuple[int, int]]
         A list of interviews to schedule with the following format:
-        {"PositionA": ["CandidateA", "CandidateB", "CandidateC"]}
+        {"PositionA": ["CandidateA", "CandidateB", "CandidateC"]}, or the
+        (position, candidate) pairs of their ids in registry
+    engine: str, default "networkx"
+        The engine used to solve the max-flow problem, must be one of:
+        - "networkx" runs nx.maximum_flow() on the graph from build_graph()
+        - "unit_flow" runs Dinic's algorithm on the integer-indexed
+          UnitFlowNetwork from build_network(), which uses far less memory
+    n_jobs: int, default 1
+        If greater than 1, or -1 to use every CPU, interviews are split into
+        connected components that are scheduled separately, using a pool of
+        up to n_jobs processes when there's more than one component
+    instrument: bool, default False
+        If True each call to schedule_interviews() records timers for its
+        phases and counters of graph nodes, edges and augmenting paths in
+        Scheduler.metrics, and incremental updates add to them
+    metrics_hook: Callable[[str, Dict], None], optional
+        Called with "schedule" and the timers and counters after each call to
+        schedule_interviews() while instrument is True
+    prepass: bool, default False
+        If True schedule_interviews() first leaves interviews with no mutual
+        time slot out of the flow network, then bounds the number of
+        interviews that can be scheduled and skips max-flow when a greedy
+        schedule reaches the bound, see Scheduler.feasibility
+    registry: NameRegistry, optional
+        The registry that interns the names of candidates and positions to
+        the ids the flow network is keyed by, e.g. the one of the Matcher
+        whose matches are being scheduled
     """
 
     def __init__(
         self,
-        c_availability: Dict[str, list],
-        p_availability: Dict[str, list],
-        interviews: List[tuple],
+        c_availability: Availability,
+        p_availability: Availability,
+        interviews: Union[Dict[str, list], List[InterviewIds]],
+        engine: str = "networkx",
+        n_jobs: int = 1,
+        instrument: bool = False,
+        metrics_hook: Optional[MetricsHook] = None,
+        prepass: bool = False,
+        registry: Optional[NameRegistry] = None,
     ) -> None:
         """Inits the Interviews class"""
+        if engine not in ENGINES:
+            raise KeyError(engine)
+        self.registry = registry if registry is not None else NameRegistry()
+        self.engine = engine
+        self.n_jobs = (os.cpu_count() or 1) if n_jobs == -1 else n_jobs
+        self.instrument = instrument
+        self.metrics_hook = metrics_hook
+        self.metrics = Metrics(enabled=False)
+        self.prepass = prepass
+        # set by the pre-pass of self.schedule_interviews()
+        self.feasibility: Optional[Feasibility] = None
+        # interviews left out of the network since they share no time slot
+        self._pruned: Set[InterviewIds] = set()
+        # node times, slot nodes, interview edges and each name's interviews
+        # in self.network, keyed by registry ids, see build_network()
+        self._labels: List[str] = []
+        self._slots: Dict[Tuple[str, int], Dict[str, int]] = {}
+        self._interview_edges: Dict[InterviewIds, int] = {}
+        self._by_name: Dict[Tuple[str, int], List[InterviewIds]] = {}
+        # kept until the availability is updated, see mutual_availability()
+        self.bitmaps: Optional[Tuple[SlotBitmap, SlotBitmap]] = None
+        self.mutual_only = False
+        if isinstance(c_availability, SlotBitmap) or isinstance(
+            p_availability, SlotBitmap
+        ):
+            self.bitmaps = _check_bitmaps(c_availability, p_availability)
+            self.mutual_only = True
+            c_availability = c_availability.to_availability()
+            p_availability = p_availability.to_availability()
         self.c_availability = c_availability
         self.p_availability = p_availability
+        self._inputs = (c_availability, p_availability)
         self.candidates = list(c_availability.keys())
         self.positions = list(p_availability.keys())
-
-        self.interviews = []
-        for p, matches in interviews.items():
-            for c in matches:
-                self.interviews.append((p, c))
+        if isinstance(interviews, dict):
+            self.interviews = [
+                (p, c) for p, cs in interviews.items() for c in cs
+            ]
+            self.registry.intern_many(n for i in self.interviews for n in i)
+        else:  # the ids are already in the registry
+            names = self.registry.names
+            self.interviews = [(names[p], names[c]) for p, c in interviews]
+        self.registry.intern_many(self.candidates + self.positions)
 
         # set by self.schedule_interviews()
         self.G: nx.DiGraph = None
+        self.network: UnitFlowNetwork = None
         self.scheduled: InterviewTime = {}
         self.unscheduled: List[Interview]
 
-    def schedule_interviews(self):
-        """Assign interviews to time slots depending on mutual availability"""
+    def build_graph(self) -> nx.DiGraph:
+        """Build the flow network of availability and interviews
+
+        Edges from availability to interviews are looked up from an index of
+        each candidate's and position's time slots, so construction is linear
+        in the number of edges instead of comparing every interview against
+        every time slot.
+        """
         # get variables
-        c_availability = self.c_availability.items()
-        p_availability = self.p_availability.items()
         interviews = self.interviews
 
+        # index time nodes by the candidate or position they belong to
+        c_slots = {
+            c: [(c, t) for t in times]
+            for c, times in self.c_availability.items()
+        }
+        p_slots = {
+            p: [(p, t) for t in times]
+            for p, times in self.p_availability.items()
+        }
+
         # creating lists for time nodes and edges
-        c_times = [(c, t) for c, times in c_availability for t in times]
-        p_times = [(p, t) for p, times in p_availability for t in times]
+        c_times = [c for slots in c_slots.values() for c in slots]
+        p_times = [p for slots in p_slots.values() for p in slots]
         c_interviews = [("c", i) for i in interviews]
         p_interviews = [(i, "p") for i in interviews]
         s_edges = [("s", c) for c in c_times]
-        c_edges = [
-            (c, i) for i in c_interviews for c in c_times if i[1][1] == c[0]
-        ]
-        p_edges = [
-            (i, p) for i in p_interviews for p in p_times if i[0][0] == p[0]
-        ]
+        if self.mutual_only:
+            mutual = self.mutual_availability()
+            c_edges = [
+                ((i[1], t), ("c", i)) for i in interviews for t in mutual[i]
+            ]
+            p_edges = [
+                ((i, "p"), (i[0], t)) for i in interviews for t in mutual[i]
+            ]
+        else:
+            # with the pre-pass, interviews without a mutual slot get no edges
+            linked = interviews
+            if self.prepass:
+                mutual = self.mutual_availability()
+                linked = [i for i in interviews if mutual[i]]
+            c_edges = [
+                (c, ("c", i)) for i in linked for c in c_slots.get(i[1], [])
+            ]
+            p_edges = [
+                ((i, "p"), p) for i in linked for p in p_slots.get(i[0], [])
+            ]
         i_edges = [(("c", i), (i, "p")) for i in interviews]
         t_edges = [(p, "t") for p in p_times]
 
@@ -86,16 +229,713 @@ class Scheduler:
 
         # assign graph capacity
         nx.set_edge_attributes(G, 1, "capacity")
+        return G
 
-        # run the flow and retrieve the matches
-        flow_dict = nx.maximum_flow(G, "s", "t")[1]
+    def build_network(self) -> UnitFlowNetwork:
+        """Build the flow network of build_graph() on integer node ids
+
+        The network encodes the same constraints as the networkx graph:
+        the source feeds each candidate time slot, each slot feeds that
+        candidate's interviews, each interview passes through a single edge
+        so it's only scheduled once, and then feeds the position's time
+        slots, which each feed the sink.
+
+        The ids of the slot nodes and interview edges are recorded so the
+        network can be updated incrementally, see add_availability(),
+        remove_availability(), add_interview() and cancel_interview().
+        """
+        net = UnitFlowNetwork(n_nodes=2)
+        self.network = net
+        self._labels = ["", ""]
+        self._slots = {}
+        self._interview_edges = {}
+        self._pruned = set()
+        self._by_name = {}
+        if self.bitmaps is not None:
+            self._build_from_bitmaps()
+            return net
+        ids = self.registry.ids
+        for kind, availability in [
+            ("candidate", self.c_availability),
+            ("position", self.p_availability),
+        ]:
+            for name, times in availability.items():
+                for time in times:
+                    self._add_slot(kind, ids[name], time, connect=False)
+        for i in self.interviews:
+            self._add_interview(self._ids(i))
+        return net
+
+    def _build_from_bitmaps(self) -> None:
+        """Add the nodes and edges of build_network() in bulk from bitmaps
+
+        Each interview is only connected to the slots in its mutual
+        availability, which are found for every interview at once.
+        """
+        net = self.network
+        c_map, p_map = self.bitmaps
+        slots = c_map.slots
+        node_ids = []
+        for kind, bitmap in [("candidate", c_map), ("position", p_map)]:
+            grid = _unpack(bitmap.bits, bitmap.n_slots)
+            rows, cols = np.nonzero(grid)
+            nodes = net.add_nodes(len(rows))
+            ids = np.full(grid.shape, -1, dtype=np.int64)
+            ids[rows, cols] = nodes
+            node_ids.append(ids)
+            name_ids = self.registry.intern_many(bitmap.names).tolist()
+            for row, col, node in zip(rows.tolist(), cols.tolist(), nodes):
+                key = (kind, name_ids[row])
+                self._slots.setdefault(key, {})[slots[col]] = node
+            self._labels.extend(slots[col] for col in cols.tolist())
+            if kind == "candidate":
+                net.add_edges([SOURCE] * len(nodes), nodes)
+            else:
+                net.add_edges(nodes, [SINK] * len(nodes))
+
+        c_ids, p_ids, mutual = self._mutual_grid()
+        i_in = np.array(net.add_nodes(2 * len(self.interviews)))[::2]
+        self._labels.extend([""] * 2 * len(self.interviews))
+        rows, cols = np.nonzero(mutual)
+        net.add_edges(
+            node_ids[0][c_ids[rows], cols].tolist(), i_in[rows].tolist()
+        )
+        edges = net.add_edges(i_in.tolist(), (i_in + 1).tolist())
+        self._interview_edges = dict(
+            zip(map(self._ids, self.interviews), edges)
+        )
+        for p, c in self._interview_edges:
+            self._by_name.setdefault(("candidate", c), []).append((p, c))
+            self._by_name.setdefault(("position", p), []).append((p, c))
+        net.add_edges(
+            (i_in[rows] + 1).tolist(), node_ids[1][p_ids[rows], cols].tolist()
+        )
+
+    def mutual_availability(self) -> Dict[Interview, List[str]]:
+        """Return the time slots each interview's participants share
+
+        With bitmaps the slots are found for every interview at once with a
+        bitwise AND of the candidate's and position's rows, otherwise by
+        intersecting their lists of time slots.
+        """
+        if self.bitmaps is None:
+            c_sets = {c: set(t) for c, t in self.c_availability.items()}
+            return {
+                (p, c): [
+                    t
+                    for t in self.p_availability.get(p, [])
+                    if t in c_sets.get(c, ())
+                ]
+                for p, c in self.interviews
+            }
+        slots = self.bitmaps[0].slots
+        mutual: List[List[str]] = [[] for _ in self.interviews]
+        rows, cols = np.nonzero(self._mutual_grid()[2])
+        for row, col in zip(rows.tolist(), cols.tolist()):
+            mutual[row].append(slots[col])
+        return dict(zip(self.interviews, mutual))
+
+    def _mutual_grid(self) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """Return the bitmap rows of each interview and its mutual slots
+
+        Returns
+        -------
+        Tuple[np.ndarray, np.ndarray, np.ndarray]
+            The row of each interview's candidate and position, and a boolean
+            matrix with one row per interview and one column per slot.
+            Interviews with a name that isn't in a bitmap share no slots
+        """
+        c_map, p_map = self.bitmaps
+        c_ids = np.array(
+            [c_map.index.get(c, -1) for _, c in self.interviews], np.int64
+        )
+        p_ids = np.array(
+            [p_map.index.get(p, -1) for p, _ in self.interviews], np.int64
+        )
+        shared = c_map.bits[c_ids] & p_map.bits[p_ids]
+        shared[(c_ids < 0) | (p_ids < 0)] = 0
+        return c_ids, p_ids, _unpack(shared, c_map.n_slots)
+
+    def _add_slot(
+        self, kind: str, name: int, time: str, connect: bool
+    ) -> None:
+        """Add a time slot node and connect it to the source or sink
+
+        If connect is True, the slot is also connected to the interviews
+        that have already been added for the candidate or position, whose
+        name is given as its registry id.
+        """
+        net = self.network
+        slots = self._slots.setdefault((kind, name), {})
+        if time in slots:
+            return
+        node = slots[time] = net.add_node()
+        self._labels.append(time)
+        if kind == "candidate":
+            net.add_edge(SOURCE, node)
+        else:
+            net.add_edge(node, SINK)
+        if not connect:
+            return
+        other_kind = "position" if kind == "candidate" else "candidate"
+        for p, c in self._by_name.get((kind, name), []):
+            e = self._interview_edges[(p, c)]
+            other_name = p if kind == "candidate" else c
+            other = self._slots.get((other_kind, other_name), {}).get(time)
+            if (p, c) in self._pruned:
+                if other is not None:
+                    self._link((p, c), e)
+            elif not self.mutual_only:
+                self._connect(kind, node, e)
+            elif other is not None:
+                self._connect(kind, node, e)
+                self._connect(other_kind, other, e)
+
+    def _connect(self, kind: str, node: int, e: int) -> None:
+        """Connect a candidate's or position's slot to an interview edge"""
+        net = self.network
+        if kind == "candidate":
+            net.add_edge(node, net.tail(e))
+        else:
+            net.add_edge(net.heads[e], node)
+
+    def _add_interview(self, interview: InterviewIds) -> None:
+        """Add the nodes and edges for an interview's ids to the network"""
+        net = self.network
+        p, c = interview
+        i_in, i_out = net.add_node(), net.add_node()
+        self._labels.extend(["", ""])
+        c_slots = self._slots.get(("candidate", c), {})
+        p_slots = self._slots.get(("position", p), {})
+        if self.mutual_only:
+            c_slots = {t: n for t, n in c_slots.items() if t in p_slots}
+            p_slots = {t: n for t, n in p_slots.items() if t in c_slots}
+        elif self.prepass and not c_slots.keys() & p_slots.keys():
+            self._pruned.add(interview)
+            c_slots = p_slots = {}
+        for node in c_slots.values():
+            net.add_edge(node, i_in)
+        self._interview_edges[interview] = net.add_edge(i_in, i_out)
+        for node in p_slots.values():
+            net.add_edge(i_out, node)
+        self._by_name.setdefault(("candidate", c), []).append(interview)
+        self._by_name.setdefault(("position", p), []).append(interview)
+
+    def _link(self, interview: InterviewIds, e: int) -> None:
+        """Connect a pruned interview to all of its participants' slots"""
+        net = self.network
+        p, c = interview
+        self._pruned.discard(interview)
+        for node in self._slots.get(("candidate", c), {}).values():
+            net.add_edge(node, net.tail(e))
+        for node in self._slots.get(("position", p), {}).values():
+            net.add_edge(net.heads[e], node)
+
+    def _unlink_unshared(self, kind: str, name: int) -> None:
+        """Prune name's interviews that no longer share a time slot
+
+        Only needed with the pre-pass and availability dictionaries, since
+        with bitmaps interviews are only ever linked to mutual slots.
+        """
+        net = self.network
+        for p, c in self._by_name.get((kind, name), []):
+            e = self._interview_edges[(p, c)]
+            if (p, c) in self._pruned:
+                continue
+            c_slots = self._slots.get(("candidate", c), {})
+            if c_slots.keys() & self._slots.get(("position", p), {}).keys():
+                continue
+            self._cancel_flow(e)
+            for end in [net.tail(e), net.heads[e]]:
+                for f in net.adj[end]:
+                    if f not in (e, e ^ 1):
+                        net.caps[f] = net.caps[f ^ 1] = 0
+            self._pruned.add((p, c))
+
+    def components(self) -> List[List[Interview]]:
+        """Split interviews into groups that share no candidate or position
+
+        Candidate and position time slots are only shared by their own
+        interviews, so each connected component of the graph of candidates
+        and positions joined by interviews can be scheduled independently.
+        """
+        # candidates and positions are told apart by the parity of the key
+        parent: Dict[int, int] = {}
+
+        def find(node):
+            root = parent.setdefault(node, node)
+            while root != parent[root]:
+                root = parent[root]
+            while node != root:  # compress the path to the root
+                parent[node], node = root, parent[node]
+            return root
+
+        keys = [(2 * p, 2 * c + 1) for p, c in map(self._ids, self.interviews)]
+        for p, c in keys:
+            root_p, root_c = find(p), find(c)
+            if root_p != root_c:
+                parent[root_c] = root_p
+        groups: Dict[int, List[Interview]] = {}
+        for (p, _), interview in zip(keys, self.interviews):
+            groups.setdefault(find(p), []).append(interview)
+        return list(groups.values())
+
+    def schedule_components(self):
+        """Schedule each connected component separately and merge the results
+
+        Components are solved in a process pool of up to self.n_jobs workers
+        when there's more than one, otherwise they're solved in this process.
+        With the pre-pass each component runs its own, so max-flow is only
+        skipped for the components a greedy schedule solves, and their
+        diagnostics are added up in self.feasibility.
+        """
+        subproblems = []
+        for interviews in self.components():
+            positions: Dict[str, list] = {}
+            for p, c in interviews:
+                positions.setdefault(p, []).append(c)
+            c_availability = {
+                c: self.c_availability[c]
+                for c in {c for _, c in interviews}
+                if c in self.c_availability
+            }
+            p_availability = {
+                p: self.p_availability[p]
+                for p in positions
+                if p in self.p_availability
+            }
+            if self.mutual_only:
+                c_availability, p_availability = self._sub_bitmaps(
+                    c_availability, p_availability
+                )
+            subproblems.append(
+                (
+                    c_availability,
+                    p_availability,
+                    positions,
+                    self.engine,
+                    self.instrument,
+                    self.prepass,
+                )
+            )
+        self.metrics.count("components", len(subproblems))
+        workers = min(self.n_jobs, len(subproblems))
+        if workers > 1:
+            chunksize = max(1, len(subproblems) // (workers * 4))
+            with ProcessPoolExecutor(max_workers=workers) as pool:
+                results = list(
+                    pool.map(
+                        schedule_subproblem, subproblems, chunksize=chunksize
+                    )
+                )
+        else:
+            results = [schedule_subproblem(sub) for sub in subproblems]
         scheduled = {}
-        for i in interviews:
-            for time, flow in flow_dict[(i, "p")].items():
-                if flow > 0:
-                    scheduled[i] = time[1]
-        unscheduled = [i for i in interviews if i not in scheduled]
+        feasibility = Feasibility(skipped_flow=True) if self.prepass else None
+        for result, metrics, component in results:
+            scheduled.update(result)
+            # timers of the components add up to the CPU time of the workers
+            self.metrics.timers.update(metrics["timers"])
+            self.metrics.counters.update(metrics["counters"])
+            if feasibility is not None:
+                # components share no one, so their bounds add up
+                feasibility.no_mutual.extend(component.no_mutual)
+                feasibility.upper_bound += component.upper_bound
+                feasibility.greedy += component.greedy
+                feasibility.skipped_flow &= component.skipped_flow
+        self.feasibility = feasibility
+
+        self.scheduled = scheduled
+        self.unscheduled = [i for i in self.interviews if i not in scheduled]
+
+    def _sub_bitmaps(
+        self,
+        c_availability: Dict[str, list],
+        p_availability: Dict[str, list],
+    ) -> Tuple[SlotBitmap, SlotBitmap]:
+        """Return the bitmaps of the people in one component"""
+        if self.bitmaps is not None:
+            c_map, p_map = self.bitmaps
+            return c_map.subset(list(c_availability)), p_map.subset(
+                list(p_availability)
+            )
+        # the availability was updated, so build bitmaps over every slot
+        slots = list(
+            dict.fromkeys(
+                t
+                for availability in [self.c_availability, self.p_availability]
+                for times in availability.values()
+                for t in times
+            )
+        )
+        return (
+            SlotBitmap.from_availability(c_availability, slots),
+            SlotBitmap.from_availability(p_availability, slots),
+        )
+
+    def schedule_interviews(self):
+        """Assign interviews to time slots depending on mutual availability"""
+        self.metrics = Metrics(self.instrument, self.metrics_hook)
+        # components run their own pre-pass, see schedule_components()
+        if self.prepass and self.n_jobs <= 1:
+            with self.metrics.phase("prepass"):
+                greedy = self._run_prepass()
+            if self.feasibility.skipped_flow:
+                self.scheduled = greedy
+                self.unscheduled = [
+                    i for i in self.interviews if i not in greedy
+                ]
+                self.metrics.count("scheduled", len(greedy))
+                self.metrics.export("schedule")
+                return
+        if self.n_jobs > 1:
+            self.schedule_components()
+        elif self.engine == "unit_flow":
+            self.schedule_unit_flow()
+        else:
+            self.schedule_networkx()
+        self.metrics.export("schedule")
+
+    def _run_prepass(self) -> InterviewTime:
+        """Bound the schedule and try to reach the bound greedily
+
+        Sets self.feasibility and returns the greedy schedule. The bound
+        counts, for each candidate and each position, the lesser of their
+        number of interviews and the time slots those interviews can use,
+        since nobody can attend more interviews than either. A greedy
+        schedule that reaches the bound is a maximum schedule.
+        """
+        mutual = self.mutual_availability()
+        no_mutual = [i for i in self.interviews if not mutual[i]]
+        demand: Dict[Tuple[str, str], int] = {}
+        supply: Dict[Tuple[str, str], Set[str]] = {}
+        for (p, c), times in mutual.items():
+            if not times:
+                continue
+            for person, slots in [
+                (("candidate", c), self.c_availability[c]),
+                (("position", p), self.p_availability[p]),
+            ]:
+                demand[person] = demand.get(person, 0) + 1
+                if person not in supply:
+                    # interviews can only use mutual slots with bitmaps
+                    supply[person] = set() if self.mutual_only else set(slots)
+                if self.mutual_only:
+                    supply[person].update(times)
+        bounds = {"candidate": 0, "position": 0}
+        for person, n_interviews in demand.items():
+            bounds[person[0]] += min(n_interviews, len(supply[person]))
+        upper_bound = min(bounds.values())
+
+        # book the interviews with the fewest mutual slots first
+        greedy = book_greedily(booking_order(mutual), mutual, upper_bound)[0]
+
+        self.feasibility = Feasibility(
+            no_mutual=no_mutual,
+            upper_bound=upper_bound,
+            greedy=len(greedy),
+            skipped_flow=len(greedy) == upper_bound,
+        )
+        metrics = self.metrics
+        metrics.count("no_mutual", len(no_mutual))
+        metrics.count("upper_bound", upper_bound)
+        metrics.count("greedy", len(greedy))
+        metrics.count("skipped_flow", int(self.feasibility.skipped_flow))
+        return greedy
+
+    def schedule_networkx(self):
+        """Assign interviews to time slots with the networkx engine"""
+        metrics = self.metrics
+        interviews = self.interviews
+        with metrics.phase("build_graph"):
+            G = self.build_graph()
+        metrics.count("graph_nodes", G.number_of_nodes())
+        metrics.count("graph_edges", G.number_of_edges())
+
+        # run the flow and retrieve the matches
+        with metrics.phase("max_flow"):
+            flow_value, flow_dict = nx.maximum_flow(G, "s", "t")
+        with metrics.phase("read_schedule"):
+            scheduled = {}
+            for i in interviews:
+                for time, flow in flow_dict[(i, "p")].items():
+                    if flow > 0:
+                        scheduled[i] = time[1]
+            if self.mutual_only:
+                # see _read_schedule()
+                mutual = self.mutual_availability()
+                scheduled = book_same_time(mutual, limit=flow_value)
+            unscheduled = [i for i in interviews if i not in scheduled]
+        metrics.count("scheduled", len(scheduled))
 
         self.G = G
         self.scheduled = scheduled
         self.unscheduled = unscheduled
+
+    def schedule_unit_flow(self):
+        """Assign interviews to time slots with the unit_flow engine"""
+        metrics = self.metrics
+        with metrics.phase("build_graph"):
+            net = self.build_network()
+        metrics.count("graph_nodes", net.n_nodes)
+        metrics.count("graph_edges", net.n_edges)
+        with metrics.phase("max_flow"):
+            # every augmenting path carries one unit of flow
+            metrics.count("augmentations", net.max_flow(SOURCE, SINK))
+        with metrics.phase("read_schedule"):
+            self._read_schedule()
+        metrics.count("scheduled", len(self.scheduled))
+
+    def _read_schedule(self) -> None:
+        """Set scheduled and unscheduled from the flow in self.network"""
+        net = self.network
+        names = self.registry.names
+        labels = self._labels
+        scheduled = {}
+        for (p, c), e in self._interview_edges.items():
+            if not net.flow(e):
+                continue
+            for out in net.adj[net.heads[e]]:
+                if out % 2 == 0 and net.flow(out):
+                    scheduled[(names[p], names[c])] = labels[net.heads[out]]
+        if self.mutual_only:
+            # an interview's flow can enter and leave through the slots of
+            # different times, so the flow only bounds a schedule that books
+            # both sides at once, which is found the same way by each engine
+            mutual = self.mutual_availability()
+            scheduled = book_same_time(mutual, limit=len(scheduled))
+        self.scheduled = scheduled
+        self.unscheduled = [i for i in self.interviews if i not in scheduled]
+
+    def _repair(self) -> None:
+        """Restore a maximum flow after an update with augmenting paths
+
+        Each update changes the maximum flow by at most one unit, so only a
+        few augmenting paths are needed instead of solving from scratch, and
+        only the interviews along those paths can move to a new slot.
+        """
+        metrics = self.metrics
+        metrics.count("updates")
+        with metrics.phase("repair"):
+            while self.network.augment(SOURCE, SINK):
+                metrics.count("augmentations")
+            self._read_schedule()
+
+    def _prepare_update(self, kind: str = "candidate") -> None:
+        """Check the kind of update and build the network if needed"""
+        if kind not in ["candidate", "position"]:
+            raise KeyError(kind)
+        if self.network is None:
+            self.schedule_unit_flow()
+
+    def _cancel_flow(self, e: int) -> None:
+        """Cancel the unit of flow that passes through an interview edge"""
+        net = self.network
+        if not net.flow(e):
+            return
+        i_in, i_out = net.tail(e), net.heads[e]
+        for r in net.adj[i_in]:  # incoming edges from candidate slots
+            if r % 2 == 1 and net.flow(r ^ 1):
+                net.push(r)
+                slot = net.heads[r]
+                for f in net.adj[slot]:  # the edge from the source
+                    if f % 2 == 1 and net.flow(f ^ 1):
+                        net.push(f)
+        for f in net.adj[i_out]:  # outgoing edges to position slots
+            if f % 2 == 0 and net.flow(f):
+                net.push(f ^ 1)
+                slot = net.heads[f]
+                for g in net.adj[slot]:  # the edge to the sink
+                    if g % 2 == 0 and net.flow(g):
+                        net.push(g ^ 1)
+        net.push(e ^ 1)
+
+    def _remove_node(self, node: int) -> None:
+        """Disconnect a node by removing the capacity of all its edges"""
+        net = self.network
+        for e in net.adj[node]:
+            net.caps[e] = 0
+            net.caps[e ^ 1] = 0
+
+    def add_availability(
+        self,
+        name: str,
+        time: str,
+        kind: str = "candidate",
+    ) -> None:
+        """Add a time slot to a candidate's or position's availability
+
+        Parameters
+        ----------
+        name: str
+            The name of the candidate or position
+        time: str
+            The time slot they're now available for
+        kind: str, default "candidate"
+            Must be one of candidate or position
+        """
+        self._prepare_update(kind)
+        availability = self._availability(kind)
+        times = availability.get(name, [])
+        if time in times:
+            return
+        availability[name] = times + [time]
+        self._add_slot(kind, self.registry.intern(name), time, connect=True)
+        self._repair()
+
+    def remove_availability(
+        self,
+        name: str,
+        time: str,
+        kind: str = "candidate",
+    ) -> None:
+        """Remove a time slot from a candidate's or position's availability
+
+        If an interview was scheduled through this slot it is unscheduled
+        and the flow is repaired, which may schedule it in another slot.
+        """
+        self._prepare_update(kind)
+        availability = self._availability(kind)
+        if time not in availability.get(name, []):
+            return
+        availability[name] = [t for t in availability[name] if t != time]
+        name = self.registry.ids[name]
+        node = self._slots[(kind, name)].pop(time)
+        net = self.network
+        for f in net.adj[node]:
+            forward = f if f % 2 == 0 else f ^ 1
+            if not net.flow(forward) or net.heads[f] in (SOURCE, SINK):
+                continue
+            # the slot feeds an interview, so find the edge through it
+            other = net.heads[f]
+            for g in net.adj[other]:
+                if kind == "candidate" and g % 2 == 0:
+                    self._cancel_flow(g)
+                elif kind == "position" and g % 2 == 1:
+                    self._cancel_flow(g ^ 1)
+        self._remove_node(node)
+        if self.mutual_only:
+            self._disconnect_mutual(kind, name, time)
+        elif self.prepass:
+            self._unlink_unshared(kind, name)
+        self._repair()
+
+    def _disconnect_mutual(self, kind: str, name: int, time: str) -> None:
+        """Cut name's interviews from the other side's slot at a time
+
+        Once a time slot is no longer mutual, flow can't pass through the
+        other participant's slot for it either.
+        """
+        net = self.network
+        for p, c in self._by_name.get((kind, name), []):
+            e = self._interview_edges[(p, c)]
+            if kind == "candidate":
+                node = self._slots.get(("position", p), {}).get(time)
+                end = net.heads[e]
+            else:
+                node = self._slots.get(("candidate", c), {}).get(time)
+                end = net.tail(e)
+            for f in net.adj[end]:
+                if node is None or net.heads[f] != node:
+                    continue
+                forward = f if f % 2 == 0 else f ^ 1
+                if net.flow(forward):
+                    self._cancel_flow(e)
+                net.caps[f] = net.caps[f ^ 1] = 0
+
+    def add_interview(self, position: str, candidate: str) -> None:
+        """Add an interview and try to schedule it without a full re-run"""
+        self._prepare_update()
+        interview = self._ids((position, candidate), add=True)
+        if interview in self._interview_edges:
+            return
+        self.interviews.append((position, candidate))
+        self._add_interview(interview)
+        self._repair()
+
+    def cancel_interview(self, position: str, candidate: str) -> None:
+        """Cancel an interview, freeing its slots for other interviews"""
+        self._prepare_update()
+        interview = self._ids((position, candidate))
+        if interview not in self._interview_edges:
+            return
+        self.interviews.remove((position, candidate))
+        self._pruned.discard(interview)
+        e = self._interview_edges.pop(interview)
+        self._by_name[("candidate", interview[1])].remove(interview)
+        self._by_name[("position", interview[0])].remove(interview)
+        self._cancel_flow(e)
+        net = self.network
+        self._remove_node(net.tail(e))
+        self._remove_node(net.heads[e])
+        self._repair()
+
+    def _ids(self, interview: Interview, add: bool = False) -> InterviewIds:
+        """Return the registry ids of an interview's position and candidate
+
+        Names that aren't in the registry get -1 unless add is True.
+        """
+        p, c = interview
+        if add:
+            return self.registry.intern(p), self.registry.intern(c)
+        return self.registry.get(p), self.registry.get(c)
+
+    def _availability(self, kind: str) -> Dict[str, list]:
+        """Return the availability of candidates or positions
+
+        Availability is copied the first time it's updated so the
+        dictionaries passed to the Scheduler aren't modified, and any
+        bitmaps are dropped since they no longer match it.
+        """
+        self.bitmaps = None
+        if kind == "candidate":
+            if self.c_availability is self._inputs[0]:
+                self.c_availability = dict(self.c_availability)
+            return self.c_availability
+        if self.p_availability is self._inputs[1]:
+            self.p_availability = dict(self.p_availability)
+        return self.p_availability
+
+
+def _check_bitmaps(
+    c_availability: Availability,
+    p_availability: Availability,
+) -> Tuple[SlotBitmap, SlotBitmap]:
+    """Check that both sides' availability are bitmaps over the same slots"""
+    bitmaps = (c_availability, p_availability)
+    if not all(isinstance(bitmap, SlotBitmap) for bitmap in bitmaps):
+        raise ValueError("Pass both availabilities as SlotBitmaps or neither")
+    if list(c_availability.slots) != list(p_availability.slots):
+        raise ValueError("Both SlotBitmaps must have the same slots")
+    return c_availability, p_availability
+
+
+def _unpack(bits: np.ndarray, n_slots: int) -> np.ndarray:
+    """Unpack rows of little-endian bits into a boolean matrix"""
+    grid = np.unpackbits(bits, axis=1, count=n_slots, bitorder="little")
+    return grid.astype(bool)
+
+
+def schedule_subproblem(
+    subproblem: Tuple[Availability, Availability, dict, str, bool, bool],
+    registry: Optional[NameRegistry] = None,
+) -> Tuple[InterviewTime, dict, Optional[Feasibility]]:
+    """Schedule the interviews of a component or batch, e.g. in a process pool
+
+    The subproblem holds the availabilities, interviews, engine, instrument
+    and prepass arguments of a Scheduler, which interns names in registry,
+    and returns its schedule, metrics and feasibility.
+    """
+    c_availability, p_availability, interviews, engine, *flags = subproblem
+    scheduler = Scheduler(
+        c_availability,
+        p_availability,
+        interviews,
+        engine,
+        instrument=flags[0],
+        prepass=flags[1],
+        registry=registry,
+    )
+    scheduler.schedule_interviews()
+    metrics = scheduler.metrics.to_dict()
+    return scheduler.scheduled, metrics, scheduler.feasibility
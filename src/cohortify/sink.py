@@ -0,0 +1,166 @@
+from __future__ import annotations  # prevents NameErrors for typing
+import json
+import os
+import queue
+import threading
+from pathlib import Path
+from typing import List, Optional, Tuple, Union
+
+Event = Tuple[int, str, str, Optional[str], Optional[str]]
+FIELDS = ("offer_round", "log_type", "proposer", "recipient", "old_offer")
+
+_CLOSE = None  # sentinel that tells the writer thread to stop
+
+
+class JsonlSink:
+    """Streams log events to JSONL files from a background writer thread
+
+    Events are pushed onto a bounded queue by the matching thread and a
+    daemon thread drains the queue in batches, serializing each event as one
+    line of JSON. Optionally the file is rotated once it exceeds max_bytes,
+    keeping backup_count older files named path.1, path.2, etc.
+    """
+
+    def __init__(
+        self,
+        path: Union[str, Path],
+        max_queue: int = 10_000,
+        batch_size: int = 1_000,
+        max_bytes: int = 0,
+        backup_count: int = 0,
+        block: bool = True,
+    ) -> None:
+        """Initializes the JsonlSink class and starts the writer thread
+
+        Parameters
+        ----------
+        path: str | Path
+            The JSONL file that events are appended to
+        max_queue: int, default 10,000
+            The maximum number of events waiting to be written
+        batch_size: int, default 1,000
+            The maximum number of events written to the file at once
+        max_bytes: int, default 0
+            Rotate the file once it reaches this size, 0 disables rotation
+        backup_count: int, default 0
+            The number of rotated files to keep, rotation is disabled if 0
+        block: bool, default True
+            If True, write() waits for room when the queue is full, otherwise
+            the event is dropped and counted in JsonlSink.dropped
+        """
+        self.path = Path(path)
+        self.batch_size = batch_size
+        self.max_bytes = max_bytes
+        self.backup_count = backup_count
+        self.block = block
+        self.dropped = 0
+        self.written = 0
+        self.closed = False
+        self._queue: queue.Queue = queue.Queue(maxsize=max_queue)
+        self._error: Optional[BaseException] = None
+        # the file stays open for the writer thread until close()
+        self._file = open(  # pylint: disable=consider-using-with
+            self.path, "a", encoding="utf-8"
+        )
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def __enter__(self) -> JsonlSink:
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+    def write(self, event: Event) -> None:
+        """Queue an event to be written without waiting on any file I/O
+
+        Parameters
+        ----------
+        event: Tuple
+            The offer round, log type, proposer, recipient and old offer
+
+        Raises
+        ------
+        ValueError
+            If the sink is closed, since no thread is left to write the event
+        """
+        self._check_open()
+        try:
+            self._queue.put(event, block=self.block)
+        except queue.Full:
+            self.dropped += 1
+
+    def flush(self) -> None:
+        """Wait until every queued event has been written to the file"""
+        self._check_open()
+        self._queue.join()
+        self._raise_error()
+
+    def close(self) -> None:
+        """Write any queued events, then stop the thread and close the file"""
+        if self.closed:
+            return
+        self.closed = True
+        self._queue.put(_CLOSE)
+        self._thread.join()
+        self._file.close()
+        self._raise_error()
+
+    def _check_open(self) -> None:
+        """Raise a ValueError if the sink has been closed"""
+        if self.closed:
+            raise ValueError("I/O operation on closed JsonlSink")
+
+    def _raise_error(self) -> None:
+        """Re-raise an exception from the writer thread on the caller"""
+        if self._error is not None:
+            error, self._error = self._error, None
+            raise error
+
+    def _run(self) -> None:
+        """Drain the queue in batches until the close sentinel is received"""
+        running = True
+        while running:
+            batch: List[Event] = [self._queue.get()]
+            while len(batch) < self.batch_size:
+                try:
+                    batch.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            if batch[-1] is _CLOSE:
+                batch.pop()
+                running = False
+            try:
+                if self._error is None:
+                    self._write_batch(batch)
+            except Exception as error:  # pylint: disable=broad-except
+                self._error = error
+            finally:
+                for _ in range(len(batch) + (not running)):
+                    self._queue.task_done()
+
+    def _write_batch(self, batch: List[Event]) -> None:
+        """Serialize a batch of events and append them to the file"""
+        lines = [json.dumps(dict(zip(FIELDS, event))) for event in batch]
+        if lines:
+            self._file.write("\n".join(lines) + "\n")
+            self._file.flush()
+            self.written += len(lines)
+        if self.max_bytes and self.backup_count:
+            if self._file.tell() >= self.max_bytes:
+                self._rotate()
+
+    def _rotate(self) -> None:
+        """Shift path.1 to path.2 and so on, then start a new file"""
+        self._file.close()
+        for i in range(self.backup_count - 1, 0, -1):
+            src = self.path.with_name(f"{self.path.name}.{i}")
+            if src.exists():
+                os.replace(
+                    src, self.path.with_name(f"{self.path.name}.{i + 1}")
+                )
+        os.replace(self.path, self.path.with_name(f"{self.path.name}.1"))
+        # the file stays open for the writer thread until close()
+        self._file = open(  # pylint: disable=consider-using-with
+            self.path, "a", encoding="utf-8"
+        )
@@ -0,0 +1,318 @@
+from __future__ import annotations  # prevents NameErrors for typing
+import json
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple, Union
+
+import numpy as np
+
+from cohortify.market import load_names, save_names
+
+Availability = Dict[str, List[str]]
+Intervals = Dict[str, List[Tuple[datetime, datetime]]]
+
+FORMAT_VERSION = 1
+
+
+class SlotBitmap:
+    """Availability of many people over a shared list of time slots
+
+    Each person's availability is one row of a packed bit matrix, with bit
+    ``j`` of a row set if they're available for ``slots[j]``, so the slots
+    two people share is the bitwise AND of their rows. Bits are packed
+    little-endian into bytes, see np.packbits().
+    """
+
+    def __init__(
+        self,
+        names: List[str],
+        slots: List[str],
+        bits: np.ndarray,
+    ) -> None:
+        """Initializes the SlotBitmap class
+
+        Parameters
+        ----------
+        names: List[str]
+            The names of the people, position in the list is their row
+        slots: List[str]
+            The time slots, position in the list is their bit
+        bits: np.ndarray
+            A uint8 array of shape (len(names), ceil(len(slots) / 8))
+        """
+        self.names = names
+        self.slots = slots
+        self.bits = bits
+        self.index = {name: i for i, name in enumerate(names)}
+        # set by SlotBitmap.load(), lets pickles refer to the files on disk
+        self.path: Optional[Path] = None
+
+    def __reduce_ex__(self, protocol):
+        """Pickle a memory-mapped SlotBitmap as its path, see Market"""
+        if self.path is None:
+            return super().__reduce_ex__(protocol)
+        return (SlotBitmap.load, (self.path,))
+
+    @classmethod
+    def from_availability(
+        cls,
+        availability: Availability,
+        slots: Optional[List[str]] = None,
+    ) -> SlotBitmap:
+        """Build a SlotBitmap from a dictionary of availability
+
+        Parameters
+        ----------
+        availability: Dict[str, List[str]]
+            Each person mapped to the time slots they're available for
+        slots: List[str], optional
+            The time slots in order, by default every slot in availability
+            in the order they first appear. Pass the same list to compare
+            bitmaps for candidates and positions
+
+        Raises
+        ------
+        KeyError
+            If someone is available for a slot missing from slots
+        """
+        if slots is None:
+            slots = list(
+                dict.fromkeys(
+                    t for times in availability.values() for t in times
+                )
+            )
+        index = {slot: j for j, slot in enumerate(slots)}
+        lengths = np.fromiter(
+            map(len, availability.values()), np.int64, len(availability)
+        )
+        rows = np.repeat(np.arange(len(availability)), lengths)
+        cols = np.fromiter(
+            (index[t] for times in availability.values() for t in times),
+            np.int64,
+            len(rows),
+        )
+        return cls.from_codes(list(availability), list(slots), rows, cols)
+
+    @classmethod
+    def from_codes(
+        cls,
+        names: List[str],
+        slots: List[str],
+        rows: np.ndarray,
+        cols: np.ndarray,
+    ) -> SlotBitmap:
+        """Build a SlotBitmap from the row and column of every available slot
+
+        Parameters
+        ----------
+        names: List[str]
+            The names of the people, position in the list is their row
+        slots: List[str]
+            The time slots, position in the list is their bit
+        rows: np.ndarray
+            The row of the person in each (person, slot) pair
+        cols: np.ndarray
+            The column of the slot in each (person, slot) pair
+        """
+        rows = np.asarray(rows, dtype=np.int64)
+        cols = np.asarray(cols, dtype=np.int64)
+        bits = np.zeros((len(names), -(-len(slots) // 8)), np.uint8)
+        np.bitwise_or.at(bits, (rows, cols >> 3), 1 << (cols & 7))
+        return cls(names, slots, bits)
+
+    @property
+    def n_slots(self) -> int:
+        """Number of time slots"""
+        return len(self.slots)
+
+    def row(self, name: str) -> np.ndarray:
+        """Return the packed bits of one person's availability"""
+        return self.bits[self.index[name]]
+
+    def times(self, name: str) -> List[str]:
+        """Return the time slots one person is available for"""
+        return self._decode(self.row(name))
+
+    def shared(
+        self, name: str, other: SlotBitmap, other_name: str
+    ) -> List[str]:
+        """Return the time slots two people are both available for
+
+        Both bitmaps must have been built over the same list of slots.
+        """
+        return self._decode(self.row(name) & other.row(other_name))
+
+    def subset(self, names: List[str]) -> SlotBitmap:
+        """Return a bitmap with the rows of some names over the same slots
+
+        Raises
+        ------
+        KeyError
+            If one of the names isn't in the bitmap
+        """
+        return self.take([self.index[name] for name in names])
+
+    def take(self, rows: Union[List[int], np.ndarray]) -> SlotBitmap:
+        """Return a bitmap with some rows over the same slots
+
+        Unlike subset(), the rows are selected by position, so no names are
+        looked up, e.g. for rows mapped ahead of time from another set of ids
+        """
+        rows = np.asarray(rows, dtype=np.int64)
+        names = [self.names[row] for row in rows.tolist()]
+        return SlotBitmap(names, self.slots, self.bits[rows])
+
+    def to_availability(self) -> Availability:
+        """Return a dictionary of availability in the format Scheduler takes
+
+        Each person's time slots are listed in the order of SlotBitmap.slots
+        """
+        grid = np.unpackbits(
+            self.bits, axis=1, count=self.n_slots, bitorder="little"
+        ).astype(bool)
+        slots = np.array(self.slots, dtype=object)
+        return {
+            name: slots[row].tolist() for name, row in zip(self.names, grid)
+        }
+
+    def save(self, path: Union[str, Path]) -> None:
+        """Save the bitmap to a directory of .npy files
+
+        Parameters
+        ----------
+        path: str | Path
+            The directory to write, which is created if it doesn't exist
+        """
+        path = Path(path)
+        path.mkdir(parents=True, exist_ok=True)
+        np.save(path / "bits.npy", np.asarray(self.bits))
+        save_names(path / "names.npy", self.names)
+        save_names(path / "slots.npy", self.slots)
+        meta = {
+            "format": FORMAT_VERSION,
+            "n_names": len(self.names),
+            "n_slots": self.n_slots,
+        }
+        (path / "slots.json").write_text(json.dumps(meta))
+
+    @classmethod
+    def load(
+        cls,
+        path: Union[str, Path],
+        mmap_mode: Optional[str] = "r",
+    ) -> SlotBitmap:
+        """Load a bitmap saved by SlotBitmap.save(), see Market.load()"""
+        path = Path(path)
+        meta = json.loads((path / "slots.json").read_text())
+        if meta["format"] != FORMAT_VERSION:
+            raise ValueError(f"Unsupported slots format {meta['format']}")
+        bitmap = cls(
+            names=load_names(path / "names.npy", meta["n_names"]),
+            slots=load_names(path / "slots.npy", meta["n_slots"]),
+            bits=np.load(path / "bits.npy", mmap_mode=mmap_mode),
+        )
+        if mmap_mode is not None:
+            bitmap.path = path
+        return bitmap
+
+    def _decode(self, row: np.ndarray) -> List[str]:
+        """Return the time slots of the bits that are set in a packed row"""
+        bits = np.unpackbits(row, count=self.n_slots, bitorder="little")
+        return [self.slots[j] for j in np.flatnonzero(bits)]
+
+
+class TimeGrid:
+    """Common grid of equal-length time slots that intervals are mapped to
+
+    Availability given as (start, stop) intervals is converted to bits on
+    the grid, so intervals of different lengths that cover the same slots
+    line up, e.g. "Mon 9:00-10:00" covers the slots of "Mon 9:00-9:30".
+    Interviews that last several slots are scheduled in blocks of
+    consecutive slots that start at multiples of their duration.
+    """
+
+    def __init__(
+        self,
+        start: datetime,
+        stop: datetime,
+        step: timedelta = timedelta(minutes=30),
+        fmt: str = "%a %H:%M",
+    ) -> None:
+        """Initializes the TimeGrid class
+
+        Parameters
+        ----------
+        start: datetime
+            The start of the first slot
+        stop: datetime
+            The end of the grid, a partial slot at the end is dropped
+        step: timedelta, default 30 minutes
+            The length of each slot
+        fmt: str, default "%a %H:%M"
+            The format of the slot labels, see datetime.strftime()
+        """
+        self.start = start
+        self.step = step
+        self.fmt = fmt
+        self.n_slots = max(0, (stop - start) // step)
+
+    def labels(self, duration: int = 1) -> List[str]:
+        """Return the label of each block of duration slots
+
+        Parameters
+        ----------
+        duration: int, default 1
+            The number of consecutive slots in each block
+        """
+        step = self.step * duration
+        return [
+            (self.start + j * step).strftime(self.fmt)
+            for j in range(self.n_slots // duration)
+        ]
+
+    def bitmap(self, intervals: Intervals, duration: int = 1) -> SlotBitmap:
+        """Convert intervals of availability to a SlotBitmap on the grid
+
+        A person is available for a slot if their intervals cover all of it,
+        and for a block if they're available for every slot in it, so
+        adjacent intervals like 9:00-9:30 and 9:30-10:00 combine.
+
+        Parameters
+        ----------
+        intervals: Dict[str, List[Tuple[datetime, datetime]]]
+            Each person mapped to the (start, stop) times they're available
+        duration: int, default 1
+            The number of consecutive slots an interview takes. The slots of
+            the bitmap are the blocks labelled by labels(duration)
+
+        Returns
+        -------
+        SlotBitmap
+            The availability of each person, use the same grid and duration
+            for candidates and positions so their bitmaps can be compared
+        """
+        if duration < 1:
+            raise ValueError("duration must be at least 1")
+        n_slots = self.n_slots
+        rows, firsts, lasts = [], [], []
+        for row, spans in enumerate(intervals.values()):
+            for begin, end in spans:
+                rows.append(row)
+                # slots that start at or after begin and end by end
+                firsts.append(-((self.start - begin) // self.step))
+                lasts.append((end - self.start) // self.step)
+        rows = np.array(rows, np.int64)
+        firsts = np.clip(np.array(firsts, np.int64), 0, n_slots)
+        lasts = np.clip(np.array(lasts, np.int64), 0, n_slots)
+        keep = firsts < lasts
+        # +1 at the first slot and -1 after the last slot of each interval
+        diff = np.zeros((len(intervals), n_slots + 1), np.int64)
+        np.add.at(diff, (rows[keep], firsts[keep]), 1)
+        np.add.at(diff, (rows[keep], lasts[keep]), -1)
+        covered = np.cumsum(diff[:, :n_slots], axis=1) > 0
+        n_blocks = n_slots // duration
+        blocks = covered[:, : n_blocks * duration].reshape(
+            len(intervals), n_blocks, duration
+        )
+        bits = np.packbits(blocks.all(axis=2), axis=1, bitorder="little")
+        return SlotBitmap(list(intervals), self.labels(duration), bits)
@@ -0,0 +1,147 @@
+from __future__ import annotations  # prevents NameErrors for typing
+from dataclasses import dataclass, field
+from typing import Dict, List, Tuple
+
+import numpy as np
+
+from cohortify.market import Market
+
+Name = str
+Match = Tuple[Name, Name]
+
+
+@dataclass
+class StabilityReport:
+    """Problems found in a matching by verify_matching()
+
+    Attributes
+    ----------
+    blocking_pairs: List[Tuple[str, str]]
+        Unmatched (proposer, recipient) pairs who rank each other and would
+        both rather be matched together than keep one of their matches, or
+        who both still have capacity left
+    unacceptable: List[Tuple[str, str]]
+        Matches in which either side didn't rank the other
+    p_over_capacity: Dict[str, int]
+        Proposers with more matches than their capacity, mapped to the
+        number of matches they have
+    r_over_capacity: Dict[str, int]
+        Recipients with more matches than their capacity, mapped to the
+        number of matches they have
+    """
+
+    blocking_pairs: List[Match] = field(default_factory=list)
+    unacceptable: List[Match] = field(default_factory=list)
+    p_over_capacity: Dict[Name, int] = field(default_factory=dict)
+    r_over_capacity: Dict[Name, int] = field(default_factory=dict)
+
+    @property
+    def is_valid(self) -> bool:
+        """Are all matches acceptable and within capacity?"""
+        return not (
+            self.unacceptable or self.p_over_capacity or self.r_over_capacity
+        )
+
+    @property
+    def is_stable(self) -> bool:
+        """Is the matching valid and free of blocking pairs?"""
+        return self.is_valid and not self.blocking_pairs
+
+
+def verify_matching(
+    market: Market,
+    matches: List[Match],
+    p_capacity: np.ndarray,
+    r_capacity: np.ndarray,
+) -> StabilityReport:
+    """Check a matching for blocking pairs, capacity and acceptability
+
+    Instead of comparing every pair of candidates with Candidate.prefers(),
+    each candidate's threshold is computed once: the rank of their least
+    preferred match if they're at capacity, or no limit otherwise. An
+    unmatched pair then blocks the matching if each side ranks the other
+    above their threshold, which is checked for every ranked pair at once,
+    so the whole check is a sort of the matches plus a few passes over the
+    market's arrays.
+
+    Parameters
+    ----------
+    market: Market
+        The market the matching was made for
+    matches: List[Tuple[str, str]]
+        The (proposer, recipient) pairs of the matching
+    p_capacity: np.ndarray
+        Maximum number of matches for each proposer, aligned with their ids
+    r_capacity: np.ndarray
+        Maximum number of matches for each recipient, aligned with their ids
+
+    Returns
+    -------
+    StabilityReport
+        The blocking pairs, unacceptable matches and capacity violations
+
+    Raises
+    ------
+    KeyError
+        If a match includes a name that isn't in the market
+    """
+    n_proposers, n_recipients = market.n_proposers, market.n_recipients
+    p_ids = np.array([market.p_index[p] for p, _ in matches], np.int64)
+    r_ids = np.array([market.r_index[r] for _, r in matches], np.int64)
+    p_count = np.bincount(p_ids, minlength=n_proposers)
+    r_count = np.bincount(r_ids, minlength=n_recipients)
+
+    # find the edge of each match in the proposers' ranked lists
+    offsets = np.asarray(market.p_offsets)
+    targets = np.asarray(market.p_targets)
+    p_rank_of_r = np.asarray(market.p_ranks)  # recipient's rank of proposer
+    rows = np.repeat(np.arange(n_proposers), np.diff(offsets))
+    own = np.arange(len(targets)) - offsets[rows] + 1  # proposer's rank
+    keys = rows * n_recipients + targets
+    order = np.argsort(keys, kind="stable")
+    match_keys = p_ids * n_recipients + r_ids
+    pos = np.searchsorted(keys[order], match_keys)
+    found = pos < len(keys)
+    found[found] = keys[order[pos[found]]] == match_keys[found]
+    edges = order[pos[found]]
+    acceptable = found.copy()
+    acceptable[found] = p_rank_of_r[edges] > 0
+    edges = edges[p_rank_of_r[edges] > 0]
+
+    # the rank of each candidate's least preferred acceptable match, ranks
+    # can count unknown names, so candidates with capacity left get no limit
+    limit = np.iinfo(np.int64).max
+    p_worst = np.zeros(n_proposers, np.int64)
+    r_worst = np.zeros(n_recipients, np.int64)
+    np.maximum.at(p_worst, rows[edges], own[edges])
+    np.maximum.at(r_worst, targets[edges], p_rank_of_r[edges])
+    p_worst[p_count < p_capacity] = limit
+    r_worst[r_count < r_capacity] = limit
+
+    matched = np.zeros(len(targets), bool)
+    matched[edges] = True
+    blocking = (
+        ~matched
+        & (p_rank_of_r > 0)
+        & (own < p_worst[rows])
+        & (p_rank_of_r < r_worst[targets])
+    )
+    blocking = np.flatnonzero(blocking)
+    return StabilityReport(
+        blocking_pairs=[
+            (market.proposers[p], market.recipients[r])
+            for p, r in zip(rows[blocking], targets[blocking])
+        ],
+        unacceptable=[m for m, ok in zip(matches, acceptable) if not ok],
+        p_over_capacity=_over(market.proposers, p_count, p_capacity),
+        r_over_capacity=_over(market.recipients, r_count, r_capacity),
+    )
+
+
+def _over(
+    names: List[Name],
+    count: np.ndarray,
+    capacity: np.ndarray,
+) -> Dict[Name, int]:
+    """Map each name with more matches than its capacity to its matches"""
+    return {names[i]: int(count[i]) for i in np.flatnonzero(count > capacity)}
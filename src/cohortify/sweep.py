@@ -0,0 +1,125 @@
+from __future__ import annotations  # prevents NameErrors for typing
+import os
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Union
+
+import numpy as np
+
+from cohortify.engine import MatchState, resume
+from cohortify.market import Market
+
+Capacity = Dict[str, int]
+
+# read-only market shared by the scenarios run in each worker process
+_SWEEP_MARKET: Optional[Market] = None
+
+
+@dataclass
+class Scenario:
+    """Capacities and minimums for one run of a parameter sweep"""
+
+    p_capacity: Union[int, Capacity] = 1
+    r_capacity: Union[int, Capacity] = 1
+    p_min: int = 0
+    r_min: int = 0
+
+
+@dataclass
+class ScenarioSummary:
+    """Compact result of one scenario in a parameter sweep
+
+    Attributes
+    ----------
+    scenario: Scenario
+        The capacities and minimums that were matched
+    n_matches: int
+        The total number of matches between proposers and recipients
+    p_remaining: int
+        The number of proposers with fewer than p_min matches, which is the
+        length of MatchResult.get_remaining("proposers")
+    r_remaining: int
+        The number of recipients with fewer than r_min matches, which is the
+        length of MatchResult.get_remaining("recipients")
+    """
+
+    scenario: Scenario
+    n_matches: int
+    p_remaining: int
+    r_remaining: int
+
+
+def run_scenarios(
+    market: Market,
+    scenarios: List[Scenario],
+    n_jobs: int = 1,
+) -> List[ScenarioSummary]:
+    """Match a market with the array engine under each scenario
+
+    Parameters
+    ----------
+    market: Market
+        The shared, read-only market every scenario is matched on
+    scenarios: List[Scenario]
+        The capacities and minimums to match, in any order
+    n_jobs: int, default 1
+        The number of processes used to run the scenarios, or -1 to use
+        every CPU. Each worker receives a copy of the market only once
+
+    Returns
+    -------
+    List[ScenarioSummary]
+        A summary of the matching for each scenario, in the same order
+    """
+    n_jobs = (os.cpu_count() or 1) if n_jobs == -1 else n_jobs
+    workers = min(n_jobs, len(scenarios))
+    if workers <= 1:
+        return [_summarize(market, scenario) for scenario in scenarios]
+    chunksize = max(1, len(scenarios) // (workers * 4))
+    with ProcessPoolExecutor(
+        max_workers=workers,
+        initializer=_init_sweep,
+        initargs=(market,),
+    ) as pool:
+        return list(pool.map(_sweep, scenarios, chunksize=chunksize))
+
+
+def _summarize(market: Market, scenario: Scenario) -> ScenarioSummary:
+    """Run the array engine for one scenario and summarize the matching"""
+    p_capacity, r_capacity = scenario.p_capacity, scenario.r_capacity
+    state = MatchState(
+        market,
+        p_capacity=_capacities(market, "proposers", p_capacity),
+        r_capacity=_capacities(market, "recipients", r_capacity),
+    )
+    resume(state, range(market.n_proposers))
+    p_count = np.array(state.p_count, dtype=np.int64)
+    r_count = np.array([len(heap) for heap in state.held], dtype=np.int64)
+    return ScenarioSummary(
+        scenario=scenario,
+        n_matches=int(p_count.sum()),
+        p_remaining=int((p_count < scenario.p_min).sum()),
+        r_remaining=int((r_count < scenario.r_min).sum()),
+    )
+
+
+def _capacities(
+    market: Market,
+    kind: str,
+    capacity: Union[int, Capacity],
+) -> np.ndarray:
+    """Return the capacity array for one side from an int or a dictionary"""
+    if isinstance(capacity, int):
+        return market.capacities(kind, {}, default_capacity=capacity)
+    return market.capacities(kind, capacity)
+
+
+def _init_sweep(market: Market) -> None:
+    """Store the shared market in a worker process of run_scenarios()"""
+    global _SWEEP_MARKET  # pylint: disable=global-statement
+    _SWEEP_MARKET = market
+
+
+def _sweep(scenario: Scenario) -> ScenarioSummary:
+    """Summarize one scenario on the shared market, used by process pools"""
+    return _summarize(_SWEEP_MARKET, scenario)
@@ -0,0 +1,65 @@
+from cohortify.booking import book_greedily, book_same_time, booking_order
+
+MUTUAL = {
+    ("Position 1", "Bob"): ["9am", "10am"],
+    ("Position 1", "Alice"): ["9am"],
+    ("Position 2", "Alice"): ["9am", "10am"],
+}
+
+
+def test_booking_order():
+    """Interviews with fewer mutual slots go first, then by name"""
+    mutual = {**MUTUAL, ("Position 3", "Charlie"): []}
+    assert booking_order(mutual) == [
+        ("Position 1", "Alice"),
+        ("Position 2", "Alice"),
+        ("Position 1", "Bob"),
+    ]
+
+
+def test_book_greedily():
+    """Each interview is booked at its first slot free for both sides"""
+    scheduled, booked = book_greedily(booking_order(MUTUAL), MUTUAL)
+    assert scheduled == {
+        ("Position 1", "Alice"): "9am",
+        ("Position 2", "Alice"): "10am",
+        ("Position 1", "Bob"): "10am",
+    }
+    assert booked[("candidate", "Alice", "9am")] == ("Position 1", "Alice")
+
+
+def test_moves_blocking_interviews():
+    """An interview left out is booked by moving the one in its way"""
+    # setup -- the greedy pass books Alice at 9am for Position 1, and
+    # Position 3 at 12pm for Dana, so Position 3 can't meet Alice
+    mutual = {
+        ("Position 1", "Alice"): ["9am", "10am"],
+        ("Position 3", "Alice"): ["9am", "12pm"],
+        ("Position 3", "Dana"): ["12pm"],
+    }
+    greedy = book_greedily(booking_order(mutual), mutual)[0]
+    # execution
+    scheduled = book_same_time(mutual)
+    # validation
+    assert ("Position 3", "Alice") not in greedy
+    assert scheduled == {
+        ("Position 3", "Dana"): "12pm",
+        ("Position 1", "Alice"): "10am",
+        ("Position 3", "Alice"): "9am",
+    }
+
+
+def test_independent_of_order():
+    """The same interviews are booked for any order and for each group"""
+    # setup
+    other = {
+        ("Position 4", "Dana"): ["9am"],
+        ("Position 4", "Eve"): ["9am", "11am"],
+    }
+    mutual = {**MUTUAL, **other}
+    # execution
+    scheduled = book_same_time(mutual)
+    reverse = book_same_time(dict(reversed(list(mutual.items()))))
+    # validation
+    assert scheduled == reverse
+    assert scheduled == {**book_same_time(MUTUAL), **book_same_time(other)}
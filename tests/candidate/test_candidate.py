@@ -83,6 +83,47 @@ class TestHasCapacity:
         assert alice.has_capacity is True
 
 
+class TestCompareOffers:
+    """Tests the Candidate.compare_offers() method"""
+
+    def test_rejects_least_preferred_match(self, alice: Candidate):
+        """Return the current match ranked below the new offer"""
+        # setup
+        alice.capacity = 2
+        alice.add_match("Bob")
+        alice.add_match("Dana")
+        # validation
+        assert alice.worst_match() == "Dana"
+        assert alice.compare_offers("Charlie") == "Dana"
+
+    def test_rejects_new_offer(self, alice: Candidate):
+        """Return the new offer if every current match is preferred to it"""
+        # setup
+        alice.add_match("Bob")
+        alice.add_match("Charlie")
+        # validation
+        assert alice.compare_offers("Dana") == "Dana"
+        assert alice.compare_offers("Eddie") == "Eddie"
+
+    def test_worst_match_after_removal(self, alice: Candidate):
+        """Removed matches are skipped when finding the worst match"""
+        # setup
+        alice.add_match("Bob")
+        alice.add_match("Dana")
+        alice.remove_match("Dana")
+        # validation
+        assert alice.worst_match() == "Bob"
+        alice.remove_match("Bob")
+        assert alice.worst_match() is None
+
+    def test_matches_changed_directly(self, alice: Candidate):
+        """The heap is rebuilt if matches were added without add_match()"""
+        # setup
+        alice.matches.update(["Bob", "Charlie"])
+        # validation
+        assert alice.worst_match() == "Charlie"
+
+
 def test_create_candidate_list():
     """Test create candidate list"""
     # setup
@@ -101,3 +142,36 @@ def test_create_candidate_list():
     assert charlie.capacity == 1
     for name in preferences:
         assert name in c_list
+
+
+class TestOffers:
+    """Tests the cursor over a candidate's offers"""
+
+    def test_next_offer(self, alice: Candidate):
+        """Offers are made in order until none are left"""
+        # execution
+        offers = [alice.next_offer() for _ in range(4)]
+        # validation
+        assert offers == ["Bob", "Charlie", "Dana", None]
+        assert alice.has_offers() is False
+
+    def test_offers_left_resumes(self, alice: Candidate):
+        """Stopping early leaves the remaining offers for the next call"""
+        # execution
+        for offer in alice.offers_left:
+            if offer == "Charlie":
+                break
+        # validation
+        assert alice.has_offers() is True
+        assert list(alice.offers_left) == ["Dana"]
+        assert alice.next_offer() is None
+
+
+def test_compact_candidate(alice: Candidate):
+    """Candidates are slotted and their rankings are built up front"""
+    assert not hasattr(alice, "__dict__")
+    assert alice.rankings == {"Bob": 1, "Charlie": 2, "Dana": 3}
+    empty = Candidate("Eddie", [], 1)
+    assert empty.rankings is empty.rankings
+    assert empty.ranks("Alice") is None
+    assert empty.has_offers() is False
@@ -0,0 +1,181 @@
+import random
+
+import numpy as np
+
+from cohortify.engine import (
+    MatchState,
+    deferred_acceptance,
+    resume,
+    round_deferred_acceptance,
+    warm_start,
+)
+from cohortify.market import Market
+from tests.matcher.matcher_data import random_prefs
+
+
+# markets a bit larger than the Matcher tests' to exercise more rounds
+SIZES = {"n_p": 30, "n_r": 10, "p_length": 6, "r_length": 15}
+
+
+def is_stable(market: Market, held, p_cap, r_cap) -> bool:
+    """Brute force check that there are no blocking pairs"""
+    p_matches = {p: set() for p in range(market.n_proposers)}
+    for r, ps in enumerate(held):
+        for p in ps:
+            p_matches[p].add(r)
+    r_rank = {}
+    for r in range(market.n_recipients):
+        start, end = market.r_offsets[r], market.r_offsets[r + 1]
+        for k in range(start, end):
+            r_rank[(r, market.r_targets[k])] = k - start + 1
+    for p in range(market.n_proposers):
+        start, end = market.p_offsets[p], market.p_offsets[p + 1]
+        prefs = market.p_targets[start:end].tolist()
+        for r in prefs:
+            if r in p_matches[p] or (r, p) not in r_rank:
+                continue
+            p_wants = len(p_matches[p]) < p_cap[p] or any(
+                prefs.index(r) < prefs.index(m) for m in p_matches[p]
+            )
+            r_wants = len(held[r]) < r_cap[r] or any(
+                r_rank[(r, p)] < r_rank[(r, q)] for q in held[r]
+            )
+            if p_wants and r_wants:
+                return False
+    return True
+
+
+def test_respects_capacities_and_stability():
+    """The array engine returns a stable matching within capacities"""
+    for seed in range(20):
+        p_prefs, r_prefs = random_prefs(seed, **SIZES)
+        market = Market.from_preferences(p_prefs, r_prefs)
+        p_cap = np.full(market.n_proposers, 2)
+        r_cap = np.full(market.n_recipients, 3)
+        held = deferred_acceptance(market, p_cap, r_cap)
+        counts = np.bincount(
+            [p for ps in held for p in ps],
+            minlength=market.n_proposers,
+        )
+        assert all(len(ps) <= 3 for ps in held)
+        assert (counts <= 2).all()
+        assert is_stable(market, held, p_cap, r_cap)
+
+
+def test_zero_capacity_recipient_rejects_all():
+    """A recipient with no capacity never holds an offer"""
+    market = Market.from_preferences({"A": ["X"]}, {"X": ["A"]})
+    held = deferred_acceptance(market, np.array([1]), np.array([0]))
+    assert held == [[]]
+
+
+class TestRounds:
+    """Tests deferred acceptance in rounds of bulk offers"""
+
+    def test_same_as_serial(self):
+        """Bulk rounds give the same matches as one offer at a time"""
+        for seed in range(50):
+            # setup -- random capacities, including zero and unranked pairs
+            rng = np.random.default_rng(seed)
+            p_prefs, r_prefs = random_prefs(seed, **SIZES)
+            market = Market.from_preferences(p_prefs, r_prefs)
+            p_cap = rng.integers(0, 4, market.n_proposers)
+            r_cap = rng.integers(0, 5, market.n_recipients)
+            expected = deferred_acceptance(market, p_cap, r_cap)
+            # execution
+            held = round_deferred_acceptance(market, p_cap, r_cap)
+            # validation
+            assert list(map(sorted, held)) == list(map(sorted, expected))
+            assert is_stable(market, held, p_cap, r_cap)
+
+    def test_stats(self):
+        """Rounds, offers and rejections are added to the stats"""
+        # setup -- both proposers want R0, which only has room for one
+        market = Market.from_preferences(
+            {"P0": ["R0", "R1"], "P1": ["R0"]},
+            {"R0": ["P1", "P0"], "R1": ["P0"]},
+        )
+        stats = {"rounds": 1}
+        # execution
+        held = round_deferred_acceptance(
+            market, np.ones(2, int), np.ones(2, int), stats=stats
+        )
+        # validation
+        assert held == [[1], [0]]
+        assert stats == {"rounds": 3, "offers": 3, "rejections": 1}
+
+    def test_empty_market(self):
+        """A market without recipients has nothing to match"""
+        market = Market.from_preferences({"P0": []}, {})
+        held = round_deferred_acceptance(market, np.ones(1), np.ones(0))
+        assert held == []
+
+
+def run(market: Market, p_cap: int, r_cap: int) -> MatchState:
+    """Run deferred acceptance from scratch with uniform capacities"""
+    state = MatchState(
+        market,
+        np.full(market.n_proposers, p_cap),
+        np.full(market.n_recipients, r_cap),
+    )
+    resume(state, range(market.n_proposers))
+    return state
+
+
+def named(state: MatchState):
+    """Convert the held offers of a state to a set of named pairs"""
+    market = state.market
+    return {
+        (market.proposers[p], market.recipients[r])
+        for r, ps in enumerate(state.held_proposers())
+        for p in ps
+    }
+
+
+class TestWarmStart:
+    """Tests warm_start() against deferred acceptance from scratch"""
+
+    def test_no_changes_keeps_the_state(self):
+        """Without any changes nothing is undone or proposed again"""
+        market = Market.from_preferences(*random_prefs(0, **SIZES))
+        state = run(market, 1, 2)
+        new = warm_start(state, market, set(), set(), *caps(market, 1, 2))
+        assert named(new) == named(state)
+        assert len(new.log) == len(state.log)
+
+    def test_random_changes_match_a_full_run(self):
+        """Changed, added and removed candidates give the same matching"""
+        for seed in range(30):
+            rng = random.Random(seed)
+            p_prefs, r_prefs = random_prefs(seed, **SIZES)
+            state = run(Market.from_preferences(p_prefs, r_prefs), 2, 3)
+            recipients = list(r_prefs)
+            # change the lists of some proposers and recipients
+            p_changed = set(rng.sample(list(p_prefs), 4))
+            r_changed = set(rng.sample(recipients, 2))
+            for p in p_changed:
+                p_prefs[p] = rng.sample(recipients, 5)
+            for r in r_changed:
+                r_prefs[r] = rng.sample(list(p_prefs), 12)
+            # withdraw one proposer and add a new one
+            gone = rng.choice(sorted(set(p_prefs) - p_changed))
+            del p_prefs[gone]
+            p_prefs["New"] = rng.sample(recipients, 3)
+            r_prefs[recipients[0]].append("New")
+            p_changed |= {gone, "New"}
+            r_changed.add(recipients[0])
+            # execution
+            market = Market.from_preferences(p_prefs, r_prefs)
+            new = warm_start(
+                state, market, p_changed, r_changed, *caps(market, 2, 3)
+            )
+            # validation
+            assert named(new) == named(run(market, 2, 3))
+
+
+def caps(market: Market, p_cap: int, r_cap: int):
+    """Return uniform capacity arrays for both sides of a market"""
+    return (
+        np.full(market.n_proposers, p_cap),
+        np.full(market.n_recipients, r_cap),
+    )
@@ -0,0 +1,63 @@
+from cohortify.flow import UnitFlowNetwork
+
+
+def test_max_flow():
+    """Tests max flow on a network that needs a reversed edge"""
+    # setup -- the greedy path s-a-d-t blocks both other paths
+    net = UnitFlowNetwork(n_nodes=6)
+    s, a, b, c, d, t = range(6)
+    net.add_edge(s, a)
+    net.add_edge(s, b)
+    net.add_edge(a, c)
+    net.add_edge(a, d)
+    net.add_edge(b, d)
+    net.add_edge(c, t)
+    net.add_edge(d, t)
+    # validation
+    assert net.max_flow(s, t) == 2
+    assert net.max_flow(s, t) == 0  # already at a maximum
+
+
+def test_augment_after_adding_edge():
+    """Tests that the flow can be repaired with a single augmenting path"""
+    # setup
+    net = UnitFlowNetwork(n_nodes=3)
+    s, a, t = range(3)
+    e = net.add_edge(s, a)
+    assert net.max_flow(s, t) == 0
+    # execution
+    net.add_edge(a, t)
+    # validation
+    assert net.augment(s, t) is True
+    assert net.flow(e) == 1
+    assert net.augment(s, t) is False
+
+
+def test_add_node():
+    """Tests that nodes and edges are counted"""
+    net = UnitFlowNetwork()
+    u, v = net.add_node(), net.add_node()
+    e = net.add_edge(u, v)
+    assert net.n_nodes == 2
+    assert net.n_edges == 1
+    assert net.tail(e) == u
+
+
+def test_add_nodes_and_edges_in_bulk():
+    """Tests that bulk additions match adding nodes and edges one by one"""
+    # setup
+    expected = UnitFlowNetwork(n_nodes=1)
+    for _ in range(3):
+        expected.add_node()
+    for u, v in [(0, 1), (0, 2), (1, 3), (2, 3)]:
+        expected.add_edge(u, v)
+    # execution
+    net = UnitFlowNetwork(n_nodes=1)
+    assert net.add_nodes(3) == range(1, 4)
+    edges = net.add_edges([0, 0, 1, 2], [1, 2, 3, 3])
+    # validation
+    assert list(edges) == [0, 2, 4, 6]
+    assert net.heads == expected.heads
+    assert net.caps == expected.caps
+    assert net.adj == expected.adj
+    assert net.max_flow(0, 3) == 2
@@ -0,0 +1,139 @@
+import pytest
+
+try:
+    import pandas as pd
+    from cohortify.loaders import load_availability, load_preferences
+except (ImportError, ValueError):  # e.g. pandas built against another numpy
+    pd = None
+from cohortify.market import Market
+from cohortify.matcher import Matcher
+from cohortify.slots import SlotBitmap
+
+pytestmark = pytest.mark.skipif(pd is None, reason="pandas can't be imported")
+
+P_PREFS = {
+    "Alice": ["Position 1", "Position 2"],
+    "Bob": ["Position 1"],
+    "Charlie": ["Position 2", "Position 1"],
+}
+R_PREFS = {
+    "Position 1": ["Bob", "Alice", "Charlie"],
+    "Position 2": ["Alice", "Charlie"],
+}
+
+
+def to_long(prefs) -> "pd.DataFrame":
+    """Convert a dictionary of preferences to a long-format DataFrame"""
+    rows = [
+        (who, whom, rank)
+        for who, ranked in prefs.items()
+        for rank, whom in enumerate(ranked, start=1)
+    ]
+    # shuffle the rows so the loader has to sort them by rank
+    return pd.DataFrame(rows[::-1], columns=["who", "whom", "rank"])
+
+
+class TestLoadPreferences:
+    """Tests load_preferences()"""
+
+    def test_matches_from_preferences(self, tmp_path):
+        """CSV files load to the same Market as the dictionaries"""
+        # setup
+        to_long(P_PREFS).to_csv(tmp_path / "p.csv", index=False)
+        to_long(R_PREFS).to_csv(tmp_path / "r.csv", index=False)
+        expected = Market.from_preferences(P_PREFS, R_PREFS)
+        # execution
+        market = load_preferences(tmp_path / "p.csv", tmp_path / "r.csv")
+        # validation
+        assert market.preferences("proposers") == P_PREFS
+        assert market.preferences("recipients") == R_PREFS
+        for side in ["proposers", "recipients"]:
+            assert market.preferences(side) == expected.preferences(side)
+        assert sorted(market.p_ranks.tolist()) == sorted(
+            expected.p_ranks.tolist()
+        )
+
+    def test_feeds_matcher(self):
+        """A loaded market can be matched with the array engine"""
+        market = load_preferences(to_long(P_PREFS), to_long(R_PREFS))
+        matcher = Matcher.from_market(market, engine="array")
+        result = matcher.assign_matches(r_capacity=2)
+        expected = Matcher(P_PREFS, R_PREFS).assign_matches(r_capacity=2)
+        assert sorted(result.matches) == sorted(expected.matches)
+
+    @pytest.mark.parametrize(
+        "row, problem",
+        [
+            (("Alice", "Position 2", 3), "people ranked twice"),
+            (("Bob", "Position 2", 1), "repeated ranks"),
+            (("Bob", "Position 2", 3), "rank gaps"),
+            (("Bob", "Position 2", 0), "invalid ranks"),
+            (("Bob", "Position 3", 2), "unknown names"),
+            ((None, "Position 2", 2), "missing names"),
+        ],
+    )
+    def test_invalid_rows(self, row, problem):
+        """Invalid rows raise a ValueError that describes them"""
+        p_df = to_long(P_PREFS)
+        p_df.loc[len(p_df)] = row
+        with pytest.raises(ValueError, match=problem):
+            load_preferences(p_df, to_long(R_PREFS))
+
+    def test_drop_unknown(self):
+        """Unknown names can be dropped like Market.from_preferences()"""
+        r_df = to_long({**R_PREFS, "Position 2": ["Dana", "Alice"]})
+        market = load_preferences(to_long(P_PREFS), r_df, drop_unknown=True)
+        assert market.preferences("recipients")["Position 2"] == ["Alice"]
+
+
+class TestLoadAvailability:
+    """Tests load_availability()"""
+
+    def test_groups_slots(self, tmp_path):
+        """Slots are grouped by name in the order they appear"""
+        # setup
+        df = pd.DataFrame(
+            [("Alice", "9am"), ("Bob", "9am"), ("Alice", "10am")],
+            columns=["who", "slot"],
+        )
+        df.to_csv(tmp_path / "a.csv", index=False)
+        # execution
+        availability = load_availability(tmp_path / "a.csv")
+        # validation
+        assert availability == {"Alice": ["9am", "10am"], "Bob": ["9am"]}
+
+    def test_invalid_rows(self):
+        """Missing values, duplicate slots and unknown names raise an error"""
+        df = pd.DataFrame(
+            [("Alice", "9am"), ("Alice", "9am"), ("Bob", "10am")],
+            columns=["who", "slot"],
+        )
+        with pytest.raises(ValueError, match="duplicate slots"):
+            load_availability(df)
+        with pytest.raises(ValueError, match="unknown names"):
+            load_availability(df.iloc[1:], known=["Alice"])
+        missing = pd.DataFrame(
+            [("Alice", "9am"), (None, "10am"), ("Bob", None)],
+            columns=["who", "slot"],
+        )
+        with pytest.raises(ValueError, match="missing values"):
+            load_availability(missing)
+
+    def test_bitmap(self):
+        """A bitmap over given slots matches one built from the dictionary"""
+        # setup
+        df = pd.DataFrame(
+            [("Alice", "10am"), ("Bob", "9am"), ("Alice", "9am")],
+            columns=["who", "slot"],
+        )
+        slots = ["9am", "10am", "11am"]
+        expected = SlotBitmap.from_availability(load_availability(df), slots)
+        # execution
+        bitmap = load_availability(df, bitmap=True, slots=slots)
+        # validation
+        assert bitmap.names == expected.names
+        assert bitmap.slots == slots
+        assert (bitmap.bits == expected.bits).all()
+        assert load_availability(df, bitmap=True).slots == ["10am", "9am"]
+        with pytest.raises(ValueError, match="unknown slots"):
+            load_availability(df, bitmap=True, slots=["9am"])
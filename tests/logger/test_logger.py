@@ -1,7 +1,7 @@
 import pytest
 
 from cohortify.candidate import Candidate
-from cohortify.logger import Logger, LogType
+from cohortify.logger import LogEntry, Logger, LogStore, LogType, Verbosity
 
 OFFER_ROUND = 1
 PROPOSER = "Alice"
@@ -105,3 +105,118 @@ def test_has_offers(logger: Logger, charlie: Candidate) -> None:
     # validation
     last_log = logger.logs[-1]
     assert last_log.log_type == LogType.has_offers.value
+
+
+def test_no_recipient(logger: Logger, charlie: Candidate) -> None:
+    """Tests that logs without a recipient don't intern a placeholder name"""
+    # setup
+    logger.has_offers_left(candidate=charlie)
+    logger.no_offers_left()
+    # validation
+    for entry in logger.logs[-2:]:
+        assert entry.recipient is None
+    assert logger.logs.columns()["recipients"][-1] == -1
+    assert "N/A" not in logger.logs.registry.ids
+
+
+def test_accepts_offer_message(logger: Logger, charlie: Candidate) -> None:
+    """Tests that the message is built from the entry's fields when read"""
+    # setup
+    logger.new_offer_accepted(old_offer=charlie)
+    # validation
+    last_log = logger.logs[-1]
+    assert last_log.old_offer == "Charlie"
+    assert last_log.message.startswith("Bob prefers Alice to Charlie")
+
+
+def test_log_entry_positional_message() -> None:
+    """Tests that LogEntry still accepts a message as its fourth argument"""
+    # execution
+    entry = LogEntry(OFFER_ROUND, PROPOSER, "Custom", "Hello", RECIPIENT)
+    default = LogEntry(
+        OFFER_ROUND, PROPOSER, LogType.rejects_offer.value, recipient="Bob"
+    )
+    # validation
+    assert entry.message == "Hello"
+    assert entry.recipient == RECIPIENT
+    assert default.message.startswith("Bob did not prefer Alice")
+
+
+class TestVerbosity:
+    """Tests the verbosity levels of the Logger"""
+
+    def test_off(self, alice: Candidate, bob: Candidate) -> None:
+        """Tests that nothing is recorded when verbosity is off"""
+        # setup
+        logger = Logger(verbosity="off")
+        # execution
+        logger.init_round(OFFER_ROUND, proposer=alice, recipient=bob)
+        logger.has_capacity(kind="recipient")
+        # validation
+        assert len(logger.logs) == 0
+        assert not logger.counts
+
+    def test_counters(self, alice: Candidate, bob: Candidate) -> None:
+        """Tests that log types are counted without recording entries"""
+        # setup
+        logger = Logger(verbosity=Verbosity.counters)
+        # execution
+        logger.init_round(OFFER_ROUND, proposer=alice, recipient=bob)
+        logger.has_capacity(kind="recipient")
+        logger.has_capacity(kind="recipient")
+        # validation
+        assert len(logger.logs) == 0
+        assert logger.counts[LogType.init_round] == 1
+        assert logger.counts[LogType.has_capacity_recipient] == 2
+
+    def test_full(self, logger: Logger) -> None:
+        """Tests that log types are counted as well as recorded in full"""
+        # validation
+        assert len(logger.logs) == 1
+        assert logger.counts[LogType.init_round] == 1
+
+
+class TestLogStore:
+    """Tests the LogStore class"""
+
+    @pytest.fixture(scope="function", name="store")
+    def mock_store(self) -> LogStore:
+        """Creates a LogStore with entries from two offer rounds"""
+        store = LogStore()
+        store.append(1, LogType.init_round, "Alice", "Bob")
+        store.append(1, LogType.has_capacity_recipient, "Alice", "Bob")
+        store.append(2, LogType.init_round, "Charlie", "Bob")
+        store.append(2, LogType.accepts_offer, "Charlie", "Bob", "Alice")
+        return store
+
+    def test_names_are_interned(self, store: LogStore) -> None:
+        """Tests that each name is only stored once"""
+        assert store.names == ["Alice", "Bob", "Charlie"]
+        assert len(store) == 4
+
+    def test_entries(self, store: LogStore) -> None:
+        """Tests that rows are materialized as LogEntry objects"""
+        # execution
+        entries = list(store)
+        last_log = store[-1]
+        # validation
+        assert all(isinstance(entry, LogEntry) for entry in entries)
+        assert entries[0].log_type == LogType.init_round.value
+        assert entries[0].old_offer is None
+        assert last_log.old_offer == "Alice"
+        assert "rejects the old offer from Alice" in last_log.message
+        assert store[1:3] == entries[1:3]
+
+    def test_filter(self, store: LogStore) -> None:
+        """Tests filtering by round, candidate and log type"""
+        # execution
+        round_two = store.filter(offer_round=2)
+        alice = store.filter(candidate="Alice")
+        init = store.filter(log_type=LogType.init_round)
+        combined = store.filter(offer_round=2, log_type=LogType.init_round)
+        # validation
+        assert [e.proposer for e in round_two] == ["Charlie", "Charlie"]
+        assert len(alice) == 3
+        assert [e.offer_round for e in init] == [1, 2]
+        assert len(combined) == 1
+        assert len(store.filter(candidate="Nobody")) == 0
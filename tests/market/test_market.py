@@ -0,0 +1,176 @@
+import pickle
+
+import numpy as np
+import pytest
+
+from cohortify.market import ARRAYS, Market, prune_preferences
+
+P_PREFS = {
+    "Alice": ["Position 1", "Position 2"],
+    "Bob": ["Position 2"],
+}
+R_PREFS = {
+    "Position 1": ["Bob", "Alice"],
+    "Position 2": ["Alice", "Zed"],
+}
+
+
+@pytest.fixture(scope="function", name="market")
+def mock_market():
+    """Creates a small Market for tests"""
+    return Market.from_preferences(P_PREFS, R_PREFS)
+
+
+def test_names_mapped_to_ids(market: Market):
+    """Names on each side are mapped to dense ids in insertion order"""
+    assert market.proposers == ["Alice", "Bob"]
+    assert market.recipients == ["Position 1", "Position 2"]
+    assert market.p_index["Bob"] == 1
+    assert market.r_index["Position 2"] == 1
+
+
+def test_proposer_csr(market: Market):
+    """Proposer preferences are stored as CSR offsets and target ids"""
+    assert market.p_offsets.tolist() == [0, 2, 3]
+    assert market.p_targets.tolist() == [0, 1, 1]
+
+
+def test_cross_ranks(market: Market):
+    """Each edge stores the rank the target assigns back, or 0 if unranked"""
+    # Position 1 ranks Alice 2nd, Position 2 ranks Alice 1st and not Bob
+    assert market.p_ranks.tolist() == [2, 1, 0]
+    # Bob ranks Position 1 not at all, Alice ranks Position 1 1st, etc.
+    assert market.r_ranks.tolist() == [0, 1, 2]
+
+
+def test_unknown_proposers_dropped(market: Market):
+    """Recipients' rankings of unknown proposers are ignored"""
+    assert market.r_offsets.tolist() == [0, 2, 3]
+
+
+def test_unknown_recipient_raises_key_error():
+    """Proposers ranking unknown recipients raise a KeyError"""
+    with pytest.raises(KeyError):
+        Market.from_preferences({"Alice": ["Nowhere"]}, R_PREFS)
+
+
+def test_capacities(market: Market):
+    """Capacities are aligned with ids and fall back to the default"""
+    caps = market.capacities("recipients", {"Position 2": 3})
+    assert caps.tolist() == [1, 3]
+    with pytest.raises(KeyError):
+        market.capacities("partners", {})
+
+
+def test_preferences(market: Market):
+    """Ranked lists convert back to names, without unknown names"""
+    assert market.preferences("proposers") == P_PREFS
+    assert market.preferences("recipients") == {
+        "Position 1": ["Bob", "Alice"],
+        "Position 2": ["Alice"],
+    }
+    with pytest.raises(KeyError):
+        market.preferences("partners")
+
+
+def test_transpose(market: Market):
+    """The transposed market shares the arrays with the sides swapped"""
+    # execution
+    transposed = market.transpose()
+    # validation
+    assert transposed.proposers == market.recipients
+    assert transposed.p_targets is market.r_targets
+    assert transposed.r_ranks is market.p_ranks
+    assert transposed.preferences("proposers") == market.preferences(
+        "recipients"
+    )
+
+
+def test_components():
+    """Only pairs who rank each other join candidates into a component"""
+    # setup -- Carol and Position 3 rank each other, Dan ranks no one back
+    market = Market.from_preferences(
+        {
+            "Alice": ["Position 1"],
+            "Bob": ["Position 2", "Position 1"],
+            "Carol": ["Position 3"],
+            "Dan": ["Position 1"],
+        },
+        {
+            "Position 1": ["Alice", "Bob"],
+            "Position 2": ["Bob"],
+            "Position 3": ["Carol"],
+        },
+    )
+    # execution
+    components = market.components()
+    # validation
+    assert [(p.tolist(), r.tolist()) for p, r in components] == [
+        ([0, 1], [0, 1]),
+        ([2], [2]),
+    ]
+
+
+def test_prune_preferences():
+    """Unknown names and one-sided rankings are removed and reported"""
+    # setup
+    p_prefs = {**P_PREFS, "Charlie": ["Position 3", "Position 2"]}
+    # execution
+    p_pruned, r_pruned, report = prune_preferences(p_prefs, R_PREFS)
+    # validation
+    assert p_pruned == {
+        "Alice": ["Position 1", "Position 2"],
+        "Bob": [],
+        "Charlie": [],
+    }
+    assert r_pruned == {"Position 1": ["Alice"], "Position 2": ["Alice"]}
+    assert report.p_unknown == [("Charlie", "Position 3")]
+    assert report.r_unknown == [("Position 2", "Zed")]
+    assert report.p_unacceptable == [
+        ("Bob", "Position 2"),
+        ("Charlie", "Position 2"),
+    ]
+    assert report.r_unacceptable == [("Position 1", "Bob")]
+    assert report.n_removed == 5
+
+
+class TestSaveLoad:
+    """Tests Market.save() and Market.load()"""
+
+    def test_round_trip(self, market: Market, tmp_path):
+        """Arrays are memory-mapped and names are restored"""
+        # execution
+        market.save(tmp_path / "market")
+        loaded = Market.load(tmp_path / "market")
+        # validation
+        assert loaded.proposers == market.proposers
+        assert loaded.recipients == market.recipients
+        assert loaded.p_index == market.p_index
+        for name in ARRAYS:
+            assert isinstance(getattr(loaded, name), np.memmap)
+            assert (getattr(loaded, name) == getattr(market, name)).all()
+
+    def test_pickled_by_path(self, market: Market, tmp_path):
+        """A memory-mapped Market is pickled as its path"""
+        market.save(tmp_path / "market")
+        loaded = Market.load(tmp_path / "market")
+        copy = pickle.loads(pickle.dumps(loaded))
+        assert copy.path == loaded.path
+        assert isinstance(copy.p_targets, np.memmap)
+        # markets in memory are still pickled with their arrays
+        copy = pickle.loads(pickle.dumps(market))
+        assert copy.path is None
+        assert copy.preferences("proposers") == P_PREFS
+
+    def test_load_into_memory(self, market: Market, tmp_path):
+        """mmap_mode=None reads the arrays into memory"""
+        market.save(tmp_path / "market")
+        loaded = Market.load(tmp_path / "market", mmap_mode=None)
+        assert loaded.path is None
+        assert not isinstance(loaded.p_targets, np.memmap)
+
+    def test_names_with_nul_raise_value_error(self, tmp_path):
+        """Names with NUL characters can't be stored in the name table"""
+        market = Market.from_preferences({"A\0": []}, {})
+        with pytest.raises(ValueError):
+            market.save(tmp_path / "market")
@@ -1,3 +1,6 @@
+import random
+from typing import Dict, List, Tuple, Union
+
 PREFS = {
     "complete": {
         "candidates": {
@@ -51,3 +54,25 @@ INTERVIEWS = {
         },
     },
 }
+
+
+def random_prefs(
+    rng: Union[int, random.Random],
+    n_p: int = 20,
+    n_r: int = 6,
+    p_length: int = 4,
+    r_length: int = 12,
+) -> Tuple[Dict[str, List[str]], Dict[str, List[str]]]:
+    """Create seeded random preferences with partial rank lists
+
+    Each of n_p candidates ranks p_length of the n_r positions, and each
+    position ranks r_length candidates. Pass a random.Random instead of a
+    seed to keep drawing from it after the preferences are created.
+    """
+    if isinstance(rng, int):
+        rng = random.Random(rng)
+    proposers = [f"Candidate {i}" for i in range(n_p)]
+    recipients = [f"Position {i}" for i in range(n_r)]
+    p_prefs = {p: rng.sample(recipients, p_length) for p in proposers}
+    r_prefs = {r: rng.sample(proposers, r_length) for r in recipients}
+    return p_prefs, r_prefs
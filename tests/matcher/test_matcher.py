@@ -1,8 +1,15 @@
+import random
+
 import pytest
 
-from cohortify.matcher import Matcher, MatchResult
-from cohortify.logger import LogEntry
-from tests.matcher.matcher_data import PREFS
+try:
+    import pandas as pd
+except (ImportError, ValueError):  # e.g. pandas built against another numpy
+    pd = None
+from cohortify.market import Market
+from cohortify.matcher import Matcher, MatchResult, Scenario
+from cohortify.logger import LogEntry, LogType
+from tests.matcher.matcher_data import PREFS, INTERVIEWS, random_prefs
 
 
 @pytest.fixture(scope="function", name="matcher")
@@ -137,6 +144,20 @@ class TestAssingInterviews:
         assert remaining == [charlie]
         assert isinstance(result.match_logs[0], LogEntry)
 
+    def test_logging_off(self):
+        """Tests that matches are unaffected when logging is turned off"""
+        # setup
+        p_prefs = INTERVIEWS["complete"]["candidates"]
+        r_prefs = INTERVIEWS["complete"]["positions"]
+        expected = Matcher(p_prefs, r_prefs).assign_matches()
+        # execution
+        matcher = Matcher(p_prefs, r_prefs, verbosity="off")
+        result = matcher.assign_matches()
+        # validation
+        assert sorted(result.matches) == sorted(expected.matches)
+        assert len(result.match_logs) == 0
+        assert not matcher.log.counts
+
     def test_unmatched_position(self, matcher: Matcher):
         """Tests that the correct set of positions are listed as unmatched if
         they can't be matched to interviews based on their preferences
@@ -194,3 +215,448 @@ class TestAssingInterviews:
         assert position2.matches == {alice.name}
         assert alice.matches == {position2.name}
         assert bob.matches == {position1.name}
+
+
+class TestArrayEngine:
+    """Tests Matcher.assign_matches() with the array engine"""
+
+    def test_invalid_engine(self):
+        """Raise a KeyError if the engine isn't supported"""
+        with pytest.raises(KeyError):
+            Matcher({}, {}, engine="fake")
+
+    def test_complete(self):
+        """Array engine returns the same matches as the object engine"""
+        # setup
+        p_prefs = INTERVIEWS["complete"]["candidates"]
+        r_prefs = INTERVIEWS["complete"]["positions"]
+        expected = Matcher(p_prefs, r_prefs).assign_matches(r_capacity=2)
+        # execution
+        matcher = Matcher(p_prefs, r_prefs, engine="array")
+        result = matcher.assign_matches(r_capacity=2)
+        # validation
+        assert isinstance(result, MatchResult)
+        assert sorted(result.matches) == sorted(expected.matches)
+
+    def test_candidate_matched_to_second_choice(self, matcher: Matcher):
+        """Candidate matched to second choice after being rejeceted from first"""
+        # setup
+        matcher.engine = "array"
+        matcher.proposer_prefs["Alice"] = ["Position 1", "Position 2"]
+        matcher.proposer_prefs["Bob"] = ["Position 1"]
+        matcher.recipient_prefs["Position 1"] = ["Bob", "Alice"]
+        matcher.recipient_prefs["Position 2"] = ["Alice", "Bob"]
+        # execution
+        result = matcher.assign_matches(p_capacity=1, r_capacity=1, p_min=1)
+        # validation
+        assert result.recipients.get("Position 1").matches == {"Bob"}
+        assert result.recipients.get("Position 2").matches == {"Alice"}
+        assert result.proposers.get("Alice").matches == {"Position 2"}
+        assert result.get_remaining(kind="proposers") == []
+
+    def test_random_markets_match_object_engine(self):
+        """Array engine agrees with the object engine on random markets"""
+        for seed in range(10):
+            # setup
+            p_prefs, r_prefs = random_prefs(seed)
+            # execution
+            expected = Matcher(p_prefs, r_prefs).assign_matches(2, 3)
+            result = Matcher(p_prefs, r_prefs, engine="array").assign_matches(
+                2, 3
+            )
+            # validation
+            assert sorted(result.matches) == sorted(expected.matches)
+
+
+class TestRoundsEngine:
+    """Tests Matcher.assign_matches() with the rounds engine"""
+
+    def test_random_markets_match_object_engine(self):
+        """Rounds engine agrees with the object engine on random markets"""
+        for seed in range(10):
+            # setup
+            rng = random.Random(seed)
+            p_prefs, r_prefs = random_prefs(rng, 30, 8, 5, 15)
+            r_capacity = {r: rng.randint(1, 4) for r in r_prefs}
+            # execution
+            expected = Matcher(p_prefs, r_prefs).assign_matches(2, r_capacity)
+            result = Matcher(p_prefs, r_prefs, engine="rounds").assign_matches(
+                2, r_capacity
+            )
+            # validation
+            assert sorted(result.matches) == sorted(expected.matches)
+            assert result.verify().is_stable
+
+    def test_rematch_from_scratch(self, matcher: Matcher):
+        """Results of the rounds engine can't be resumed"""
+        # setup
+        matcher.engine = "rounds"
+        result = matcher.assign_matches(r_capacity=2)
+        # execution
+        result = matcher.rematch(
+            result,
+            proposer_prefs={"Alice": ["Position 2"]},
+            recipient_prefs={"Position 2": ["Alice", "Bob"]},
+        )
+        # validation
+        assert result.state is None
+        assert result.proposers.get("Alice").matches == {"Position 2"}
+
+    def test_metrics(self, matcher: Matcher):
+        """Instrumented runs count the rounds, offers and rejections"""
+        # setup
+        matcher.engine = "rounds"
+        matcher.instrument = True
+        # execution
+        result = matcher.assign_matches()
+        # validation
+        counters = result.metrics.counters
+        assert counters["rounds"] >= 1
+        assert counters["offers"] >= len(result.matches)
+        assert "proposals" in result.metrics.timers
+
+
+class TestExtremalMatchings:
+    """Tests Matcher.extremal_matchings()"""
+
+    def test_cyclic_preferences(self):
+        """Each side gets its first choice in its own optimal matching"""
+        # setup -- everyone is someone else's first choice
+        p_prefs = {
+            "Alice": ["Position 1", "Position 2", "Position 3"],
+            "Bob": ["Position 2", "Position 3", "Position 1"],
+            "Charlie": ["Position 3", "Position 1", "Position 2"],
+        }
+        r_prefs = {
+            "Position 1": ["Bob", "Charlie", "Alice"],
+            "Position 2": ["Charlie", "Alice", "Bob"],
+            "Position 3": ["Alice", "Bob", "Charlie"],
+        }
+        # execution
+        extremal = Matcher(p_prefs, r_prefs).extremal_matchings()
+        # validation
+        assert sorted(extremal.proposer_optimal.matches) == [
+            ("Alice", "Position 1"),
+            ("Bob", "Position 2"),
+            ("Charlie", "Position 3"),
+        ]
+        assert sorted(extremal.recipient_optimal.matches) == [
+            ("Alice", "Position 3"),
+            ("Bob", "Position 1"),
+            ("Charlie", "Position 2"),
+        ]
+        assert extremal.p_differ == ["Alice", "Bob", "Charlie"]
+        assert extremal.r_differ == ["Position 1", "Position 2", "Position 3"]
+        assert not extremal.is_unique
+
+    def test_unique(self, matcher: Matcher):
+        """Nobody differs when there's only one stable matching"""
+        # execution
+        extremal = matcher.extremal_matchings(r_capacity=2)
+        # validation
+        assert extremal.is_unique
+        assert sorted(extremal.proposer_optimal.matches) == sorted(
+            extremal.recipient_optimal.matches
+        )
+        assert extremal.proposer_optimal.state is not None
+
+    @pytest.mark.parametrize("engine", ["array", "rounds"])
+    def test_same_as_swapping_sides(self, engine):
+        """Both matchings agree with running the Matcher each way"""
+        for seed in range(10):
+            # setup
+            rng = random.Random(seed)
+            p_prefs, r_prefs = random_prefs(rng)
+            r_capacity = {r: rng.randint(1, 3) for r in r_prefs}
+            forward = Matcher(p_prefs, r_prefs).assign_matches(1, r_capacity)
+            backward = Matcher(r_prefs, p_prefs).assign_matches(r_capacity, 1)
+            # execution
+            extremal = Matcher(
+                p_prefs, r_prefs, engine=engine
+            ).extremal_matchings(1, r_capacity)
+            # validation
+            assert sorted(extremal.proposer_optimal.matches) == sorted(
+                forward.matches
+            )
+            assert sorted(extremal.recipient_optimal.matches) == sorted(
+                (p, r) for r, p in backward.matches
+            )
+            assert extremal.recipient_optimal.verify().is_stable
+            differ = {
+                p
+                for p in p_prefs
+                if set(extremal.proposer_optimal.by_proposer[p])
+                != set(extremal.recipient_optimal.by_proposer[p])
+            }
+            assert set(extremal.p_differ) == differ
+
+
+class TestRematch:
+    """Tests Matcher.rematch()"""
+
+    def test_matches_a_full_run(self):
+        """Rematching agrees with matching the updated market from scratch"""
+        for seed in range(10):
+            # setup
+            rng = random.Random(seed)
+            p_prefs, r_prefs = random_prefs(rng)
+            proposers, recipients = list(p_prefs), list(r_prefs)
+            matcher = Matcher(p_prefs, r_prefs, engine="array")
+            result = matcher.assign_matches(2, 3)
+            p_changes = {
+                proposers[0]: rng.sample(recipients, 3),
+                proposers[1]: None,
+                "Candidate 20": recipients[:2],
+            }
+            r_changes = {
+                recipients[0]: rng.sample(proposers, 10) + ["Candidate 20"],
+                recipients[1]: None,
+            }
+            # execution
+            result = matcher.rematch(
+                result, p_changes, r_changes, r_capacity={recipients[2]: 1}
+            )
+            expected = Matcher(
+                matcher.proposer_prefs, matcher.recipient_prefs
+            ).assign_matches(
+                2, {**{r: 3 for r in recipients}, recipients[2]: 1}
+            )
+            # validation
+            assert proposers[1] not in matcher.proposer_prefs
+            assert recipients[1] not in matcher.recipient_prefs
+            assert sorted(result.matches) == sorted(expected.matches)
+
+    def test_object_engine_matches_from_scratch(self, matcher: Matcher):
+        """Results without an array engine state are recomputed in full"""
+        # setup
+        result = matcher.assign_matches(r_capacity=2)
+        # execution
+        result = matcher.rematch(
+            result,
+            proposer_prefs={"Alice": ["Position 2"]},
+            recipient_prefs={"Position 2": ["Alice", "Bob"]},
+        )
+        # validation
+        assert result.state is None
+        assert result.proposers.get("Alice").matches == {"Position 2"}
+
+
+class TestPrune:
+    """Tests matching with pruned preferences"""
+
+    @pytest.mark.parametrize("engine", ["object", "array", "rounds"])
+    def test_same_matches(self, engine):
+        """Pruning doesn't change the matches"""
+        for seed in range(10):
+            # setup
+            # random lists leave some rankings one-sided
+            p_prefs, r_prefs = random_prefs(seed)
+            expected = Matcher(p_prefs, r_prefs).assign_matches(2, 3)
+            # execution
+            matcher = Matcher(p_prefs, r_prefs, engine=engine, prune=True)
+            result = matcher.assign_matches(2, 3)
+            # validation
+            assert sorted(result.matches) == sorted(expected.matches)
+            assert matcher.prune_report.n_removed > 0
+
+    def test_unknown_names(self):
+        """Unknown names are reported instead of raising while matching"""
+        # setup
+        p_prefs = {"Alice": ["Position 9", "Position 1"]}
+        r_prefs = {"Position 1": ["Zed", "Alice"]}
+        # execution
+        matcher = Matcher(p_prefs, r_prefs, prune=True)
+        result = matcher.assign_matches()
+        # validation
+        assert result.matches == [("Alice", "Position 1")]
+        assert matcher.prune_report.p_unknown == [("Alice", "Position 9")]
+        assert matcher.prune_report.r_unknown == [("Position 1", "Zed")]
+        with pytest.raises(KeyError):
+            Matcher(p_prefs, r_prefs).assign_matches()
+
+    def test_rematch(self):
+        """Rematching re-prunes the lists and matches a full run"""
+        for seed in range(10):
+            # setup
+            p_prefs, r_prefs = random_prefs(seed)
+            proposers, recipients = list(p_prefs), list(r_prefs)
+            matcher = Matcher(p_prefs, r_prefs, engine="array", prune=True)
+            result = matcher.assign_matches(2, 3)
+            # a new recipient ranks someone who didn't rank them yet
+            r_changes = {
+                recipients[0]: proposers[:12],
+                recipients[1]: None,
+                "Position 6": proposers[10:],
+            }
+            p_changes = {proposers[11]: recipients[::-1] + ["Position 6"]}
+            # execution
+            result = matcher.rematch(result, p_changes, r_changes)
+            expected = Matcher(
+                {**p_prefs, **p_changes},
+                {
+                    **{r: r_prefs[r] for r in recipients[2:]},
+                    recipients[0]: proposers[:12],
+                    "Position 6": proposers[10:],
+                },
+                prune=True,
+            ).assign_matches(
+                2, {**{r: 3 for r in recipients}, "Position 6": 1}
+            )
+            # validation
+            assert sorted(result.matches) == sorted(expected.matches)
+            assert all(
+                recipients[1] not in ranked
+                for ranked in matcher.proposer_prefs.values()
+            )
+
+
+@pytest.fixture(scope="module", name="market")
+def mock_market():
+    """Create random preferences for a sweep"""
+    return random_prefs(0)
+
+
+class TestSweep:
+    """Tests Matcher.sweep()"""
+
+    @pytest.mark.parametrize("n_jobs", [1, 2])
+    def test_summaries_match_assign_matches(self, market, n_jobs):
+        """Each summary agrees with a full MatchResult for the scenario"""
+        # setup
+        p_prefs, r_prefs = market
+        scenarios = [
+            Scenario(p_capacity=1, r_capacity=2, p_min=1, r_min=2),
+            Scenario(p_capacity=2, r_capacity=3, p_min=2, r_min=1),
+            Scenario(r_capacity={"Position 0": 5}, p_min=1, r_min=1),
+        ]
+        # execution
+        summaries = Matcher(p_prefs, r_prefs).sweep(scenarios, n_jobs=n_jobs)
+        # validation
+        assert [s.scenario for s in summaries] == scenarios
+        for scenario, summary in zip(scenarios, summaries):
+            result = Matcher(p_prefs, r_prefs).assign_matches(
+                scenario.p_capacity,
+                scenario.r_capacity,
+                scenario.p_min,
+                scenario.r_min,
+            )
+            assert summary.n_matches == len(result.matches)
+            p_remaining = result.get_remaining("proposers")
+            r_remaining = result.get_remaining("recipients")
+            assert summary.p_remaining == len(p_remaining)
+            assert summary.r_remaining == len(r_remaining)
+
+
+class TestInstrumentation:
+    """Tests the metrics recorded by an instrumented Matcher"""
+
+    @pytest.mark.parametrize("engine", ["object", "array"])
+    def test_counters_match_logs(self, market, engine):
+        """Counters agree with the logs of the object engine"""
+        # setup
+        p_prefs, r_prefs = market
+        expected = Matcher(p_prefs, r_prefs, verbosity="counters")
+        expected.assign_matches(2, 3)
+        counts = expected.log.counts
+        exported = []
+        matcher = Matcher(
+            p_prefs,
+            r_prefs,
+            engine=engine,
+            verbosity="off",
+            instrument=True,
+            metrics_hook=lambda run, data: exported.append((run, data)),
+        )
+        # execution
+        result = matcher.assign_matches(2, 3)
+        # validation
+        counters = result.metrics.counters
+        assert counters["evictions"] == counts[LogType.accepts_offer]
+        assert counters["rejections"] == counts[LogType.rejects_offer]
+        assert "proposals" in result.metrics.timers
+        assert exported == [("match", result.metrics.to_dict())]
+
+    def test_disabled_by_default(self, matcher: Matcher):
+        """Nothing is recorded unless the matcher is instrumented"""
+        result = matcher.assign_matches()
+        assert result.metrics.to_dict() == {"timers": {}, "counters": {}}
+
+
+def test_from_market(matcher: Matcher, monkeypatch):
+    """A Matcher created from a Market reuses it for the array engine"""
+    market = Market.from_preferences(
+        matcher.proposer_prefs, matcher.recipient_prefs
+    )
+    built = []
+    preferences = market.preferences
+    monkeypatch.setattr(
+        market,
+        "preferences",
+        lambda kind: built.append(kind) or preferences(kind),
+    )
+    new = Matcher.from_market(market, engine="array")
+    assert not built  # the preferences are only built once they're needed
+    assert new.registry.ids.keys() == matcher.registry.ids.keys()
+    assert new.proposer_prefs == matcher.proposer_prefs
+    assert built == ["proposers"]
+    assert new.build_market() is market
+    assert sorted(new.assign_matches().matches) == sorted(
+        matcher.assign_matches().matches
+    )
+
+
+class TestMatchResult:
+    """Tests the indexes and exports of MatchResult"""
+
+    @pytest.fixture(scope="function", name="result")
+    def mock_result(self, matcher: Matcher):
+        """Match Alice and Bob, leaving Charlie and Position 3 unmatched"""
+        matcher.recipient_prefs["Position 3"] = []
+        return matcher.assign_matches(p_min=1, r_min=1)
+
+    def test_indexes(self, result: MatchResult):
+        """Matches are indexed by proposer and by recipient"""
+        assert result.by_proposer == {
+            "Alice": ["Position 1"],
+            "Bob": ["Position 2"],
+            "Charlie": [],
+        }
+        assert result.by_recipient["Position 2"] == ["Bob"]
+        assert result.by_recipient["Position 3"] == []
+
+    def test_cached(self, result: MatchResult):
+        """Matches and remaining candidates are only built once"""
+        first, second = result.matches, result.matches
+        assert first is second
+        assert result.get_remaining() is result.get_remaining()
+        assert [c.name for c in result.get_remaining("recipients")] == [
+            "Position 3"
+        ]
+        with pytest.raises(KeyError):
+            result.get_remaining("partners")
+
+    def test_match_counts(self, result: MatchResult):
+        """Histograms count the candidates with each number of matches"""
+        assert result.match_counts("proposers") == {0: 1, 1: 2}
+        assert result.match_counts("recipients") == {0: 1, 1: 2}
+
+    @pytest.mark.skipif(pd is None, reason="pandas can't be imported")
+    def test_to_dataframe(self, result: MatchResult):
+        """Matches and remaining candidates export to DataFrames"""
+        matches = result.to_dataframe()
+        assert list(matches.columns) == ["proposer", "recipient"]
+        assert len(matches) == 2
+        remaining = result.to_dataframe("remaining")
+        assert remaining.to_dict("records") == [
+            {"kind": "proposers", "name": "Charlie", "n_matches": 0},
+            {"kind": "recipients", "name": "Position 3", "n_matches": 0},
+        ]
+        with pytest.raises(KeyError):
+            result.to_dataframe("logs")
+
+    def test_to_arrow(self, result: MatchResult):
+        """Matches export to Arrow tables"""
+        pytest.importorskip("pyarrow")
+        table = result.to_arrow()
+        assert table.column_names == ["proposer", "recipient"]
+        assert table.num_rows == 2
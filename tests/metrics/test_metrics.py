@@ -0,0 +1,41 @@
+from cohortify.metrics import Metrics
+
+
+def test_phase_and_count():
+    """Timers accumulate across phases and counters across calls"""
+    # setup
+    metrics = Metrics()
+    # execution
+    for _ in range(2):
+        with metrics.phase("build"):
+            pass
+        metrics.count("rounds", 3)
+    # validation
+    assert set(metrics.timers) == {"build"}
+    assert metrics.timers["build"] >= 0
+    assert metrics.counters["rounds"] == 6
+
+
+def test_disabled_records_nothing():
+    """A disabled instance ignores every timer and counter"""
+    # setup
+    metrics = Metrics(enabled=False, hook=lambda *args: 1 / 0)
+    # execution
+    with metrics.phase("build"):
+        metrics.count("rounds")
+    metrics.add_time("build", 1.0)
+    metrics.export("match")
+    # validation
+    assert metrics.to_dict() == {"timers": {}, "counters": {}}
+
+
+def test_export_calls_hook():
+    """export() passes the run name and plain dictionaries to the hook"""
+    # setup
+    exported = []
+    metrics = Metrics(hook=lambda run, data: exported.append((run, data)))
+    metrics.count("rounds")
+    # execution
+    metrics.export("match")
+    # validation
+    assert exported == [("match", {"timers": {}, "counters": {"rounds": 1}})]
@@ -0,0 +1,167 @@
+import random
+
+import pytest
+
+from cohortify.matcher import Matcher
+from cohortify.pipeline import Pipeline
+from cohortify.registry import NameRegistry
+from cohortify.scheduler import Scheduler
+from cohortify.slots import SlotBitmap
+from tests.matcher.matcher_data import PREFS
+from tests.scheduler.scheduler_data import AVAIAILABILITY, SCHEDULE
+
+TIMES = [f"{hour}:00" for hour in range(9, 17)]
+
+
+def ranked(prefs: dict) -> dict:
+    """Convert {name: {other: rank}} to {name: [others in ranked order]}"""
+    return {
+        name: sorted(ranks, key=ranks.get) for name, ranks in prefs.items()
+    }
+
+
+def random_tracks(seed: int, n_tracks: int = 4):
+    """Create a market of tracks whose candidates only rank their own track"""
+    rng = random.Random(seed)
+    c_prefs, p_prefs, c_availability, p_availability = {}, {}, {}, {}
+    for track in range(n_tracks):
+        candidates = [f"Candidate {track}-{i}" for i in range(6)]
+        positions = [f"Position {track}-{j}" for j in range(3)]
+        for c in candidates:
+            c_prefs[c] = rng.sample(positions, 3)
+            c_availability[c] = rng.sample(TIMES, 3)
+        for p in positions:
+            p_prefs[p] = rng.sample(candidates, 5)
+            p_availability[p] = rng.sample(TIMES, 5)
+    return c_prefs, p_prefs, c_availability, p_availability
+
+
+@pytest.fixture(scope="function", name="pipeline")
+def mock_pipeline():
+    """Creates a Pipeline for the complete example"""
+    prefs = PREFS["complete"]
+    return Pipeline(
+        ranked(prefs["candidates"]),
+        ranked(prefs["positions"]),
+        AVAIAILABILITY["candidates"],
+        AVAIAILABILITY["positions"],
+        c_interviews=3,
+        p_interviews=3,
+    )
+
+
+class TestRun:
+    """Tests matching and scheduling with Pipeline.run()"""
+
+    def test_complete(self, pipeline: Pipeline):
+        """Every interview is matched and scheduled"""
+        # execution
+        result = pipeline.run()
+        # validation
+        assert len(result.matches.matches) == 9
+        assert set(result.scheduled) == set(SCHEDULE)
+        assert result.unscheduled == []
+        assert pipeline.result is result
+
+    def test_same_as_separate_steps(self):
+        """The pipeline gives the same result as a Matcher then a Scheduler"""
+        for seed in range(5):
+            # setup
+            c_prefs, p_prefs, c_avail, p_avail = random_tracks(seed)
+            expected = Matcher(c_prefs, p_prefs).assign_matches(2, 3)
+            s = Scheduler(c_avail, p_avail, expected.by_recipient)
+            s.schedule_interviews()
+            # execution
+            pipeline = Pipeline(
+                c_prefs,
+                p_prefs,
+                c_avail,
+                p_avail,
+                c_interviews=2,
+                p_interviews=3,
+                batch_size=1,
+            )
+            result = pipeline.run()
+            # validation
+            assert len(pipeline.tracks()) == 4
+            assert sorted(result.matches.matches) == sorted(expected.matches)
+            assert len(result.scheduled) == len(s.scheduled)
+            for (p, c), time in result.scheduled.items():
+                assert c in expected.by_recipient[p]
+                assert time in p_avail[p]
+
+    def test_worker_processes(self):
+        """Tracks scheduled in a process pool give the same schedule size"""
+        # setup
+        inputs = random_tracks(seed=7)
+        expected = Pipeline(*inputs, c_interviews=2, batch_size=1).run()
+        # execution
+        result = Pipeline(
+            *inputs, c_interviews=2, n_jobs=2, batch_size=1
+        ).run()
+        # validation
+        assert result.matches.matches == expected.matches.matches
+        assert len(result.scheduled) == len(expected.scheduled)
+
+    def test_bitmaps_and_prepass(self):
+        """Bitmap availability is split by track and pre-passes add up"""
+        # setup
+        c_prefs, p_prefs, c_avail, p_avail = random_tracks(seed=3)
+        c_map = SlotBitmap.from_availability(c_avail, TIMES)
+        p_map = SlotBitmap.from_availability(p_avail, TIMES)
+        # execution
+        result = Pipeline(
+            c_prefs, p_prefs, c_map, p_map, p_interviews=2, prepass=True
+        ).run()
+        # validation
+        assert result.feasibility.greedy <= result.feasibility.upper_bound
+        assert len(result.scheduled) <= result.feasibility.upper_bound
+        for (p, c), time in result.scheduled.items():
+            assert time in c_avail[c] and time in p_avail[p]
+
+    def test_invalid_engine(self):
+        """Raise a KeyError if the scheduling engine isn't supported"""
+        with pytest.raises(KeyError):
+            Pipeline({}, {}, {}, {}, engine="fake")
+
+
+class TestPlace:
+    """Tests the final placement with Pipeline.place()"""
+
+    def test_interviewed_only(self, pipeline: Pipeline):
+        """Candidates are only placed in positions they interviewed with"""
+        # setup
+        pipeline.run()
+        del pipeline.result.scheduled[("Position 1", "Alice")]
+        prefs = PREFS["complete"]
+        # execution
+        placement = pipeline.place(
+            ranked(prefs["candidates"]), ranked(prefs["positions"])
+        )
+        # validation
+        assert pipeline.result.placement is placement
+        # Alice loses her first choice and the others prefer someone else
+        assert ("Alice", "Position 1") not in placement.matches
+        assert placement.by_proposer["Alice"] == []
+
+    def test_shares_registry(self, pipeline: Pipeline):
+        """Every step uses the same registry"""
+        # setup
+        registry = pipeline.registry
+        pipeline.run()
+        prefs = PREFS["complete"]
+        # execution
+        pipeline.place(ranked(prefs["candidates"]), ranked(prefs["positions"]))
+        # validation
+        assert isinstance(registry, NameRegistry)
+        assert pipeline.matcher.registry is registry
+        assert pipeline.matcher.log.logs.registry is registry
+        # the scheduled names are interned once, when the market is built
+        market = pipeline.market
+        assert registry.names == market.proposers + market.recipients
+        assert all(c in registry for _, c in pipeline.result.scheduled)
+
+    def test_place_before_run(self, pipeline: Pipeline):
+        """Raise a ValueError if there are no interviews to place from yet"""
+        with pytest.raises(ValueError):
+            pipeline.place({}, {})
@@ -0,0 +1,162 @@
+from cohortify.logger import LogStore, LogType
+from cohortify.matcher import Matcher
+from cohortify.registry import NameRegistry
+from cohortify.scheduler import Scheduler
+from tests.matcher.matcher_data import INTERVIEWS
+from tests.scheduler.scheduler_data import AVAIAILABILITY, SCHEDULE
+from tests.scheduler.scheduler_data import INTERVIEWS as SCHEDULE_INTERVIEWS
+
+
+class TestNameRegistry:
+    """Tests the NameRegistry class"""
+
+    def test_intern(self):
+        """Names get dense ids in the order they're first interned"""
+        # setup
+        registry = NameRegistry(["Alice", "Bob"])
+        # execution
+        ids = [registry.intern(name) for name in ["Bob", "Charlie", None]]
+        # validation
+        assert ids == [1, 2, -1]
+        assert registry.names == ["Alice", "Bob", "Charlie"]
+        assert len(registry) == 3
+        assert "Charlie" in registry
+
+    def test_get_and_name(self):
+        """Lookups never add names and -1 converts back to None"""
+        # setup
+        registry = NameRegistry(["Alice"])
+        # validation
+        assert registry.get("Bob") == -1
+        assert "Bob" not in registry
+        assert registry.name(0) == "Alice"
+        assert registry.name(-1) is None
+
+    def test_intern_many(self):
+        """Many names are interned at once and duplicates share an id"""
+        # setup
+        registry = NameRegistry()
+        # execution
+        ids = registry.intern_many(["Alice", "Bob", "Alice"])
+        # validation
+        assert ids.tolist() == [0, 1, 0]
+
+    def test_empty_registry_is_shared(self):
+        """An empty registry is still shared instead of being replaced"""
+        # setup
+        registry = NameRegistry()
+        # execution
+        store = LogStore(registry)
+        store.append(1, LogType.init_round, "Alice", "Position 1")
+        # validation
+        assert store.registry is registry
+        assert registry.names == ["Alice", "Position 1"]
+
+
+class TestSharedRegistry:
+    """Tests sharing one registry across a Matcher and a Scheduler"""
+
+    def test_matcher_logs_use_registry_ids(self):
+        """The logs store the ids the Matcher interned"""
+        # setup
+        registry = NameRegistry()
+        prefs = INTERVIEWS["match swapping"]
+        # execution
+        matcher = Matcher(
+            prefs["candidates"], prefs["positions"], registry=registry
+        )
+        result = matcher.assign_matches(r_capacity=2)
+        # validation
+        assert matcher.log.logs.registry is registry
+        proposers = result.match_logs.columns()["proposers"]
+        names = {registry.names[i] for i in proposers.tolist()}
+        assert names == {"Alice", "Bob", "Charlie"}
+        assert len(result.match_logs.filter(candidate="Bob")) > 0
+
+    def test_object_engine_unchanged(self):
+        """A shared registry doesn't change the object engine's matches"""
+        # setup
+        prefs = INTERVIEWS["complete"]
+        expected = Matcher(
+            prefs["candidates"], prefs["positions"], engine="array"
+        ).assign_matches(p_capacity=3, r_capacity=3)
+        # execution
+        result = Matcher(
+            prefs["candidates"],
+            prefs["positions"],
+            registry=NameRegistry(["Position 9"]),
+        ).assign_matches(p_capacity=3, r_capacity=3)
+        # validation
+        assert sorted(result.matches) == sorted(expected.matches)
+
+    def test_scheduler_shares_registry(self):
+        """A Scheduler reuses the ids of the Matcher's registry"""
+        # setup
+        prefs = INTERVIEWS["complete"]
+        matcher = Matcher(prefs["candidates"], prefs["positions"])
+        matcher.assign_matches(p_capacity=3, r_capacity=3)
+        ids = dict(matcher.registry.ids)
+        # execution
+        s = Scheduler(
+            AVAIAILABILITY["candidates"],
+            AVAIAILABILITY["positions"],
+            SCHEDULE_INTERVIEWS,
+            engine="unit_flow",
+            registry=matcher.registry,
+        )
+        s.schedule_interviews()
+        # validation
+        assert ids  # the matcher's logs interned names first
+        assert all(matcher.registry.ids[name] == i for name, i in ids.items())
+        assert set(s.scheduled) == set(SCHEDULE)
+        assert ("Position 1", "Alice") in s.scheduled
+
+    def test_scheduler_updates_intern_new_names(self):
+        """Names first seen in an update are added to the registry"""
+        # setup
+        registry = NameRegistry()
+        s = Scheduler(
+            AVAIAILABILITY["candidates"],
+            AVAIAILABILITY["positions"],
+            SCHEDULE_INTERVIEWS,
+            engine="unit_flow",
+            registry=registry,
+        )
+        s.schedule_interviews()
+        # execution
+        s.add_availability("Dana", "9am")
+        s.add_availability("Dana", "5pm")
+        s.add_availability("Position 1", "5pm", kind="position")
+        s.add_interview("Position 1", "Dana")
+        # validation
+        assert "Dana" in registry
+        assert s.scheduled[("Position 1", "Dana")] == "5pm"
+        # execution -- cancelling frees the slot again
+        s.cancel_interview("Position 1", "Dana")
+        assert ("Position 1", "Dana") not in s.scheduled
+
+    def test_scheduler_takes_interview_ids(self):
+        """Interviews passed as registry ids are scheduled like names"""
+        # setup
+        registry = NameRegistry()
+        expected = Scheduler(
+            AVAIAILABILITY["candidates"],
+            AVAIAILABILITY["positions"],
+            SCHEDULE_INTERVIEWS,
+            engine="unit_flow",
+            registry=registry,
+        )
+        expected.schedule_interviews()
+        ids = [tuple(map(registry.get, i)) for i in expected.interviews]
+        # execution
+        s = Scheduler(
+            AVAIAILABILITY["candidates"],
+            AVAIAILABILITY["positions"],
+            ids,
+            engine="unit_flow",
+            registry=registry,
+        )
+        s.schedule_interviews()
+        # validation
+        assert s.interviews == expected.interviews
+        assert s.scheduled == expected.scheduled
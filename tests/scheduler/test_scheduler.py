@@ -1,6 +1,10 @@
+import random
 from pprint import pprint
 
+import pytest
+
 from cohortify.scheduler import Scheduler
+from cohortify.slots import SlotBitmap
 from tests.scheduler.scheduler_data import (
     INTERVIEWS,
     AVAIAILABILITY,
@@ -59,3 +63,492 @@ class TestScheduleInterviews:
         # validation
         assert s.scheduled == schedule
         assert s.unscheduled == []
+
+
+def random_inputs(seed: int):
+    """Create random availability and interviews"""
+    rng = random.Random(seed)
+    times = [f"{hour}:00" for hour in range(9, 17)]
+    candidates = [f"Candidate {i}" for i in range(12)]
+    positions = [f"Position {i}" for i in range(4)]
+    c_availability = {c: rng.sample(times, 3) for c in candidates}
+    p_availability = {p: rng.sample(times, 5) for p in positions}
+    interviews = {p: rng.sample(candidates, 6) for p in positions}
+    return c_availability, p_availability, interviews
+
+
+def assert_valid(s: Scheduler):
+    """Check that no position is double booked at a time it's available"""
+    booked = set()
+    for (position, _), time in s.scheduled.items():
+        assert time in s.p_availability[position]
+        assert (position, time) not in booked
+        booked.add((position, time))
+
+
+class TestUnitFlowEngine:
+    """Tests Scheduler.schedule_interviews() with the unit_flow engine"""
+
+    def test_invalid_engine(self):
+        """Raise a KeyError if the engine isn't supported"""
+        with pytest.raises(KeyError):
+            Scheduler({}, {}, {}, engine="fake")
+
+    def test_complete(self):
+        """Tests that all interviews are assigned"""
+        # setup
+        c_availability = AVAIAILABILITY["candidates"]
+        p_availability = AVAIAILABILITY["positions"]
+        # execution
+        s = Scheduler(c_availability, p_availability, INTERVIEWS, "unit_flow")
+        s.schedule_interviews()
+        # validation
+        assert set(s.scheduled) == set(SCHEDULE)
+        assert s.unscheduled == []
+        assert s.G is None
+        assert_valid(s)
+
+    def test_random_matches_networkx(self):
+        """Tests that both engines schedule the same number of interviews"""
+        for seed in range(10):
+            # setup
+            inputs = random_inputs(seed)
+            expected = Scheduler(*inputs)
+            expected.schedule_interviews()
+            # execution
+            s = Scheduler(*inputs, engine="unit_flow")
+            s.schedule_interviews()
+            # validation
+            assert len(s.scheduled) == len(expected.scheduled)
+            assert len(s.unscheduled) == len(expected.unscheduled)
+            assert_valid(s)
+
+
+class TestComponents:
+    """Tests scheduling connected components separately"""
+
+    @pytest.fixture(scope="function", name="inputs")
+    def mock_inputs(self):
+        """Create two tracks of interviews that share no one"""
+        c_availability, p_availability, interviews = random_inputs(0)
+        for c, times in AVAIAILABILITY["candidates"].items():
+            c_availability[c] = times
+        for p, times in AVAIAILABILITY["positions"].items():
+            p_availability[f"Track 2 {p}"] = times
+            interviews[f"Track 2 {p}"] = INTERVIEWS[p]
+        return c_availability, p_availability, interviews
+
+    def test_components(self, inputs):
+        """Tests that interviews are grouped by connected component"""
+        # execution
+        s = Scheduler(*inputs)
+        components = s.components()
+        # validation
+        assert len(components) == 2
+        assert sorted(map(len, components)) == [9, 24]
+        assert sorted(sum(components, [])) == sorted(s.interviews)
+
+    @pytest.mark.parametrize("engine", ["networkx", "unit_flow"])
+    def test_parallel(self, inputs, engine):
+        """Tests that merged results match scheduling everything at once"""
+        # setup
+        expected = Scheduler(*inputs, engine=engine)
+        expected.schedule_interviews()
+        # execution
+        s = Scheduler(*inputs, engine=engine, n_jobs=2)
+        s.schedule_interviews()
+        # validation
+        assert len(s.scheduled) == len(expected.scheduled)
+        assert s.unscheduled == [
+            i for i in s.interviews if i not in s.scheduled
+        ]
+        assert_valid(s)
+
+
+class TestIncrementalUpdates:
+    """Tests incremental updates to a schedule"""
+
+    def fresh_count(self, s: Scheduler) -> int:
+        """Number of interviews scheduled by solving from scratch"""
+        positions = {}
+        for p, c in s.interviews:
+            positions.setdefault(p, []).append(c)
+        fresh = Scheduler(
+            s.c_availability, s.p_availability, positions, "unit_flow"
+        )
+        fresh.schedule_interviews()
+        return len(fresh.scheduled)
+
+    def test_remove_and_add_availability(self):
+        """Tests removing and restoring the slot of a scheduled interview"""
+        # setup
+        c_availability = {"Alice": ["9am"], "Bob": ["9am", "12pm"]}
+        p_availability = {"Position 1": ["9am"], "Position 2": ["12pm"]}
+        interviews = {"Position 1": ["Alice"], "Position 2": ["Bob"]}
+        s = Scheduler(c_availability, p_availability, interviews, "unit_flow")
+        s.schedule_interviews()
+        assert s.scheduled == {
+            ("Position 1", "Alice"): "9am",
+            ("Position 2", "Bob"): "12pm",
+        }
+        # execution -- removing the slot unschedules the interview
+        s.remove_availability("Position 1", "9am", kind="position")
+        # validation
+        assert s.unscheduled == [("Position 1", "Alice")]
+        assert s.scheduled == {("Position 2", "Bob"): "12pm"}
+        assert p_availability["Position 1"] == ["9am"]  # input not modified
+        # execution -- adding a new slot schedules it again
+        s.add_availability("Position 1", "3pm", kind="position")
+        # validation
+        assert s.scheduled[("Position 1", "Alice")] == "3pm"
+        assert s.scheduled[("Position 2", "Bob")] == "12pm"
+        assert s.p_availability["Position 1"] == ["3pm"]
+
+    def test_add_and_cancel_interview(self):
+        """Tests that cancelling an interview frees its slots"""
+        # setup
+        c_availability = {"Alice": ["9am"], "Bob": ["9am"]}
+        p_availability = {"Position 1": ["9am"]}
+        s = Scheduler(c_availability, p_availability, {"Position 1": []})
+        # execution
+        s.add_interview("Position 1", "Alice")
+        s.add_interview("Position 1", "Bob")
+        # validation
+        assert s.scheduled == {("Position 1", "Alice"): "9am"}
+        assert s.unscheduled == [("Position 1", "Bob")]
+        # execution
+        s.cancel_interview("Position 1", "Alice")
+        # validation
+        assert s.scheduled == {("Position 1", "Bob"): "9am"}
+        assert s.interviews == [("Position 1", "Bob")]
+
+    def test_invalid_kind(self):
+        """Raise a KeyError if the kind isn't candidate or position"""
+        s = Scheduler({}, {}, {})
+        with pytest.raises(KeyError):
+            s.add_availability("Alice", "9am", kind="partner")
+
+    def test_random_updates_stay_maximal(self):
+        """Tests that repaired schedules match a fresh solve after updates"""
+        rng = random.Random(0)
+        times = [f"{hour}:00" for hour in range(9, 17)]
+        s = Scheduler(*random_inputs(1), engine="unit_flow")
+        s.schedule_interviews()
+        for _ in range(40):
+            # setup
+            action = rng.choice(["add", "remove", "interview", "cancel"])
+            kind = rng.choice(["candidate", "position"])
+            if kind == "candidate":
+                name = rng.choice(list(s.c_availability))
+            else:
+                name = rng.choice(list(s.p_availability))
+            # execution
+            if action == "add":
+                s.add_availability(name, rng.choice(times), kind)
+            elif action == "remove":
+                s.remove_availability(name, rng.choice(times), kind)
+            elif action == "interview":
+                position = rng.choice(list(s.p_availability))
+                candidate = rng.choice(list(s.c_availability))
+                s.add_interview(position, candidate)
+            elif s.interviews:
+                s.cancel_interview(*rng.choice(s.interviews))
+            # validation
+            assert len(s.scheduled) == self.fresh_count(s)
+            assert_valid(s)
+
+
+class TestInstrumentation:
+    """Tests the metrics recorded by an instrumented Scheduler"""
+
+    @pytest.mark.parametrize("engine", ["networkx", "unit_flow"])
+    def test_graph_counters(self, engine):
+        """Both engines count the graph they built and what they scheduled"""
+        # setup
+        exported = []
+        s = Scheduler(
+            *random_inputs(0),
+            engine=engine,
+            instrument=True,
+            metrics_hook=lambda run, data: exported.append((run, data)),
+        )
+        # execution
+        s.schedule_interviews()
+        # validation
+        counters = s.metrics.counters
+        assert counters["scheduled"] == len(s.scheduled)
+        assert counters["graph_nodes"] > 0 and counters["graph_edges"] > 0
+        assert {"build_graph", "max_flow"} <= set(s.metrics.timers)
+        assert exported == [("schedule", s.metrics.to_dict())]
+
+    def test_augmentations(self):
+        """Dinic's algorithm pushes one augmenting path per interview"""
+        s = Scheduler(*random_inputs(1), engine="unit_flow", instrument=True)
+        s.schedule_interviews()
+        assert s.metrics.counters["augmentations"] == len(s.scheduled)
+
+    def test_components_merge_metrics(self):
+        """Metrics of each component are added up"""
+        s = Scheduler(*random_inputs(2), n_jobs=2, instrument=True)
+        s.schedule_interviews()
+        assert s.metrics.counters["components"] == len(s.components())
+        assert s.metrics.counters["scheduled"] == len(s.scheduled)
+
+    def test_updates(self):
+        """Incremental updates count their augmenting paths"""
+        s = Scheduler(*random_inputs(3), engine="unit_flow", instrument=True)
+        s.schedule_interviews()
+        before = s.metrics.counters["augmentations"]
+        p, c = s.interviews[0]
+        s.cancel_interview(p, c)
+        s.add_interview(p, c)
+        assert s.metrics.counters["updates"] == 2
+        assert s.metrics.counters["augmentations"] >= before
+
+
+def to_bitmaps(c_availability, p_availability):
+    """Convert both sides' availability to bitmaps over the same slots"""
+    slots = [f"{hour}:00" for hour in range(9, 17)]
+    return (
+        SlotBitmap.from_availability(c_availability, slots),
+        SlotBitmap.from_availability(p_availability, slots),
+    )
+
+
+def assert_mutual(s: Scheduler):
+    """Check that every interview is scheduled at a mutual time slot
+
+    Also checks that no candidate is double booked and that every
+    unscheduled interview has a participant booked at each mutual slot.
+    """
+    assert_valid(s)
+    booked = set()
+    for (position, candidate), time in s.scheduled.items():
+        assert time in s.c_availability[candidate]
+        assert time in s.p_availability[position]
+        assert (candidate, time) not in booked
+        booked.update([(candidate, time), (position, time)])
+    for position, candidate in s.unscheduled:
+        for time in s.p_availability.get(position, []):
+            if time in s.c_availability.get(candidate, []):
+                assert {(candidate, time), (position, time)} & booked
+
+
+class TestSlotBitmaps:
+    """Tests scheduling with availability stored as SlotBitmaps"""
+
+    def test_mutual_availability(self):
+        """Bitwise ANDs of bitmaps agree with intersecting lists of slots"""
+        for seed in range(5):
+            c_availability, p_availability, interviews = random_inputs(seed)
+            expected = Scheduler(c_availability, p_availability, interviews)
+            s = Scheduler(
+                *to_bitmaps(c_availability, p_availability), interviews
+            )
+            mutual = s.mutual_availability()
+            for i, times in expected.mutual_availability().items():
+                assert sorted(mutual[i]) == sorted(times)
+
+    @pytest.mark.parametrize("prepass", [False, True])
+    def test_engines_agree(self, prepass):
+        """Every engine and n_jobs book the same interviews at the same time"""
+        for seed in range(5):
+            # setup -- two tracks that share no one, so n_jobs splits them
+            c_availability, p_availability, interviews = {}, {}, {}
+            for track in ["A", "B"]:
+                inputs = random_inputs(seed if track == "A" else seed + 10)
+                c_availability.update(
+                    {f"{c} {track}": t for c, t in inputs[0].items()}
+                )
+                p_availability.update(
+                    {f"{p} {track}": t for p, t in inputs[1].items()}
+                )
+                interviews.update(
+                    {
+                        f"{p} {track}": [f"{c} {track}" for c in matched]
+                        for p, matched in inputs[2].items()
+                    }
+                )
+            bitmaps = to_bitmaps(c_availability, p_availability)
+            expected = Scheduler(*bitmaps, interviews, prepass=prepass)
+            expected.schedule_interviews()
+            shuffled = dict(reversed(list(interviews.items())))
+            # execution
+            for engine, n_jobs, matched in [
+                ("unit_flow", 1, interviews),
+                ("networkx", 2, interviews),
+                ("unit_flow", 2, interviews),
+                ("unit_flow", 1, shuffled),
+            ]:
+                s = Scheduler(
+                    *bitmaps, matched, engine, n_jobs=n_jobs, prepass=prepass
+                )
+                s.schedule_interviews()
+                # validation
+                assert_mutual(s)
+                assert s.scheduled == expected.scheduled
+
+    @pytest.mark.parametrize("engine", ["networkx", "unit_flow"])
+    def test_same_time_for_both(self, engine):
+        """Interviews aren't booked at different times for each side"""
+        # setup
+        slots = ["t0", "t1", "t2", "t3"]
+        c_map = SlotBitmap.from_availability(
+            {"C0": ["t1", "t3"], "C1": ["t0", "t2"]}, slots
+        )
+        p_map = SlotBitmap.from_availability(
+            {"P0": ["t3", "t1"], "P1": ["t1", "t0"]}, slots
+        )
+        interviews = {"P0": ["C0", "C1"], "P1": ["C0", "C1"]}
+        # execution
+        s = Scheduler(c_map, p_map, interviews, engine)
+        s.schedule_interviews()
+        # validation
+        assert_mutual(s)
+        assert len(s.scheduled) == 3
+
+    def test_unknown_names(self):
+        """Interviews with someone missing from a bitmap share no slots"""
+        bitmaps = to_bitmaps({"Alice": ["9:00"]}, {"Position 1": ["9:00"]})
+        s = Scheduler(*bitmaps, {"Position 1": ["Alice", "Bob"]}, "unit_flow")
+        s.schedule_interviews()
+        assert s.mutual_availability()[("Position 1", "Bob")] == []
+        assert s.scheduled == {("Position 1", "Alice"): "9:00"}
+
+    def test_random_updates_stay_mutual(self):
+        """Updates keep interviews at mutual slots and the flow maximal"""
+        rng = random.Random(0)
+        times = [f"{hour}:00" for hour in range(9, 17)]
+        c_availability, p_availability, interviews = random_inputs(1)
+        bitmaps = to_bitmaps(c_availability, p_availability)
+        s = Scheduler(*bitmaps, interviews, engine="unit_flow")
+        s.schedule_interviews()
+        for _ in range(40):
+            # setup
+            kind = rng.choice(["candidate", "position"])
+            if kind == "candidate":
+                name = rng.choice(list(s.c_availability))
+            else:
+                name = rng.choice(list(s.p_availability))
+            # execution
+            if rng.random() < 0.5:
+                s.add_availability(name, rng.choice(times), kind)
+            else:
+                s.remove_availability(name, rng.choice(times), kind)
+            # validation
+            assert_mutual(s)
+
+    def test_different_slots(self):
+        """Raise a ValueError unless both bitmaps share the same slots"""
+        c_map = SlotBitmap.from_availability({"Alice": ["9am"]})
+        p_map = SlotBitmap.from_availability({"Position 1": ["10am"]})
+        with pytest.raises(ValueError):
+            Scheduler(c_map, p_map, {})
+        with pytest.raises(ValueError):
+            Scheduler(c_map, {"Position 1": ["9am"]}, {})
+
+
+class TestPrepass:
+    """Tests the feasibility pre-pass of Scheduler.schedule_interviews()"""
+
+    def test_no_mutual_slots(self):
+        """Interviews that share no slot are pruned from the network"""
+        # setup
+        c_availability = {"Alice": ["9am"], "Bob": ["9am", "12pm"]}
+        p_availability = {"Position 1": ["3pm"], "Position 2": ["9am"]}
+        interviews = {"Position 1": ["Alice", "Bob"], "Position 2": ["Bob"]}
+        inputs = (c_availability, p_availability, interviews, "unit_flow")
+        full = Scheduler(*inputs)
+        full.schedule_unit_flow()
+        # execution
+        s = Scheduler(*inputs, prepass=True)
+        s.schedule_interviews()
+        s.schedule_unit_flow()
+        # validation
+        assert s.feasibility.no_mutual == [
+            ("Position 1", "Alice"),
+            ("Position 1", "Bob"),
+        ]
+        assert s.scheduled == {("Position 2", "Bob"): "9am"}
+        assert s.network.n_edges < full.network.n_edges
+
+    def test_greedy_skips_flow(self):
+        """Max-flow is skipped when a greedy schedule reaches the bound"""
+        # setup
+        c_availability = {"Alice": ["9am", "12pm"], "Bob": ["9am"]}
+        p_availability = {"Position 1": ["9am", "12pm"]}
+        interviews = {"Position 1": ["Alice", "Bob"]}
+        # execution
+        s = Scheduler(
+            c_availability,
+            p_availability,
+            interviews,
+            "unit_flow",
+            instrument=True,
+            prepass=True,
+        )
+        s.schedule_interviews()
+        # validation -- Bob has one slot, so he's booked first
+        assert s.scheduled == {
+            ("Position 1", "Bob"): "9am",
+            ("Position 1", "Alice"): "12pm",
+        }
+        assert s.feasibility.skipped_flow
+        assert s.network is None
+        assert "max_flow" not in s.metrics.timers
+        assert s.metrics.counters["skipped_flow"] == 1
+
+    @pytest.mark.parametrize("engine", ["networkx", "unit_flow"])
+    @pytest.mark.parametrize("n_jobs", [1, 2])
+    def test_random_matches_flow(self, engine, n_jobs):
+        """The pre-pass schedules interviews at mutual slots within its bound"""
+        for seed in range(10):
+            # setup
+            c_availability, p_availability, interviews = random_inputs(seed)
+            bitmaps = to_bitmaps(c_availability, p_availability)
+            expected = Scheduler(*bitmaps, interviews, engine)
+            expected.schedule_interviews()
+            # execution
+            s = Scheduler(
+                *bitmaps, interviews, engine, n_jobs=n_jobs, prepass=True
+            )
+            s.schedule_interviews()
+            # validation
+            assert len(s.scheduled) <= s.feasibility.upper_bound
+            assert_mutual(s)
+            assert_mutual(expected)
+
+    def test_random_updates_stay_maximal(self):
+        """Pruning is kept up to date by incremental updates"""
+        rng = random.Random(0)
+        times = [f"{hour}:00" for hour in range(9, 17)]
+        s = Scheduler(*random_inputs(1), engine="unit_flow", prepass=True)
+        s.schedule_interviews()
+        for _ in range(40):
+            # setup
+            kind = rng.choice(["candidate", "position"])
+            if kind == "candidate":
+                name = rng.choice(list(s.c_availability))
+            else:
+                name = rng.choice(list(s.p_availability))
+            # execution
+            if rng.random() < 0.5:
+                s.add_availability(name, rng.choice(times), kind)
+            else:
+                s.remove_availability(name, rng.choice(times), kind)
+            # validation
+            positions = {}
+            for p, c in s.interviews:
+                positions.setdefault(p, []).append(c)
+            fresh = Scheduler(
+                s.c_availability,
+                s.p_availability,
+                positions,
+                "unit_flow",
+                prepass=True,
+            )
+            fresh.schedule_interviews()
+            assert len(s.scheduled) == len(fresh.scheduled)
+            mutual = fresh.mutual_availability()
+            assert all(mutual[i] for i in s.scheduled)
+            assert_valid(s)
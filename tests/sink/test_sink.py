@@ -0,0 +1,88 @@
+import json
+
+import pytest
+
+from cohortify.logger import LogType
+from cohortify.matcher import Matcher
+from cohortify.sink import JsonlSink
+from tests.matcher.matcher_data import INTERVIEWS
+
+
+def read_lines(path) -> list:
+    """Read each line of a JSONL file"""
+    with open(path, encoding="utf-8") as f:
+        return [json.loads(line) for line in f]
+
+
+def test_write_and_flush(tmp_path):
+    """Tests that queued events are written as JSON lines"""
+    # setup
+    path = tmp_path / "logs.jsonl"
+    # execution
+    with JsonlSink(path, batch_size=2) as sink:
+        for i in range(5):
+            sink.write((i, LogType.init_round.value, "Alice", "Bob", None))
+        sink.flush()
+        lines = read_lines(path)
+    # validation
+    assert len(lines) == 5
+    assert sink.written == 5
+    assert lines[0] == {
+        "offer_round": 0,
+        "log_type": LogType.init_round.value,
+        "proposer": "Alice",
+        "recipient": "Bob",
+        "old_offer": None,
+    }
+
+
+def test_rotation(tmp_path):
+    """Tests that files are rotated once they exceed max_bytes"""
+    # setup
+    path = tmp_path / "logs.jsonl"
+    # execution
+    with JsonlSink(path, batch_size=1, max_bytes=1, backup_count=2) as sink:
+        for i in range(4):
+            sink.write((i, LogType.init_round.value, "Alice", "Bob", None))
+    # validation
+    assert read_lines(path) == []
+    assert read_lines(f"{path}.1")[0]["offer_round"] == 3
+    assert read_lines(f"{path}.2")[0]["offer_round"] == 2
+    assert not (tmp_path / "logs.jsonl.3").exists()
+
+
+def test_matcher_streams_logs(tmp_path):
+    """Tests that the Matcher streams logs to the sink with counters only"""
+    # setup
+    path = tmp_path / "logs.jsonl"
+    p_prefs = INTERVIEWS["complete"]["candidates"]
+    r_prefs = INTERVIEWS["complete"]["positions"]
+    # execution
+    with JsonlSink(path) as sink:
+        matcher = Matcher(
+            p_prefs, r_prefs, verbosity="counters", log_sink=sink
+        )
+        result = matcher.assign_matches()
+    lines = read_lines(path)
+    # validation
+    assert len(result.match_logs) == 0
+    assert len(lines) == sum(matcher.log.counts.values())
+    assert lines[0]["log_type"] == LogType.init_round.value
+
+
+def test_closed(tmp_path):
+    """Tests that writing to or flushing a closed sink raises an error"""
+    # setup
+    path = tmp_path / "logs.jsonl"
+    sink = JsonlSink(path)
+    sink.write((0, LogType.init_round.value, "Alice", "Bob", None))
+    # execution
+    sink.close()
+    sink.close()  # closing twice is a no-op
+    # validation
+    assert sink.closed
+    assert len(read_lines(path)) == 1
+    with pytest.raises(ValueError):
+        sink.write((1, LogType.init_round.value, "Alice", "Bob", None))
+    with pytest.raises(ValueError):
+        sink.flush()
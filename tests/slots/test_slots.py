@@ -0,0 +1,134 @@
+import pickle
+from datetime import datetime
+
+import pytest
+
+from cohortify.slots import SlotBitmap, TimeGrid
+
+AVAILABILITY = {
+    "Alice": ["9am", "11am"],
+    "Bob": ["10am", "11am", "5pm"],
+    "Charlie": [],
+}
+SLOTS = ["9am", "10am", "11am", "12pm", "1pm", "2pm", "3pm", "4pm", "5pm"]
+MONDAY = datetime(2024, 1, 1)
+
+
+def at(hour: int, minute: int = 0) -> datetime:
+    """Return a time on MONDAY"""
+    return MONDAY.replace(hour=hour, minute=minute)
+
+
+@pytest.fixture(scope="function", name="bitmap")
+def mock_bitmap():
+    """Creates a SlotBitmap with more slots than fit in one byte"""
+    return SlotBitmap.from_availability(AVAILABILITY, SLOTS)
+
+
+def test_bits(bitmap: SlotBitmap):
+    """Each slot sets one bit of its person's row, little-endian"""
+    assert bitmap.bits.shape == (3, 2)
+    assert bitmap.bits[0].tolist() == [0b101, 0]
+    assert bitmap.bits[1].tolist() == [0b110, 1]
+
+
+def test_times_and_shared(bitmap: SlotBitmap):
+    """Slots are decoded from one row or the AND of two rows"""
+    assert bitmap.times("Bob") == ["10am", "11am", "5pm"]
+    assert bitmap.times("Charlie") == []
+    assert bitmap.shared("Alice", bitmap, "Bob") == ["11am"]
+
+
+def test_to_availability(bitmap: SlotBitmap):
+    """Converting back returns the same slots in the order of slots"""
+    assert bitmap.to_availability() == AVAILABILITY
+
+
+def test_unknown_slot_raises_key_error():
+    """Slots missing from the list of slots raise a KeyError"""
+    with pytest.raises(KeyError):
+        SlotBitmap.from_availability(AVAILABILITY, ["9am"])
+
+
+def test_save_and_load(bitmap: SlotBitmap, tmp_path):
+    """A saved bitmap is memory-mapped on load and pickled by path"""
+    # execution
+    bitmap.save(tmp_path / "slots")
+    loaded = SlotBitmap.load(tmp_path / "slots")
+    # validation
+    assert loaded.names == bitmap.names
+    assert loaded.slots == SLOTS
+    assert loaded.to_availability() == AVAILABILITY
+    assert loaded.path == tmp_path / "slots"
+    assert len(pickle.dumps(loaded)) < len(pickle.dumps(bitmap))
+    assert pickle.loads(pickle.dumps(loaded)).times("Alice") == [
+        "9am",
+        "11am",
+    ]
+
+
+class TestTimeGrid:
+    """Tests TimeGrid"""
+
+    @pytest.fixture(scope="function", name="grid")
+    def mock_grid(self):
+        """Creates a grid of half hour slots from 9am to 12pm on a Monday"""
+        return TimeGrid(MONDAY.replace(hour=9), MONDAY.replace(hour=12))
+
+    def test_labels(self, grid: TimeGrid):
+        """Slots and blocks of slots are labelled by their start time"""
+        assert grid.n_slots == 6
+        assert grid.labels()[:2] == ["Mon 09:00", "Mon 09:30"]
+        assert grid.labels(duration=2) == [
+            "Mon 09:00",
+            "Mon 10:00",
+            "Mon 11:00",
+        ]
+
+    def test_intervals_line_up(self, grid: TimeGrid):
+        """Intervals of different lengths cover the same slots"""
+        bitmap = grid.bitmap(
+            {
+                "Alice": [(at(9), at(10))],
+                "Position 1": [(at(9), at(9, 30))],
+                # partial slots at either end aren't available
+                "Bob": [(at(9, 15), at(10, 45))],
+            }
+        )
+        assert bitmap.times("Alice") == ["Mon 09:00", "Mon 09:30"]
+        assert bitmap.shared("Alice", bitmap, "Position 1") == ["Mon 09:00"]
+        assert bitmap.times("Bob") == ["Mon 09:30", "Mon 10:00"]
+
+    def test_duration(self, grid: TimeGrid):
+        """Blocks need every slot, which adjacent intervals can cover"""
+        intervals = {
+            "Alice": [(at(9), at(9, 30)), (at(9, 30), at(10))],
+            "Bob": [(at(9, 30), at(11)), (at(8), at(8, 30))],
+        }
+        bitmap = grid.bitmap(intervals, duration=2)
+        assert bitmap.slots == grid.labels(duration=2)
+        assert bitmap.to_availability() == {
+            "Alice": ["Mon 09:00"],
+            "Bob": ["Mon 10:00"],
+        }
+        with pytest.raises(ValueError):
+            grid.bitmap(intervals, duration=0)
+
+
+def test_subset(bitmap: SlotBitmap):
+    """A subset keeps the slots and the rows of the names it's given"""
+    subset = bitmap.subset(["Bob", "Alice"])
+    assert subset.slots == bitmap.slots
+    assert subset.to_availability() == {
+        "Bob": AVAILABILITY["Bob"],
+        "Alice": AVAILABILITY["Alice"],
+    }
+
+
+def test_take(bitmap: SlotBitmap):
+    """Taking rows by position gives the same bitmap as a subset of names"""
+    rows = [bitmap.index["Bob"], bitmap.index["Alice"]]
+    taken = bitmap.take(rows)
+    subset = bitmap.subset(["Bob", "Alice"])
+    assert taken.names == ["Bob", "Alice"]
+    assert taken.to_availability() == subset.to_availability()
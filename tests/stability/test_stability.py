@@ -0,0 +1,137 @@
+import random
+
+import numpy as np
+
+from cohortify.market import Market
+from cohortify.matcher import Matcher
+from cohortify.stability import verify_matching
+from tests.matcher.matcher_data import random_prefs
+
+P_PREFS = {
+    "Alice": ["Position 1", "Position 2"],
+    "Bob": ["Position 1", "Position 2"],
+    "Charlie": ["Position 2"],
+}
+R_PREFS = {
+    "Position 1": ["Bob", "Alice"],
+    "Position 2": ["Alice", "Bob"],
+}
+
+
+def verify(matches, p_capacity=1, r_capacity=1):
+    """Verify matches on the market above with uniform capacities"""
+    market = Market.from_preferences(P_PREFS, R_PREFS)
+    return verify_matching(
+        market,
+        matches,
+        p_capacity=np.full(market.n_proposers, p_capacity),
+        r_capacity=np.full(market.n_recipients, r_capacity),
+    )
+
+
+def naive_blocking_pairs(result):
+    """Find blocking pairs by comparing every pair with Candidate.prefers()"""
+    blocking = []
+    for p_name, proposer in result.proposers.items():
+        for r_name, recipient in result.recipients.items():
+            if r_name in proposer.matches or not recipient.ranks(p_name):
+                continue
+            if not proposer.ranks(r_name):
+                continue
+            p_wants = proposer.has_capacity or any(
+                proposer.prefers(r_name, to=m) for m in proposer.matches
+            )
+            r_wants = recipient.has_capacity or any(
+                recipient.prefers(p_name, to=m) for m in recipient.matches
+            )
+            if p_wants and r_wants:
+                blocking.append((p_name, r_name))
+    return sorted(blocking)
+
+
+class TestVerifyMatching:
+    """Tests verify_matching()"""
+
+    def test_stable(self):
+        """The proposer-optimal matching passes every check"""
+        report = verify([("Alice", "Position 2"), ("Bob", "Position 1")])
+        assert report.is_stable
+        assert report.blocking_pairs == []
+
+    def test_blocking_pair(self):
+        """Pairs who both prefer each other to their matches block"""
+        report = verify([("Alice", "Position 1"), ("Bob", "Position 2")])
+        assert report.is_valid
+        assert not report.is_stable
+        assert report.blocking_pairs == [("Bob", "Position 1")]
+
+    def test_free_capacity_blocks(self):
+        """Pairs who both have capacity left block the matching"""
+        report = verify([("Alice", "Position 2")])
+        assert report.blocking_pairs == [
+            ("Alice", "Position 1"),
+            ("Bob", "Position 1"),
+        ]
+
+    def test_unacceptable(self):
+        """Matches that either side didn't rank are reported"""
+        report = verify([("Charlie", "Position 2"), ("Bob", "Position 1")])
+        assert report.unacceptable == [("Charlie", "Position 2")]
+        assert not report.is_valid
+
+    def test_over_capacity(self):
+        """Candidates with more matches than their capacity are reported"""
+        matches = [("Alice", "Position 2"), ("Bob", "Position 2")]
+        report = verify(matches)
+        assert report.r_over_capacity == {"Position 2": 2}
+        assert report.p_over_capacity == {}
+        assert verify(matches, r_capacity=2).is_valid
+
+    def test_unknown_names_in_ranks(self):
+        """Ranks that count unknown names still find blocking pairs"""
+        market = Market.from_preferences(
+            {"Alice": ["Position 1"]},
+            {"Position 1": ["Dana", "Eve", "Frank", "Alice"]},
+        )
+        report = verify_matching(
+            market, [], p_capacity=np.ones(1), r_capacity=np.ones(1)
+        )
+        assert report.blocking_pairs == [("Alice", "Position 1")]
+
+    def test_agrees_with_naive_scan(self):
+        """Blocking pairs agree with a scan of every pair on random markets"""
+        for seed in range(10):
+            # setup
+            rng = random.Random(seed)
+            p_prefs, r_prefs = random_prefs(rng, 15, 5, 3, 9)
+            result = Matcher(p_prefs, r_prefs).assign_matches(2, 3)
+            # shuffle the matches so the result is no longer stable
+            for _, proposer in result.proposers.items():
+                for r_name in list(proposer.matches):
+                    if rng.random() < 0.3:
+                        Matcher.unmatch(
+                            proposer, result.recipients.get(r_name)
+                        )
+            result._matches = None  # pylint: disable=protected-access
+            result._by_proposer = None  # pylint: disable=protected-access
+            # execution
+            report = result.verify()
+            # validation
+            assert report.is_valid
+            assert sorted(report.blocking_pairs) == naive_blocking_pairs(
+                result
+            )
+
+
+def test_match_result_verify():
+    """Both engines produce matchings that verify as stable"""
+    for engine in ["object", "array"]:
+        result = Matcher(P_PREFS, R_PREFS, engine=engine).assign_matches()
+        assert result.verify().is_stable
+
+
+def test_match_result_verify_unknown_names():
+    """Unknown names the object engine never reached are ignored"""
+    p_prefs = {**P_PREFS, "Alice": ["Position 1", "Position 2", "Position 4"]}
+    result = Matcher(p_prefs, R_PREFS).assign_matches()
+    assert result.verify().is_stable
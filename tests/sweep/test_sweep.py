@@ -0,0 +1,35 @@
+from cohortify.market import Market
+from cohortify.sweep import Scenario, run_scenarios
+
+P_PREFS = {
+    "Alice": ["Position 1", "Position 2"],
+    "Bob": ["Position 1"],
+    "Charlie": ["Position 1", "Position 2"],
+}
+R_PREFS = {
+    "Position 1": ["Bob", "Alice", "Charlie"],
+    "Position 2": ["Alice", "Charlie"],
+}
+
+
+def test_run_scenarios():
+    """Each scenario is summarized in the order it was given"""
+    # setup
+    market = Market.from_preferences(P_PREFS, R_PREFS)
+    scenarios = [
+        Scenario(p_min=1, r_min=1),
+        Scenario(r_capacity={"Position 1": 2}, p_min=1, r_min=2),
+    ]
+    # execution
+    summaries = run_scenarios(market, scenarios)
+    # validation
+    assert [s.scenario for s in summaries] == scenarios
+    assert [s.n_matches for s in summaries] == [2, 3]
+    assert [s.p_remaining for s in summaries] == [1, 0]
+    assert [s.r_remaining for s in summaries] == [0, 1]
+
+
+def test_no_scenarios():
+    """An empty sweep returns no summaries"""
+    market = Market.from_preferences(P_PREFS, R_PREFS)
+    assert not run_scenarios(market, [], n_jobs=-1)